@@ -1,71 +1,43 @@
-import speech_recognition as sr
-from google import genai
-from elevenlabs.client import ElevenLabs
-import serial
-import time
+from startup import find_serial_port, run_parallel, since_launch
 import subprocess
-import os
+from robot_serial import RobotLink
+from command_parser import parse_command
 
 # ================= 配置区 =================
 SERIAL_PORT = "/dev/cu.usbmodem1101" 
 BAUD_RATE = 9600
 
-# --- CHANGE 1: Track last_command like your gesture code ---
-last_command = None 
-
-try:
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2) 
-    if ser.is_open:
-        ser.write(b'0') # Ensure Manual Mode on start
-    print(f"[Status] Connected to Robot on {SERIAL_PORT}")
-except Exception as e:
-    print(f"[Serial Error] Could not open serial port: {e}")
-    ser = None
-
-gemini_client = genai.Client(api_key="")
+# The link and the clients are created in main(), not at import time; the clients are
+# built in parallel with the serial handshake (slow SDK imports)
+link = None
+gemini_client = None
 MODEL_ID = "gemini-3-flash-preview" 
 ELEVENLABS_KEY = ""
-el_client = ElevenLabs(api_key=ELEVENLABS_KEY)
+el_client = None
 
-COMMAND_MAP = {
-    "forward": "w",
-    "backward": "s",
-    "left": "a",
-    "right": "d",
-    "stop": "x",
-    "auto": "1",
-    "manual": "0"
-}
+def create_clients():
+    global gemini_client, el_client
+    from google import genai
+    from elevenlabs.client import ElevenLabs
+    gemini_client = genai.Client(api_key="")
+    el_client = ElevenLabs(api_key=ELEVENLABS_KEY)
 
 def send_robot_command(text):
-    """Refined to match the stability of your gesture code"""
-    global last_command
-    if ser is None or not ser.is_open: 
-        return
-    
-    text = text.lower()
-    cmd_to_send = None
-    
-    # Find the matching command
-    for word, cmd_char in COMMAND_MAP.items():
-        if word in text:
-            cmd_to_send = cmd_char
-            break
-            
-    # --- CHANGE 2: Deduplication Logic ---
-    if cmd_to_send and cmd_to_send != last_command:
-        # If it's a direction, force manual mode '0' first to override 'competitionRun'
-        if cmd_to_send in ['w', 's', 'a', 'd']:
-            ser.write(b'0')
-            time.sleep(0.01)
-            
-        ser.write(cmd_to_send.encode())
-        ser.flush() # Ensure it leaves the Python buffer immediately
-        print(f"[Robot] >>> SENT: {cmd_to_send.upper()}")
-        last_command = cmd_to_send
-    elif not cmd_to_send:
+    """Parses the utterance (synonyms, negation, durations) and sends its command sequence"""
+    steps = parse_command(text)
+    if not steps:
         print(f"[Robot] No command in: '{text}'")
+        return
+
+    # If it's a direction, force manual mode '0' first to override 'competitionRun'
+    steps = [('0' + cmd if cmd in 'wsad' else cmd, ms) for cmd, ms in steps]
+    if len(steps) == 1 and not steps[0][1]:
+        # Deduplication is handled by the link
+        if link.send(steps[0][0]):
+            print(f"[Robot] >>> SENT: {steps[0][0][-1].upper()}")
+    else:
+        link.send_sequence(steps)
+        print(f"[Robot] >>> SEQUENCE: {', '.join(f'{c[-1].upper()} {ms}ms' for c, ms in steps)}")
 
 def text_to_speech(text):
     # (Keep your original TTS function exactly as it was)
@@ -87,6 +59,7 @@ def text_to_speech(text):
         print(f"[TTS Error] {e}")
 
 def listen_and_talk():
+    import speech_recognition as sr
     recognizer = sr.Recognizer()
     
     with sr.Microphone() as source:
@@ -118,13 +91,20 @@ def listen_and_talk():
         except Exception as e:
             print(f"[Error] {e}")
 
-if __name__ == "__main__":
-    print(f"--- Robot Voice Controller ({MODEL_ID}) ---")
+def main():
+    global link
+    # Non-blocking link: connects in the background, then sends '0' (Manual Mode on start)
+    link = RobotLink(find_serial_port(SERIAL_PORT, "voice.port"), BAUD_RATE,
+                     initial_command='0').start()
+    run_parallel({"serial": lambda: link.wait_connected(timeout=3.0), "clients": create_clients})
+    print(f"🚀 Ready {since_launch():.2f} s after launch")
     while True:
         user_input = input("\nPress Enter to speak, or 'q' to quit: ")
         if user_input.lower() == 'q':
-            if ser: 
-                ser.write(b'x')
-                ser.close()
+            link.close(stop_command='x')
             break
         listen_and_talk()
+
+if __name__ == "__main__":
+    print(f"--- Robot Voice Controller ({MODEL_ID}) ---")
+    main()
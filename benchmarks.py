@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from latency_probe import LatencyProbe
+
+# ================= HOT-LOOP BENCHMARK SUITE =================
+# Measures throughput and per-call latency of the decision paths that run every
+# frame / utterance, on synthetic inputs (seeded, so every run sees the same data)
+# or on a recording made with replay.py:
+#
+#   python benchmarks.py                        # run everything, compare to baseline
+#   python benchmarks.py --only planner,parser
+#   python benchmarks.py --recording runs/lap1  # detections/landmarks from a real run
+#   python benchmarks.py --save-baseline        # accept the current numbers
+#
+# A case regresses when its p50 latency is more than `--threshold` (default 25%)
+# above the stored baseline; the process then exits with status 1. Baselines are
+# machine specific: save one per machine before comparing.
+
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+FRAME_SIZE = (480, 640)
+SEED = 0
+
+PARSER_PHRASES = [
+    "go forward", "stop", "turn left for two seconds then stop", "don't go forward, stop",
+    "switch to auto mode", "could you tell me a joke", "back up for half a second then right",
+    "alright", "please turn right", "manual mode",
+]
+
+
+def _timeit(fn, inputs, min_seconds, warmup=3):
+    """Calls fn on the inputs round-robin for at least `min_seconds`; per-call ms samples."""
+    for item in inputs[:warmup]:
+        fn(item)
+    samples = []
+    started = time.perf_counter()
+    i = 0
+    while time.perf_counter() - started < min_seconds or i < len(inputs):
+        item = inputs[i % len(inputs)]
+        t0 = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+        i += 1
+    return samples
+
+
+# ================= INPUTS =================
+def synthetic_boxes(n_frames=200, max_boxes=12):
+    rng = np.random.default_rng(SEED)
+    h, w = FRAME_SIZE
+    frames = []
+    for _ in range(n_frames):
+        n = rng.integers(0, max_boxes + 1)
+        x1 = rng.uniform(0, w * 0.9, n)
+        y1 = rng.uniform(0, h * 0.9, n)
+        frames.append(np.stack([x1, y1, x1 + rng.uniform(20, w * 0.4, n),
+                                y1 + rng.uniform(20, h * 0.5, n)], axis=1).astype(np.float32))
+    return frames
+
+
+def synthetic_landmarks(n_frames=200):
+    """Random but hand-shaped (21, 3) landmark arrays in normalized coordinates."""
+    rng = np.random.default_rng(SEED)
+    base = np.linspace([0.5, 0.8, 0.0], [0.5, 0.3, 0.0], 21, dtype=np.float32)
+    return [base + rng.normal(0, 0.08, (21, 3)).astype(np.float32) for _ in range(n_frames)]
+
+
+def recorded_inputs(path):
+    """(boxes per frame, landmark arrays) from a replay.py recording."""
+    from replay import load_events
+    boxes = [np.asarray(e["data"], dtype=np.float32).reshape(-1, 4)
+             for e in load_events(path, "detections")]
+    landmarks = [np.asarray(e["data"], dtype=np.float32) for e in load_events(path, "landmarks")]
+    return boxes, landmarks
+
+
+# ================= CASES =================
+def bench_planner(boxes, min_seconds):
+    from vision_planner import get_drive_command
+    h, w = FRAME_SIZE
+    return _timeit(lambda b: get_drive_command(b, w, h), boxes, min_seconds)
+
+
+def bench_tracking(boxes, min_seconds):
+    from vision_planner import TrackingPlanner
+    h, w = FRAME_SIZE
+    planner = TrackingPlanner()
+    clock = iter(range(10 ** 9))
+    return _timeit(lambda b: planner.update(b, w, h, now=next(clock) / 30.0), boxes, min_seconds)
+
+
+def bench_gesture(landmarks, min_seconds):
+    from gesture_features import classify_fingers, finger_states
+    from gesture_filter import gesture_confidence
+
+    def step(points):
+        fingers = finger_states(points, "Right")
+        gesture_confidence(points, fingers)
+        return classify_fingers(fingers)
+    return _timeit(step, landmarks, min_seconds)
+
+
+def bench_parser(phrases, min_seconds):
+    from command_parser import parse_command
+    return _timeit(parse_command, phrases, min_seconds)
+
+
+def bench_inference(backend_name, imgsz, min_seconds):
+    from inference_backends import create_backend
+    backend = create_backend(backend_name, imgsz=imgsz)
+    rng = np.random.default_rng(SEED)
+    frames = [rng.integers(0, 255, (*FRAME_SIZE, 3), dtype=np.uint8) for _ in range(4)]
+    backend.warmup(frames[0])
+    return _timeit(backend.predict, frames, min_seconds, warmup=0)
+
+
+def build_cases(args):
+    """Case name -> zero-argument callable returning latency samples in ms."""
+    if args.recording:
+        boxes, landmarks = recorded_inputs(args.recording)
+    else:
+        boxes, landmarks = synthetic_boxes(), synthetic_landmarks()
+    cases = {
+        "planner": lambda: bench_planner(boxes or synthetic_boxes(), args.seconds),
+        "tracking": lambda: bench_tracking(boxes or synthetic_boxes(), args.seconds),
+        "gesture": lambda: bench_gesture(landmarks or synthetic_landmarks(), args.seconds),
+        "parser": lambda: bench_parser(PARSER_PHRASES, args.seconds),
+    }
+    for backend in args.backends:
+        for imgsz in args.imgsz:
+            cases[f"inference_{backend}_{imgsz}"] = (
+                lambda b=backend, s=imgsz: bench_inference(b, s, max(args.seconds, 2.0)))
+    return cases
+
+
+# ================= REPORT =================
+def run(cases, only=None):
+    """Runs the cases; returns name -> {"p50", "p95", "p99", "per_sec", "n"} (ms)."""
+    probe = LatencyProbe("benchmarks")
+    results = {}
+    for name, case in cases.items():
+        if only and not any(name.startswith(o) for o in only):
+            continue
+        try:
+            samples = case()
+        except ImportError as e:
+            print(f"⏭️  {name}: skipped ({e})")
+            continue
+        for ms in samples:
+            probe.record(name, ms)
+        p50, p95, p99 = probe.percentiles(name)
+        results[name] = {"p50": p50, "p95": p95, "p99": p99,
+                         "per_sec": 1000.0 * len(samples) / sum(samples), "n": len(samples)}
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Prints the table against the baseline; returns the names that regressed."""
+    regressions = []
+    print(f"\n📊 {'case':<26}{'p50':>10}{'p95':>10}{'per sec':>12}{'vs base':>10}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base:
+            change = r["p50"] / base["p50"] - 1.0 if base["p50"] > 0 else 0.0
+            flag = "  ❌" if change > threshold else ""
+            if flag:
+                regressions.append(name)
+            vs = f"{change * 100:+.0f}%{flag}"
+        else:
+            vs = "new"
+        print(f"   {name:<26}{r['p50']:9.3f}ms{r['p95']:8.3f}ms{r['per_sec']:12.0f}{vs:>10}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the control-loop hot paths")
+    parser.add_argument("--only", default="", help="Comma-separated case name prefixes")
+    parser.add_argument("--recording", help="replay.py recording to take detections/landmarks from")
+    parser.add_argument("--backends", default="", help="Inference backends, e.g. torch,onnxruntime")
+    parser.add_argument("--imgsz", default="320,640", help="Inference resolutions")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Minimum run time per case")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed p50 slowdown before a case fails (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+    args.backends = [b for b in args.backends.split(",") if b]
+    args.imgsz = [int(s) for s in args.imgsz.split(",") if s]
+
+    results = run(build_cases(args), [o for o in args.only.split(",") if o])
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        merged = {**baseline, **results}
+        with open(args.baseline, "w") as f:
+            json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                       "results": merged}, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+    elif regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold * 100:.0f}%: "
+              f"{', '.join(regressions)}")
+        sys.exit(1)
+    else:
+        print("\n✅ No regressions")
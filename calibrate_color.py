@@ -0,0 +1,131 @@
+import json
+import queue
+import time
+
+import numpy as np
+
+from robot_protocol import ACK_OK, FRAME_COLOR_CAL, encode_color_calibration
+from robot_serial import RobotLink
+from telemetry import TRACK_COLORS, TelemetryBuffer
+
+# ================= TCS3200 COLOR CALIBRATION TOOL =================
+# Streams raw red/green/blue periods from the firmware's telemetry while the car
+# sits on each track surface in turn, fits one centroid per colour (median of
+# the samples), checks how well the nearest-centroid rule separates them, then
+# uploads the centroids with FRAME_COLOR_CAL so getColor() uses them from EEPROM.
+
+SERIAL_PORT = '/dev/cu.usbmodem101'  # Update this to your actual serial port path
+BAUD_RATE = 9600
+SAMPLE_SECONDS = 2.0
+TELEMETRY_INTERVAL_MS = 20
+CALIBRATION_FILE = "color_calibration.json"
+ACK_TIMEOUT = 2.0                        # Seconds to wait for each colour's EEPROM write ACK
+
+CALIBRATED_COLORS = TRACK_COLORS[:5]     # Everything except UNKNOWN
+
+
+def fit_centroids(samples):
+    """
+    Args:
+        samples (dict): Colour name -> (N, 3) array of raw (red, green, blue) periods.
+
+    Returns:
+        dict: Colour name -> (red, green, blue) centroid (per-channel median).
+    """
+    return {name: tuple(int(v) for v in np.median(rgb, axis=0)) for name, rgb in samples.items()}
+
+
+def classify(rgb, centroids):
+    """Vectorized nearest-centroid rule, identical to getColor() in the firmware."""
+    names = list(centroids)
+    refs = np.array([centroids[n] for n in names], dtype=np.int64)
+    rgb = np.asarray(rgb, dtype=np.int64).reshape(-1, 3)
+    dist = ((rgb[:, None, :] - refs[None, :, :]) ** 2).sum(axis=2)
+    return [names[i] for i in dist.argmin(axis=1)]
+
+
+def evaluate(samples, centroids):
+    """Prints per-colour accuracy and returns the overall accuracy."""
+    correct = total = 0
+    for name, rgb in samples.items():
+        predicted = classify(rgb, centroids)
+        hits = sum(p == name for p in predicted)
+        correct += hits
+        total += len(predicted)
+        print(f"   {name:<6} {hits:4d}/{len(predicted):<4d} "
+              f"centroid={centroids[name]}")
+    accuracy = correct / total if total else 0.0
+    print(f"   Overall accuracy: {accuracy:.1%}")
+    return accuracy
+
+
+def collect(telemetry, seconds):
+    """Raw RGB periods received over the next `seconds`."""
+    time.sleep(seconds)
+    window = telemetry.window(seconds)
+    return np.stack([window["red"], window["green"], window["blue"]], axis=1)
+
+
+def upload(link, centroids, acks):
+    """
+    Sends one FRAME_COLOR_CAL per colour and waits for the firmware to confirm each.
+
+    Args:
+        link (RobotLink): Connected link with the binary protocol up.
+        centroids (dict): Colour name -> (red, green, blue) periods.
+        acks (queue.Queue): Receives the status of every FRAME_COLOR_CAL config ACK.
+
+    Returns:
+        list: Names of the colours that were not confirmed with ACK_OK.
+    """
+    failed = []
+    for name, rgb in centroids.items():
+        link.send_frame(encode_color_calibration(TRACK_COLORS.index(name), rgb))
+        try:
+            status = acks.get(timeout=ACK_TIMEOUT)
+        except queue.Empty:
+            print(f"   {name}: no ACK within {ACK_TIMEOUT:.1f} s")
+            failed.append(name)
+            continue
+        if status != ACK_OK:
+            print(f"   {name}: rejected (status {status})")
+            failed.append(name)
+    return failed
+
+
+if __name__ == "__main__":
+    telemetry = TelemetryBuffer(capacity=4096)
+    cal_acks = queue.Queue()
+    link = RobotLink(SERIAL_PORT, BAUD_RATE, initial_command='0', on_frame=telemetry.on_frame,
+                     on_config_ack=lambda frame_type, status: (
+                         cal_acks.put(status) if frame_type == FRAME_COLOR_CAL else None),
+                     telemetry_interval_ms=TELEMETRY_INTERVAL_MS).start()
+    print("Waiting for the car...")
+    link.wait_connected()
+    if not link.binary:
+        raise SystemExit("❌ Firmware does not speak the binary protocol; upload Arduino_Code first.")
+
+    samples = {}
+    for name in CALIBRATED_COLORS:
+        input(f"\nPlace the colour sensor over {name} and press Enter...")
+        rgb = collect(telemetry, SAMPLE_SECONDS)
+        if len(rgb) == 0:
+            raise SystemExit("❌ No telemetry received.")
+        samples[name] = rgb
+        print(f"   {len(rgb)} samples, median {tuple(int(v) for v in np.median(rgb, axis=0))}")
+
+    centroids = fit_centroids(samples)
+    print("\nValidation (nearest centroid):")
+    evaluate(samples, centroids)
+
+    with open(CALIBRATION_FILE, "w") as f:
+        json.dump(centroids, f, indent=2)
+    print(f"💾 Saved {CALIBRATION_FILE}")
+
+    if input("Upload to the car's EEPROM? [y/N] ").strip().lower() == 'y':
+        failed = upload(link, centroids, cal_acks)
+        if failed:
+            print(f"❌ Calibration upload failed for {', '.join(failed)}; run the tool again.")
+        else:
+            print("✅ Calibration uploaded.")
+    link.close(stop_command='x')
@@ -0,0 +1,207 @@
+import threading
+import time
+from dataclasses import dataclass
+
+from latency_probe import LatencyProbe
+from telemetry import ultrasonic_guard
+
+# ================= MULTIMODAL COMMAND ARBITER =================
+# Vision, gesture and voice run as independent producers that only *propose*
+# commands from the shared w/s/a/d/x/0/1 vocabulary. The arbiter is the single
+# writer to the RobotLink: once per tick it picks one command from the live
+# proposals and sends it, so there is exactly one place where a decision is
+# made and measured.
+#
+# Rules (highest first):
+#   1. Mode: '0'/'1' switch Manual/Auto. In Auto the firmware drives itself and
+#      only an operator STOP (or an operator voice direction, which drops back to
+#      Manual) is forwarded. A mode command drops every drive proposal made
+#      before it.
+#   2. Operator input: the live proposal of the highest-priority source wins
+#      (voice > gesture > vision). Proposals expire after the source's TTL, so a
+#      lost hand or an old voice command falls back to the next source.
+#   3. Vetoes: FORWARD becomes STOP while vision sees the centre blocked or the
+#      ultrasonic sensor reports a close obstacle.
+#   4. If every proposal expires while the car is moving, a single STOP is sent.
+#
+# Each source is rate limited: a *different* command arriving sooner than
+# `min_interval` after the last accepted one is dropped (STOP is never dropped).
+
+MODE_COMMANDS = ('0', '1')
+DRIVE_COMMANDS = ('w', 's', 'a', 'd', 'x')
+MANUAL, AUTO = '0', '1'
+
+
+@dataclass
+class SourcePolicy:
+    """Arbitration settings of one producer."""
+    priority: int           # Higher wins among live proposals
+    ttl: float              # Seconds a proposal stays live without being refreshed
+    min_interval: float     # Rate limit between two different accepted commands
+    can_veto: bool = False  # A non-forward proposal from this source blocks FORWARD
+    operator: bool = True   # Direct human input (allowed to act in Auto mode)
+
+
+DEFAULT_POLICIES = {
+    "voice": SourcePolicy(priority=3, ttl=3.0, min_interval=0.5),
+    "gesture": SourcePolicy(priority=2, ttl=0.5, min_interval=0.1),
+    "vision": SourcePolicy(priority=1, ttl=0.5, min_interval=0.05, can_veto=True, operator=False),
+}
+
+
+@dataclass
+class Proposal:
+    cmd: str
+    text: str
+    at: float               # time.monotonic() of the latest refresh
+
+
+class CommandArbiter:
+    """
+    Args:
+        link (RobotLink): The only writer to the Arduino (None = dry run).
+        telemetry (TelemetryBuffer): Optional ultrasonic telemetry for the FORWARD veto.
+        policies (dict): Source name -> SourcePolicy.
+        probe (LatencyProbe): Records the 'arbitrate' and 'serial' stages of every tick.
+        mode (str): Initial mode, MANUAL ('0') or AUTO ('1').
+    """
+
+    def __init__(self, link, telemetry=None, policies=None, probe=None, mode=MANUAL):
+        self.link = link
+        self.telemetry = telemetry
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.probe = probe or LatencyProbe("arbiter")
+        self.mode = mode
+
+        self._proposals = {}                # source -> Proposal
+        self._last_accepted = {}            # source -> monotonic time of last command change
+        self._pending_mode = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._tick_id = 0
+
+        self.decision = ('None', "WAITING", None)   # (cmd, text, source)
+        self.accepted = {name: 0 for name in self.policies}
+        self.rate_limited = {name: 0 for name in self.policies}
+        self.vetoes = 0
+
+    # ---------- Producers ----------
+    def submit(self, source, cmd, text="", now=None):
+        """
+        Proposes `cmd` on behalf of `source`. Thread-safe and non-blocking.
+
+        Returns:
+            bool: False if the proposal was rejected (unknown command or rate limited).
+        """
+        now = time.monotonic() if now is None else now
+        policy = self.policies[source]
+        with self._lock:
+            if cmd in MODE_COMMANDS:
+                self._pending_mode = cmd
+                # Drive proposals made before the switch must not outlive it: a voice
+                # 'w' with a 3 s TTL would otherwise re-assert itself and leave Auto again
+                self._proposals.clear()
+                self.accepted[source] += 1
+                self._wake.set()
+                return True
+            if cmd not in DRIVE_COMMANDS:
+                return False
+
+            current = self._proposals.get(source)
+            if current is not None and current.cmd == cmd:
+                # Same command: just keep the proposal alive
+                current.at = now
+                return True
+            last = self._last_accepted.get(source)
+            if cmd != 'x' and last is not None and now - last < policy.min_interval:
+                self.rate_limited[source] += 1
+                return False
+
+            self._proposals[source] = Proposal(cmd, text, now)
+            self._last_accepted[source] = now
+            self.accepted[source] += 1
+        self._wake.set()
+        return True
+
+    def withdraw(self, source):
+        """Drops the live proposal of `source` (e.g. the producer stopped)."""
+        with self._lock:
+            self._proposals.pop(source, None)
+
+    # ---------- Scheduling point ----------
+    def decide(self, now=None):
+        """
+        Applies the priority rules to the live proposals.
+
+        Returns:
+            tuple: (Command Character or 'None', Descriptive String, winning source or None)
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            live = {src: p for src, p in self._proposals.items()
+                    if now - p.at <= self.policies[src].ttl}
+            mode, self._pending_mode = self._pending_mode, None
+
+        if mode is not None and mode != self.mode:
+            self.mode = mode
+            return mode, "AUTO MODE" if mode == AUTO else "MANUAL MODE", None
+
+        if not live:
+            if self.mode == MANUAL and self.decision[0] in ('w', 's', 'a', 'd'):
+                # Every source went quiet while the car was moving
+                return 'x', "STOP (NO INPUT)", None
+            return 'None', "WAITING", None
+        source = max(live, key=lambda s: self.policies[s].priority)
+        proposal = live[source]
+        cmd, text = proposal.cmd, proposal.text
+
+        if self.mode == AUTO:
+            if not self.policies[source].operator:
+                return 'None', "AUTO", None
+            if cmd != 'x' and source != "voice":
+                # A stray hand must not take the car out of Auto mode
+                return 'None', "AUTO", None
+
+        if cmd == 'w':
+            for other, p in live.items():
+                if other != source and self.policies[other].can_veto and p.cmd != 'w':
+                    self.vetoes += 1
+                    return 'x', f"STOP ({other.upper()} VETO)", other
+            cmd, overridden = ultrasonic_guard(cmd, self.telemetry)
+            if overridden:
+                self.vetoes += 1
+                return 'x', "STOP (ULTRASONIC)", source
+        return cmd, text, source
+
+    def tick(self, now=None):
+        """Runs one arbitration round and sends the result. Returns the decision."""
+        self._tick_id += 1
+        trace = self.probe.begin(self._tick_id)
+        cmd, text, source = self.decide(now)
+        trace.mark("arbitrate")
+
+        if cmd != 'None' and self.link is not None:
+            # Directions in Auto mode (voice only) force Manual first, as the voice script did
+            payload = cmd
+            if cmd in ('w', 's', 'a', 'd') and self.mode == AUTO:
+                payload = MANUAL + cmd
+            if self.link.send(payload):
+                print(f"📡 [{source or 'mode'}] {text} ({payload})")
+        if cmd in DRIVE_COMMANDS and self.mode == AUTO:
+            # The firmware leaves Auto mode on any manual command
+            self.mode = MANUAL
+        trace.mark("serial")
+        self.probe.finish(trace)
+        self.decision = (cmd, text, source)
+        return self.decision
+
+    def run(self, stop_event, rate_hz=50):
+        """
+        Ticks until `stop_event` is set: immediately after a new proposal, or at
+        `rate_hz` so expiring proposals are noticed without new input.
+        """
+        period = 1.0 / rate_hz
+        while not stop_event.is_set():
+            self._wake.wait(period)
+            self._wake.clear()
+            self.tick()
@@ -0,0 +1,159 @@
+import re
+from typing import NamedTuple
+
+# ================= VOICE COMMAND PARSER =================
+# Utterances are tokenized once and matched against a precompiled token trie of
+# command phrases (longest match wins, so "turn left" beats "left" and "go back"
+# beats "go"). On top of the matches:
+#   * negation: "don't go forward" / "do not turn left" drops that command;
+#   * last command wins: "forward, no wait, stop" -> stop;
+#   * durations: "left for two seconds then stop" becomes a timed sequence
+#     [('a', 2000), ('x', 0)] for RobotLink.send_sequence().
+
+COMMAND_PHRASES = {
+    'w': ["forward", "forwards", "go", "go forward", "go ahead", "ahead", "straight",
+          "go straight", "move forward", "drive"],
+    's': ["backward", "backwards", "back", "go back", "reverse", "back up", "move back"],
+    'a': ["left", "turn left", "go left", "hard left"],
+    'd': ["right", "turn right", "go right", "hard right"],
+    'x': ["stop", "halt", "freeze", "brake", "stay"],
+    '1': ["auto", "automatic", "autonomous", "auto mode"],
+    '0': ["manual", "manual mode"],
+}
+
+# "no" is left out on purpose: "no, stop" must still stop
+NEGATIONS = {"don't", "dont", "do not", "not", "never"}
+NEGATION_SCOPE = 3          # A negation applies to a command within this many tokens
+SEQUENCE_WORDS = {"then", "after", "afterwards", "next", "and"}
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "half": 0.5,
+}
+UNIT_MS = {
+    "second": 1000, "seconds": 1000, "sec": 1000, "secs": 1000, "s": 1000,
+    "millisecond": 1, "milliseconds": 1, "ms": 1,
+}
+MAX_DURATION_MS = 10000     # Longer requests are clamped (firmware auto-stop is u16)
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?|[.,;!?]")
+_END = object()             # Trie key marking a complete phrase
+
+
+class CommandStep(NamedTuple):
+    command: str
+    duration_ms: int = 0    # 0 = until the next command
+
+
+def tokenize(text):
+    return _TOKEN.findall(text.lower())
+
+
+def _build_trie(phrases):
+    trie = {}
+    for value, entries in phrases.items():
+        for phrase in entries:
+            node = trie
+            for token in phrase.split():
+                node = node.setdefault(token, {})
+            node[_END] = value
+    return trie
+
+
+COMMAND_TRIE = _build_trie(COMMAND_PHRASES)
+NEGATION_TRIE = _build_trie({True: NEGATIONS})
+
+
+def _longest_match(trie, tokens, start):
+    """(value, tokens consumed) of the longest phrase starting at `start`, or (None, 0)."""
+    node, value, length = trie, None, 0
+    for i in range(start, len(tokens)):
+        node = node.get(tokens[i])
+        if node is None:
+            break
+        if _END in node:
+            value, length = node[_END], i - start + 1
+    return value, length
+
+
+def _parse_number(token):
+    if token in NUMBER_WORDS:
+        return NUMBER_WORDS[token]
+    try:
+        return float(token)
+    except ValueError:
+        return None
+
+
+def _match_duration(tokens, start):
+    """Parses 'for two seconds' / 'for 500 ms' / 'for half a second' at `start`."""
+    if start >= len(tokens) or tokens[start] != "for":
+        return 0, 0
+    i = start + 1
+    amount = _parse_number(tokens[i]) if i < len(tokens) else None
+    if amount is None:
+        return 0, 0
+    i += 1
+    if amount == 0.5 and i < len(tokens) and tokens[i] in ("a", "an"):
+        i += 1      # "half a second"
+    if i < len(tokens) and tokens[i] in UNIT_MS:
+        ms = int(min(amount * UNIT_MS[tokens[i]], MAX_DURATION_MS))
+        return ms, i - start + 1
+    return 0, 0
+
+
+def parse_steps(text):
+    """
+    All non-negated commands in the utterance, in order.
+
+    Returns:
+        list: CommandStep(command, duration_ms)
+    """
+    tokens = tokenize(text)
+    steps = []
+    negated_until = -1
+    i = 0
+    while i < len(tokens):
+        negation, length = _longest_match(NEGATION_TRIE, tokens, i)
+        if negation:
+            negated_until = i + length - 1 + NEGATION_SCOPE
+            i += length
+            continue
+        command, length = _longest_match(COMMAND_TRIE, tokens, i)
+        if command is None:
+            if tokens[i] in ".,;!?" or tokens[i] in SEQUENCE_WORDS:
+                negated_until = -1      # A new clause ends the negation
+            i += 1
+            continue
+        negated = i <= negated_until
+        i += length
+        duration_ms, length = _match_duration(tokens, i)
+        i += length
+        if negated:
+            negated_until = -1
+            continue
+        steps.append(CommandStep(command, duration_ms))
+    return steps
+
+
+def compile_sequence(steps):
+    """
+    Applies last-command-wins: an untimed step is immediately superseded by the
+    step after it, so only timed steps and the final step survive. A sequence
+    ending in a timed motion gets an explicit stop.
+
+    Returns:
+        list: CommandStep sequence for RobotLink.send_sequence()
+    """
+    sequence = [s for i, s in enumerate(steps) if s.duration_ms or i == len(steps) - 1]
+    if sequence and sequence[-1].duration_ms and sequence[-1].command in "wsad":
+        sequence.append(CommandStep('x', 0))
+    return sequence
+
+
+def parse_command(text):
+    """
+    Returns:
+        list: Timed CommandStep sequence for the utterance (empty if no command).
+    """
+    return compile_sequence(parse_steps(text))
@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+
+from inference_backends import Detections
+from vision_planner import DANGER_LINE_RATIO
+
+# ================= ROI + FRAME-SKIPPING DETECTION SCHEDULER =================
+# get_drive_command only reacts to boxes whose bottom edge crosses the danger
+# line, so the detector only needs to see the lower band of the image. When that
+# band is static, full detection runs only every `full_every` frames and the
+# previous boxes are reused in between. Any significant change in the band
+# (something new entering the danger zone) forces detection on that same frame.
+
+
+class DetectionScheduler:
+    """
+    Wraps an inference backend and exposes the same `predict(frame) -> Detections`.
+
+    Args:
+        backend: Any object with `predict(frame) -> Detections` (see inference_backends).
+        roi_top_ratio (float): Top of the detection band as a fraction of frame height.
+            Kept a bit above the danger line so boxes straddling it are still found.
+        full_every (int): Maximum number of frames between detections in a static scene.
+        motion_threshold (float): Mean absolute grey-level difference (0-255) in the
+            band that counts as "scene changed".
+        motion_size (tuple): Size (w, h) of the thumbnail used for frame differencing.
+    """
+
+    def __init__(self, backend, roi_top_ratio=DANGER_LINE_RATIO - 0.15, full_every=5,
+                 motion_threshold=6.0, motion_size=(64, 24)):
+        self.backend = backend
+        self.names = getattr(backend, "names", {})
+        self.roi_top_ratio = roi_top_ratio
+        self.full_every = max(1, full_every)
+        self.motion_threshold = motion_threshold
+        self.motion_size = motion_size
+
+        self._reference = None      # thumbnail of the band at the last detection
+        self._last = None           # last Detections, in full-frame coordinates
+        self._since_detect = 0
+        self.detections_run = 0
+        self.frames_seen = 0
+
+    def _thumbnail(self, band):
+        small = cv2.resize(band, self.motion_size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def motion_score(self, thumb):
+        """Mean absolute difference against the band at the last detection."""
+        if self._reference is None:
+            return float("inf")
+        return float(np.abs(thumb - self._reference).mean())
+
+    def predict(self, frame):
+        self.frames_seen += 1
+        h = frame.shape[0]
+        y0 = int(h * self.roi_top_ratio)
+        band = frame[y0:]
+        thumb = self._thumbnail(band)
+
+        # Reuse previous boxes while the band is static and the refresh budget allows
+        if (self._last is not None and self._since_detect < self.full_every - 1
+                and self.motion_score(thumb) < self.motion_threshold):
+            self._since_detect += 1
+            return self._last
+
+        det = self.backend.predict(np.ascontiguousarray(band))
+        xyxy = det.xyxy.copy()
+        xyxy[:, [1, 3]] += y0   # shift back into full-frame coordinates
+
+        self._last = Detections(xyxy, det.conf, det.cls, det.names or self.names)
+        self._reference = thumb
+        self._since_detect = 0
+        self.detections_run += 1
+        return self._last
+
+    @property
+    def skip_ratio(self):
+        """Fraction of frames served from the previous detection."""
+        if self.frames_seen == 0:
+            return 0.0
+        return 1.0 - self.detections_run / self.frames_seen
@@ -0,0 +1,175 @@
+import os
+import pty
+import select
+import struct
+import threading
+import time
+import tty
+
+from robot_protocol import (ACK_OK, ACK_UNKNOWN, FRAME_ACK, FRAME_BAUD, FRAME_CMD, FRAME_SYNC,
+                            FRAME_COLOR_CAL, FRAME_CONFIG_ACK, FRAME_DRIVE, FRAME_TELEMETRY,
+                            FRAME_TELEMETRY_CFG, FULL_POWER, FrameParser, encode_frame)
+from telemetry import MOTOR_STATES, TELEMETRY_FORMAT, TRACK_COLORS
+
+# ================= PTY STAND-IN FOR THE ARDUINO =================
+# Emulates the serial side of Arduino_Code on a pseudo-terminal so RobotLink and
+# the controllers can be exercised on Linux without hardware:
+#
+#   python fake_arduino.py          # prints a /dev/pts/N path to use as SERIAL_PORT
+#
+# It speaks both the legacy single-character protocol and the framed binary
+# protocol (ACKs, FRAME_BAUD negotiation, PWM and timed commands, telemetry
+# frames built from the settable `distance_cm` / `color_raw`), and records
+# every command it executes in `commands` for assertions and latency checks.
+
+KNOWN_COMMANDS = "01wsadx"
+
+
+class FakeArduino:
+    """
+    Args:
+        ack_delay (float): Artificial processing delay before each ACK, in seconds.
+        drop_every (int): Silently drop every Nth binary frame (0 = never) to
+            exercise retransmission.
+    """
+
+    def __init__(self, ack_delay=0.0, drop_every=0):
+        self.ack_delay = ack_delay
+        self.drop_every = drop_every
+
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+
+        self.mode = 0
+        self.stage = 0
+        self.motor = ('x', 0)                  # (current motion command, pwm)
+        self.wheels = (0, 0)                   # Last DRIVE frame (left, right)
+        self.baud_rate = 9600
+        self.commands = []                     # (monotonic time, cmd, pwm, duration_ms)
+        self.frames_seen = 0
+        self.distance_cm = 80.0                # What getDist() would report
+        self.color_raw = (120, 140, 130)       # Raw TCS3200 periods (red, green, blue)
+        self.color = "WHITE"                   # What getColor() would classify
+        self.color_calibration = {}            # color index -> (r, g, b) or "sampled"
+        self.telemetry_interval_ms = 0
+
+        self._deadline = None
+        self._last_telemetry = 0.0
+        self._parser = FrameParser()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="fake-arduino", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        self.println("===== OFF-ROAD MODE READY =====")
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def println(self, text):
+        os.write(self.master_fd, (text + "\r\n").encode())
+
+    def send_frame(self, frame_type, payload):
+        os.write(self.master_fd, encode_frame(frame_type, payload))
+
+    # ---------- Firmware behaviour ----------
+    def handle_command(self, cmd, pwm=FULL_POWER, duration_ms=0):
+        if cmd not in KNOWN_COMMANDS:
+            return False
+        self.commands.append((time.monotonic(), cmd, pwm, duration_ms))
+        if cmd == '0':
+            self.mode, self.stage, self.motor = 0, 0, ('x', 0)
+            self.println("SYSTEM RESET -> STAGE 0")
+        elif cmd == '1':
+            self.mode = 1
+        else:
+            if cmd == 'x':
+                self.mode = 0       # Like the firmware: a stop also leaves autonomous mode
+            self.motor = (cmd, 0 if cmd == 'x' else pwm)
+        self._deadline = (time.monotonic() + duration_ms / 1000.0
+                          if duration_ms and cmd != 'x' else None)
+        return True
+
+    def handle_drive(self, left, right, duration_ms=0):
+        """DRIVE frame: recorded in `commands` as ('v', (left, right), duration_ms)."""
+        self.commands.append((time.monotonic(), 'v', (left, right), duration_ms))
+        self.wheels = (left, right)
+        self.motor = ('x', 0) if left == 0 and right == 0 else ('v', max(abs(left), abs(right)))
+        self._deadline = time.monotonic() + duration_ms / 1000.0 if duration_ms else None
+
+    def _handle_frame(self, frame_type, payload):
+        self.frames_seen += 1
+        if self.drop_every and self.frames_seen % self.drop_every == 0:
+            return
+        if self.ack_delay:
+            time.sleep(self.ack_delay)
+        if frame_type == FRAME_CMD and len(payload) == 5:
+            seq, cmd, pwm, duration = struct.unpack("<BcBH", payload)
+            known = self.handle_command(cmd.decode(errors="replace"), pwm, duration)
+            self.send_frame(FRAME_ACK, bytes([seq, ACK_OK if known else ACK_UNKNOWN]))
+        elif frame_type == FRAME_DRIVE and len(payload) == 7:
+            seq, left, right, duration = struct.unpack("<BhhH", payload)
+            self.handle_drive(left, right, duration)
+            self.send_frame(FRAME_ACK, bytes([seq, ACK_OK]))
+        elif frame_type == FRAME_TELEMETRY_CFG and len(payload) == 2:
+            self.telemetry_interval_ms = struct.unpack("<H", payload)[0]
+            self.send_frame(FRAME_CONFIG_ACK, bytes([FRAME_TELEMETRY_CFG, ACK_OK]))
+        elif frame_type == FRAME_COLOR_CAL and len(payload) in (1, 7):
+            self.color_calibration[payload[0]] = (struct.unpack("<HHH", payload[1:])
+                                                  if len(payload) == 7 else self.color_raw)
+            self.send_frame(FRAME_CONFIG_ACK, bytes([FRAME_COLOR_CAL, ACK_OK]))
+        elif frame_type == FRAME_BAUD and len(payload) == 4:
+            self.send_frame(FRAME_CONFIG_ACK, bytes([FRAME_BAUD, ACK_OK]))
+            self.baud_rate = struct.unpack("<I", payload)[0]
+
+    def _send_telemetry(self):
+        motion = {'x': "STOP", 'w': "FORWARD", 's': "BACKWARD", 'a': "HARD_LEFT", 'd': "HARD_RIGHT"}
+        cmd, pwm = self.motor
+        motor = MOTOR_STATES.index("PWM" if cmd == 'v' or (cmd != 'x' and pwm < FULL_POWER)
+                                   else motion[cmd])
+        payload = struct.pack(TELEMETRY_FORMAT, int(time.monotonic() * 1000) & 0xFFFFFFFF,
+                              int(self.distance_cm * 10), *self.color_raw,
+                              self.mode, self.stage, 0, motor, TRACK_COLORS.index(self.color))
+        self.send_frame(FRAME_TELEMETRY, payload)
+
+    def _run(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if self._deadline is not None and now >= self._deadline:
+                self._deadline = None
+                self.motor = ('x', 0)
+            if self.telemetry_interval_ms and now - self._last_telemetry >= self.telemetry_interval_ms / 1000.0:
+                self._last_telemetry = now
+                self._send_telemetry()
+            ready, _, _ = select.select([self.master_fd], [], [], 0.002)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master_fd, 256)
+            except OSError:
+                break
+            # Bytes outside a frame are legacy single-character commands
+            for b in data:
+                if not self._parser.in_frame and b != FRAME_SYNC:
+                    self.handle_command(chr(b))
+                    continue
+                for event in self._parser.feed(bytes([b])):
+                    if event[0] == "frame":
+                        self._handle_frame(event[1], event[2])
+
+
+if __name__ == "__main__":
+    fake = FakeArduino().start()
+    print(f"🤖 Fake Arduino listening on {fake.port} (Ctrl+C to quit)")
+    try:
+        while True:
+            time.sleep(1.0)
+            print(f"   mode={fake.mode} motor={fake.motor} baud={fake.baud_rate} "
+                  f"commands={len(fake.commands)}")
+    except KeyboardInterrupt:
+        fake.close()
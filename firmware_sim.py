@@ -0,0 +1,245 @@
+# ================= HOST-SIDE SIMULATOR OF THE FIRMWARE STATE MACHINE =================
+# A line-by-line Python mirror of loop() / competitionRun() / advanceRun() in
+# Arduino_Code, driven by a virtual millisecond clock instead of millis(). It lets
+# the timing of the autonomous sequences, and how quickly serial commands are
+# honoured while they run, be checked on Linux without a car:
+#
+#   python firmware_sim.py
+#
+# Keep the state names, durations and transitions in sync with the firmware.
+
+RUN_DECIDE = 0
+RUN_PULSE = 1
+RUN_GREEN_SLOW = 2
+RUN_STAGE_PUSH = 3
+RUN_STAGE_TURN = 4
+RUN_PICKUP_STOP = 5
+AVOID_STOP = 6
+AVOID_REVERSE = 7
+AVOID_ROTATE = 8
+AVOID_DRIVE_OUT = 9
+AVOID_RETURN_TURN = 10
+AVOID_RETURN_FWD = 11
+AVOID_SEARCH_TURN = 12
+AVOID_SEARCH_FWD = 13
+
+MOTION_COMMANDS = {'w': "forward", 's': "backward", 'a': "hardLeft", 'd': "hardRight"}
+
+
+class FirmwareSim:
+    """
+    Args:
+        sensors (callable): sensors(now_ms) -> (distance_cm, color_name), as getDist()/getColor().
+        tick_ms (int): Virtual duration of one loop() pass (sensor reads dominate it).
+    """
+
+    def __init__(self, sensors, tick_ms=5):
+        self.sensors = sensors
+        self.tick_ms = tick_ms
+        self.now = 0
+
+        self.mode = 0
+        self.stage = 0
+        self.run_state = RUN_DECIDE
+        self.state_start = 0
+        self.state_duration = 0
+        self.phase_start = 0
+        self.cmd_deadline = 0
+        self.last_dist = 0.0
+        self.last_color = ""
+
+        self.motor = "stopMotor"
+        self.motor_log = [(0, "stopMotor")]     # (ms, motor function) on every change
+        self.serial_log = []                    # (ms, Serial.println text)
+        self.command_log = []                   # (arrived_ms, handled_ms, cmd)
+        self._rx = []                           # (arrival_ms, cmd) not yet read
+
+    # ---------- Hardware stand-ins ----------
+    def _drive(self, action):
+        if action != self.motor:
+            self.motor = action
+            self.motor_log.append((self.now, action))
+
+    def _println(self, text):
+        self.serial_log.append((self.now, text))
+
+    def receive(self, cmd, at_ms=None):
+        """Queues a serial command byte arriving at `at_ms` (default: now)."""
+        self._rx.append((self.now if at_ms is None else at_ms, cmd))
+
+    # ---------- Firmware logic ----------
+    def _enter(self, state, duration):
+        self.run_state = state
+        self.state_start = self.now
+        self.state_duration = duration
+
+    def _elapsed(self):
+        return self.now - self.state_start >= self.state_duration
+
+    def handle_command(self, cmd, duration=0):
+        if cmd == '0':
+            self.mode, self.stage = 0, 0
+            self.run_state = RUN_DECIDE
+            self._drive("stopMotor")
+            self._println("SYSTEM RESET -> STAGE 0")
+            return True
+        if cmd == '1':
+            self.mode = 1
+            self.run_state = RUN_DECIDE
+            return True
+        if cmd in MOTION_COMMANDS:
+            self._drive(MOTION_COMMANDS[cmd])
+        elif cmd == 'x':
+            self.mode = 0
+            self._drive("stopMotor")
+        else:
+            return False
+        self.run_state = RUN_DECIDE
+        self.cmd_deadline = self.now + duration if duration > 0 and cmd != 'x' else 0
+        return True
+
+    def _poll_serial(self):
+        arrived = [item for item in self._rx if item[0] <= self.now]
+        self._rx = [item for item in self._rx if item[0] > self.now]
+        for arrival, cmd in arrived:
+            if self.handle_command(cmd):
+                self.command_log.append((arrival, self.now, cmd))
+
+    def loop(self):
+        """One pass of loop(); advances the virtual clock by `tick_ms`."""
+        self._poll_serial()
+        if self.cmd_deadline and self.now >= self.cmd_deadline:
+            self.cmd_deadline = 0
+            self._drive("stopMotor")
+        if self.mode == 1:
+            self.last_dist, self.last_color = self.sensors(self.now)
+            self.competition_run()
+        self.now += self.tick_ms
+
+    def run(self, until_ms):
+        while self.now < until_ms:
+            self.loop()
+        return self
+
+    def competition_run(self):
+        if self.run_state != RUN_DECIDE:
+            if self._elapsed():
+                self.advance_run()
+            return
+
+        dist, color = self.last_dist, self.last_color
+
+        if self.stage == 0:
+            if color == "BLACK":
+                self._drive("softLeft")
+                self._enter(RUN_PULSE, 35)
+            elif color == "WHITE":
+                self._drive("softRight")
+                self._enter(RUN_PULSE, 40)
+            elif color == "RED":
+                self._println("ENTERING STAGE 1")
+                self._drive("forward")
+                self._enter(RUN_STAGE_PUSH, 250)
+            return
+
+        if color == "BLACK" or 1 < dist < 15:
+            self._println(">>> OFF-ROAD OBSTACLE AVOIDANCE")
+            self._drive("stopMotor")
+            self._enter(AVOID_STOP, 100)
+            return
+
+        if color == "BLUE":
+            self._drive("stopMotor")
+            self._enter(RUN_PICKUP_STOP, 3000)
+            return
+
+        if color == "GREEN":
+            self._drive("softLeft")
+            self._enter(RUN_GREEN_SLOW, 30)
+        elif color == "RED":
+            self._drive("softLeft")
+            self._enter(RUN_PULSE, 35)
+        else:
+            self._drive("softRight")
+            self._enter(RUN_PULSE, 40)
+
+    def advance_run(self):
+        s = self.run_state
+        if s == RUN_GREEN_SLOW:
+            self._drive("stopMotor")
+            self._enter(RUN_PULSE, 20)
+        elif s == RUN_STAGE_PUSH:
+            self._drive("hardLeft")
+            self._enter(RUN_STAGE_TURN, 2800)
+        elif s == RUN_STAGE_TURN:
+            self.stage = 1
+            self.run_state = RUN_DECIDE
+        elif s == RUN_PICKUP_STOP:
+            self._drive("forward")
+            self._enter(RUN_PULSE, 500)
+        elif s == AVOID_STOP:
+            self._drive("backward")
+            self._enter(AVOID_REVERSE, 450)
+        elif s == AVOID_REVERSE:
+            self._println(">>> ROTATING LEFT")
+            self._drive("hardLeft")
+            self._enter(AVOID_ROTATE, 2800)
+        elif s == AVOID_ROTATE:
+            self._println(">>> DRIVING OUT")
+            self._drive("forward")
+            self._enter(AVOID_DRIVE_OUT, 1200)
+        elif s == AVOID_DRIVE_OUT:
+            self._println(">>> SEGMENTED RETURN")
+            self.phase_start = self.now
+            self._drive("hardRight")
+            self._enter(AVOID_RETURN_TURN, 200)
+        elif s == AVOID_RETURN_TURN:
+            self._drive("forward")
+            self._enter(AVOID_RETURN_FWD, 350)
+        elif s == AVOID_RETURN_FWD:
+            if self.now - self.phase_start < 2500:
+                self._drive("hardRight")
+                self._enter(AVOID_RETURN_TURN, 200)
+            else:
+                self._println(">>> SEARCHING TRACK")
+                self.phase_start = self.now
+                self._drive("hardRight")
+                self._enter(AVOID_SEARCH_TURN, 200)
+        elif s == AVOID_SEARCH_TURN:
+            self._drive("forward")
+            self._enter(AVOID_SEARCH_FWD, 300)
+        elif s == AVOID_SEARCH_FWD:
+            if self.last_color == "RED" or self.now - self.phase_start > 6000:
+                self._drive("stopMotor")
+                self._enter(RUN_PULSE, 100)
+            else:
+                self._drive("hardRight")
+                self._enter(AVOID_SEARCH_TURN, 200)
+        else:
+            self.run_state = RUN_DECIDE
+
+    # ---------- Reporting ----------
+    def command_latencies(self):
+        """Milliseconds between each command's arrival and the loop pass that handled it."""
+        return [handled - arrived for arrived, handled, _ in self.command_log]
+
+
+if __name__ == "__main__":
+    # Scenario: stage 1, obstacle at 10 cm from t=1 s, emergency stop mid-avoidance
+    def sensors(now_ms):
+        return (10.0 if 1000 <= now_ms < 1100 else 80.0), "WHITE"
+
+    sim = FirmwareSim(sensors, tick_ms=5)
+    sim.stage = 1
+    sim.receive('1', at_ms=0)
+    sim.receive('x', at_ms=2003)   # during the 2800 ms pivot
+    sim.run(4000)
+
+    for t, action in sim.motor_log:
+        print(f"{t:6d} ms  {action}")
+    for t, text in sim.serial_log:
+        print(f"{t:6d} ms  [serial] {text}")
+    worst = max(sim.command_latencies())
+    print(f"Worst command latency: {worst} ms (loop period {sim.tick_ms} ms)")
+    assert worst <= sim.tick_ms, "command was not handled within one loop period"
+    assert sim.motor == "stopMotor" and sim.mode == 0
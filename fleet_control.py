@@ -0,0 +1,170 @@
+import os
+import threading
+import time
+
+from robot_serial import RobotLink
+from telemetry import TelemetryBuffer, ultrasonic_guard
+from latency_probe import LatencyProbe
+from inference_pool import InferencePool, default_workers
+from vision_planner import TrackingPlanner
+from vision_pipeline import frame_time_of
+
+# ================= FLEET CONFIGURATION =================
+# Several cars driven by one process: every car has its own camera and serial
+# port, and all cameras share one pool of YOLO worker processes (see
+# inference_pool.py). Decisions are routed back to the car the frame came from.
+#
+#   camera: int camera index, a video file, or a replay.py recording directory
+#   port:   serial port, or "fake" for a pty-backed FakeArduino (no hardware)
+FLEET = [
+    {"name": "car1", "camera": 1, "port": "/dev/cu.usbmodem101"},
+    {"name": "car2", "camera": 2, "port": "/dev/cu.usbmodem201"},
+]
+BAUD_RATE = 9600
+
+INFERENCE = dict(name="torch", weights="yolov8n.pt", imgsz=640, conf=0.35)
+WORKERS = default_workers()     # One worker per two cores
+BATCH_SIZE = len(FLEET)         # One frame of every car per predict call
+RUN_SECONDS = 0                 # Stop after this long (0 = until Ctrl+C / end of replays)
+TRACE_FILE = None               # '{name}' is replaced by the car name, e.g. 'fleet_{name}.json'
+
+# =================================================
+
+
+class Car:
+    """Camera, serial link, telemetry and latency probe of one vehicle."""
+
+    def __init__(self, index, config):
+        self.index = index
+        self.name = config["name"]
+        self.cap = open_camera(config["camera"])
+        # Only recordings are processed frame by frame; a video file is a live-like source
+        self.replay = is_recording(config["camera"])
+        success, frame = self.cap.read()
+        if not success:
+            raise RuntimeError(f"{self.name}: camera {config['camera']!r} delivered no frame")
+        self.first_frame = frame
+
+        self.fake = None
+        port = config["port"]
+        if port == "fake":
+            from fake_arduino import FakeArduino
+            self.fake = FakeArduino().start()
+            port = self.fake.port
+        self.probe = LatencyProbe(self.name)
+        self.telemetry = TelemetryBuffer()
+        self.planner = TrackingPlanner()
+        # The fake board has no bootloader to wait for
+        options = dict(reset_delay=0) if self.fake else {}
+        self.link = RobotLink(port, BAUD_RATE, initial_command='0',
+                              on_frame=self.telemetry.on_frame,
+                              on_ack=lambda seq, rtt: self.probe.record("serial_ack", rtt),
+                              telemetry_interval_ms=100, **options).start()
+        self.source = None
+        self.finished = False
+        self.frames_read = 0
+
+    def close(self):
+        self.cap.release()
+        self.link.close(stop_command='x')
+        if self.fake:
+            self.fake.close()
+
+
+def is_recording(camera):
+    """True for a replay.py recording directory (not a camera index or video file)."""
+    return isinstance(camera, str) and os.path.isdir(camera)
+
+
+def open_camera(camera):
+    if is_recording(camera):
+        from replay import ReplayCapture
+        return ReplayCapture(camera)
+    import cv2
+    cap = cv2.VideoCapture(camera)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def capture_loop(car, pool, stop_event):
+    """Feeds the car's newest frames into the pool; frames are dropped while it is busy."""
+    frame = car.first_frame
+    while not stop_event.is_set():
+        if frame is None:
+            success, frame = car.cap.read()
+            if not success:
+                if car.replay:
+                    break       # End of the recording
+                time.sleep(0.005)
+                frame = None
+                continue
+        car.frames_read += 1
+        # A recording is processed frame by frame: wait for a slot instead of dropping
+        now = time.monotonic()
+        pool.submit(car.source, frame, car.frames_read, now, block=car.replay,
+                    frame_time=frame_time_of(car.cap, now))
+        frame = None
+    car.finished = True
+
+
+def dispatch(car, result, frame_shape):
+    """Planner + ultrasonic guard for one inferred frame, sent to that car's link."""
+    trace = car.probe.begin(result.frame_id, start=result.captured_at)
+    trace.add("queue_wait", result.captured_at, result.infer_started_at)
+    trace.add("inference", result.infer_started_at, result.inferred_at)
+    trace.mark("handoff")
+    h, w = frame_shape[:2]
+    cmd_char, cmd_text = car.planner.update(result.xyxy, w, h, now=result.frame_time)
+    cmd_char, overridden = ultrasonic_guard(cmd_char, car.telemetry)
+    if overridden:
+        cmd_text = "STOP (ULTRASONIC)"
+    trace.mark("decision")
+    if car.link.send(cmd_char):
+        print(f"📡 [{car.name}] {cmd_text} ({cmd_char})")
+    trace.mark("serial")
+    car.probe.finish(trace)
+
+
+# ================= MAIN =================
+if __name__ == "__main__":
+    cars = [Car(i, config) for i, config in enumerate(FLEET)]
+    pool = InferencePool(INFERENCE, workers=WORKERS, batch_size=BATCH_SIZE)
+    for car in cars:
+        car.source = pool.add_source(car.first_frame.shape)
+    pool.start()
+
+    stop_event = threading.Event()
+    threads = [threading.Thread(target=capture_loop, args=(car, pool, stop_event),
+                                name=f"capture-{car.name}", daemon=True) for car in cars]
+    for t in threads:
+        t.start()
+
+    print(f"🚀 Fleet control started ({', '.join(car.name for car in cars)}). Ctrl+C to exit.")
+    started = time.monotonic()
+    try:
+        while not RUN_SECONDS or time.monotonic() - started < RUN_SECONDS:
+            result = pool.get(timeout=0.5)
+            if result is not None:
+                car = cars[result.source]
+                dispatch(car, result, car.first_frame.shape)
+            elif all(car.finished for car in cars) and not pool.in_flight():
+                break   # Every replay has been processed
+    except KeyboardInterrupt:
+        pass
+
+    # --- Resource Cleanup ---
+    elapsed = time.monotonic() - started
+    stop_event.set()
+    for t in threads:
+        t.join(timeout=2.0)
+    stats = [pool.stats(car.source) for car in cars]
+    pool.close()
+    for car in cars:
+        car.close()
+    print(f"🔒 Fleet stopped after {elapsed:.1f} s: {pool.completed} frames in "
+          f"{pool.batches:.0f} batches ({pool.completed / max(elapsed, 1e-9):.1f} FPS total)")
+    for car, (submitted, dropped) in zip(cars, stats):
+        print(f"   {car.name}: {submitted} frames inferred, {dropped} dropped (pool busy)")
+        car.probe.print_summary()
+        if TRACE_FILE:
+            car.probe.dump(TRACE_FILE.format(name=car.name))
@@ -0,0 +1,95 @@
+import numpy as np
+
+# ================= VECTORIZED HAND LANDMARK FEATURES =================
+# MediaPipe landmarks are converted once into a (21, 3) array; finger states are
+# then a handful of vectorized comparisons and the 5-bit pattern is decoded with
+# a precomputed 32-entry lookup table instead of a chain of list comparisons.
+
+FINGER_TIPS = np.array([8, 12, 16, 20])
+FINGER_PIPS = FINGER_TIPS - 2
+THUMB_TIP, THUMB_IP = 4, 3
+PINKY_MCP = 17
+
+# Bit weights: thumb is the most significant bit, pinky the least ([thumb..pinky])
+BIT_WEIGHTS = np.array([16, 8, 4, 2, 1], dtype=np.int32)
+
+UNKNOWN_GESTURE = ("UNKNOWN", "None")
+
+
+def _build_gesture_table():
+    table = [UNKNOWN_GESTURE] * 32
+    patterns = {
+        # STOP: All fingers closed (Fist)
+        (0, 0, 0, 0, 0): ("STOP (0)", "x"),
+        # FORWARD: Five fingers open (allows minor thumb detection error)
+        (1, 1, 1, 1, 1): ("FORWARD (5)", "w"),
+        (0, 1, 1, 1, 1): ("FORWARD (5)", "w"),
+        # HARD LEFT: Index and Middle fingers open (Scissors gesture)
+        (0, 1, 1, 0, 0): ("HARD LEFT (2)", "a"),
+        # HARD RIGHT: Index, Middle, and Ring fingers open
+        (0, 1, 1, 1, 0): ("HARD RIGHT (3)", "d"),
+        # BACKWARD: Only thumb open (Thumbs-up gesture)
+        (1, 0, 0, 0, 0): ("BACKWARD (1)", "s"),
+    }
+    for bits, gesture in patterns.items():
+        table[int(np.dot(bits, BIT_WEIGHTS))] = gesture
+    return tuple(table)
+
+
+GESTURE_TABLE = _build_gesture_table()
+
+
+def landmarks_to_array(hand_lms):
+    """Converts a MediaPipe NormalizedLandmarkList into a (21, 3) float32 array."""
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_lms.landmark], dtype=np.float32)
+
+
+def handedness_label(multi_handedness, index):
+    """'Left' / 'Right' for hand `index` from results.multi_handedness, or None."""
+    if not multi_handedness or index >= len(multi_handedness):
+        return None
+    return multi_handedness[index].classification[0].label
+
+
+def finger_states(points, handedness=None):
+    """
+    Computes [thumb, index, middle, ring, pinky] open/closed states.
+
+    Args:
+        points (np.ndarray): (21, 3) landmark array (normalized image coordinates).
+        handedness (str): 'Left' or 'Right' as reported by MediaPipe on the mirrored
+            image. When None, the thumb is judged relative to the pinky knuckle,
+            which works for either hand.
+
+    Returns:
+        np.ndarray: int32 array of 5 bits.
+    """
+    # Other 4 Fingers: tip above the PIP joint (Y-axis increases downwards)
+    fingers = (points[FINGER_TIPS, 1] < points[FINGER_PIPS, 1]).astype(np.int32)
+
+    # Thumb: tip further out than the IP joint along X, direction depends on the hand
+    tip_x, ip_x = points[THUMB_TIP, 0], points[THUMB_IP, 0]
+    if handedness == "Right":
+        thumb = tip_x < ip_x
+    elif handedness == "Left":
+        thumb = tip_x > ip_x
+    else:
+        pinky_x = points[PINKY_MCP, 0]
+        thumb = abs(tip_x - pinky_x) > abs(ip_x - pinky_x)
+
+    return np.concatenate(([np.int32(thumb)], fingers))
+
+
+def pattern_index(fingers):
+    """5-bit pattern -> 0..31 index into GESTURE_TABLE."""
+    return int(np.dot(np.asarray(fingers, dtype=np.int32), BIT_WEIGHTS))
+
+
+def classify_fingers(fingers):
+    """
+    Decodes the finger state bits into a vehicle movement command.
+
+    Returns:
+        tuple: (Display String, Command Character)
+    """
+    return GESTURE_TABLE[pattern_index(fingers)]
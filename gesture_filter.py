@@ -0,0 +1,113 @@
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+from gesture_features import FINGER_PIPS, FINGER_TIPS, THUMB_IP, THUMB_TIP
+
+# ================= TEMPORAL GESTURE SMOOTHING / DEBOUNCE =================
+# Single-frame classifications flicker (e.g. [0,1,1,0,0] <-> [0,1,1,1,0] sends
+# alternating 'a'/'d'). The filter keeps the last M classifications and only
+# switches the active command once a new one wins N of them with enough
+# confidence (hysteresis: the active command holds until then). If the hand is
+# lost for `hold_to_stop` seconds it issues a single STOP.
+#
+# With N=3 a clean gesture change is committed on its 3rd frame, i.e. it adds
+# two frames of latency.
+
+WRIST = 0
+MIDDLE_MCP = 9
+STOP_COMMAND = ('x', "STOP (NO HAND)")
+
+
+def gesture_confidence(points, fingers, full_margin=0.12):
+    """
+    Confidence in a finger-state pattern from landmark geometry.
+
+    Each finger's margin is how far its tip is from the joint it is compared
+    against, relative to hand size (wrist -> middle knuckle). A finger sitting
+    right on the threshold gives ~0; a clearly open or closed finger gives 1.
+    The pattern is only as trustworthy as its most ambiguous finger.
+
+    Returns:
+        float: 0.0 - 1.0
+    """
+    hand_size = float(np.linalg.norm(points[MIDDLE_MCP, :2] - points[WRIST, :2])) or 1e-6
+    margins = np.abs(points[FINGER_TIPS, 1] - points[FINGER_PIPS, 1])
+    thumb_margin = abs(points[THUMB_TIP, 0] - points[THUMB_IP, 0])
+    margins = np.append(margins, thumb_margin) / hand_size
+    return float(np.clip(margins / full_margin, 0.0, 1.0).min())
+
+
+class GestureFilter:
+    """
+    N-of-M vote with hysteresis and a hold-to-stop timeout.
+
+    Args:
+        window (int): M, number of recent frames considered.
+        min_votes (int): N, frames in the window that must agree to switch command.
+        min_confidence (float): Frames below this confidence do not vote.
+        hold_to_stop (float): Seconds without a hand before STOP is issued (None = never).
+    """
+
+    def __init__(self, window=5, min_votes=3, min_confidence=0.3, hold_to_stop=0.5):
+        self.window = deque(maxlen=window)
+        self.min_votes = min_votes
+        self.min_confidence = min_confidence
+        self.hold_to_stop = hold_to_stop
+
+        self.active = None              # (cmd_char, display_text) currently in effect
+        self._last_hand = None
+        self._stopped_for_loss = False
+        self.frames = 0
+        self.switches = 0
+
+    def update(self, cmd_char, display_text, confidence=1.0, now=None):
+        """
+        Feeds one frame's classification.
+
+        Returns:
+            tuple or None: (cmd_char, display_text) when the active command changes.
+        """
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        self._last_hand = now
+        self._stopped_for_loss = False
+
+        vote = (cmd_char, display_text) if cmd_char != "None" and confidence >= self.min_confidence else None
+        self.window.append(vote)
+
+        counts = Counter(v for v in self.window if v is not None)
+        if not counts:
+            return None
+        leader, votes = counts.most_common(1)[0]
+        if votes >= self.min_votes and leader[0] != (self.active[0] if self.active else None):
+            self.active = leader
+            self.switches += 1
+            return leader
+        return None
+
+    def update_no_hand(self, now=None):
+        """
+        Called on frames without a hand.
+
+        Returns:
+            tuple or None: STOP_COMMAND once the hand has been gone for `hold_to_stop`.
+        """
+        now = time.monotonic() if now is None else now
+        self.window.append(None)
+        if self.hold_to_stop is None or self._stopped_for_loss:
+            return None
+        if self._last_hand is None or now - self._last_hand < self.hold_to_stop:
+            return None
+        self._stopped_for_loss = True
+        self.window.clear()
+        if self.active and self.active[0] == 'x':
+            return None
+        self.active = STOP_COMMAND
+        self.switches += 1
+        return STOP_COMMAND
+
+    @property
+    def display_text(self):
+        return self.active[1] if self.active else "WAITING"
@@ -0,0 +1,73 @@
+import numpy as np
+
+# ================= HAND ROI TRACKING FOR MEDIAPIPE =================
+# Once a hand has been found, the next frames only send a crop around its last
+# bounding box (plus a margin) to hands.process, which is far fewer pixels than
+# the full frame. Landmarks come back normalized to the crop and are mapped back
+# to full-frame normalized coordinates in place, so drawing and finger-state
+# logic are unchanged. After `max_misses` frames without a hand in the crop the
+# tracker falls back to the full frame.
+
+
+class HandRoiTracker:
+    """
+    Args:
+        margin (float): Padding around the last hand box, as a fraction of its size.
+        min_size (float): Minimum crop side as a fraction of the frame's shorter side,
+            so a small or partially visible hand still has room to move.
+        max_misses (int): Consecutive empty crops before searching the full frame again.
+    """
+
+    def __init__(self, margin=0.4, min_size=0.3, max_misses=2):
+        self.margin = margin
+        self.min_size = min_size
+        self.max_misses = max_misses
+        self.box = None          # (x0, y0, x1, y1) normalized to the full frame
+        self.misses = 0
+
+    def crop(self, img):
+        """
+        Returns:
+            tuple: (image to process, pixel ROI (x0, y0, x1, y1) or None for the full frame)
+        """
+        if self.box is None:
+            return img, None
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = self.box
+        bw, bh = x1 - x0, y1 - y0
+        side_min = self.min_size * min(w, h)
+        cx, cy = (x0 + x1) / 2 * w, (y0 + y1) / 2 * h
+        half_w = max(bw * w * (1 + 2 * self.margin), side_min) / 2
+        half_h = max(bh * h * (1 + 2 * self.margin), side_min) / 2
+        px0, px1 = int(max(0, cx - half_w)), int(min(w, cx + half_w))
+        py0, py1 = int(max(0, cy - half_h)), int(min(h, cy + half_h))
+        if px1 - px0 < 16 or py1 - py0 < 16:
+            return img, None
+        return img[py0:py1, px0:px1], (px0, py0, px1, py1)
+
+    def update(self, multi_hand_landmarks, roi, frame_shape):
+        """
+        Maps crop-relative landmarks back to the full frame (in place) and updates
+        the tracked box from the first hand.
+        """
+        if not multi_hand_landmarks:
+            self.misses += 1
+            if self.box is not None and self.misses > self.max_misses:
+                self.box = None
+            return
+
+        self.misses = 0
+        if roi is not None:
+            h, w = frame_shape[:2]
+            px0, py0, px1, py1 = roi
+            sx, sy = (px1 - px0) / w, (py1 - py0) / h
+            ox, oy = px0 / w, py0 / h
+            for hand_lms in multi_hand_landmarks:
+                for lm in hand_lms.landmark:
+                    lm.x = ox + lm.x * sx
+                    lm.y = oy + lm.y * sy
+
+        pts = np.array([(lm.x, lm.y) for lm in multi_hand_landmarks[0].landmark], dtype=np.float32)
+        x0, y0 = np.clip(pts.min(axis=0), 0.0, 1.0)
+        x1, y1 = np.clip(pts.max(axis=0), 0.0, 1.0)
+        self.box = (float(x0), float(y0), float(x1), float(y1))
@@ -0,0 +1,228 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+
+# ================= HUD RENDER STAGE =================
+# Keeps visualization off the control path:
+#   * the HUD is drawn in place on the frame the loop already owns (no annotated
+#     copy per frame), and only when a render is due: RENDER_FPS is independent
+#     of the control rate, frames in between are not drawn at all;
+#   * static overlays (sector grid, danger line) are rasterized once per frame size
+#     into (pixel index, colour) arrays and stamped on with one indexed assignment;
+#   * headless runs can still be watched: MjpegServer streams the rendered frames
+#     as multipart JPEG over HTTP (open http://<host>:<port>/ in a browser or VLC).
+#     JPEG encoding runs in the server thread, and only while a viewer is connected.
+#
+#   hud = HudRenderer("Vision", render_fps=15, show_window=True, mjpeg_port=8080)
+#   if hud.due():
+#       hud.stamp_overlay(frame, draw_static)    # cached per frame size
+#       ...per-frame text/boxes drawn in place...
+#       hud.show(frame)
+
+RENDER_FPS = 15
+MJPEG_HOST = "127.0.0.1"    # Use "0.0.0.0" to allow viewers from other machines
+JPEG_QUALITY = 70
+
+
+class StaticOverlay:
+    """An overlay drawn once by `draw(canvas, w, h)` and replayed onto every HUD frame."""
+
+    def __init__(self, draw):
+        self.draw = draw
+        self._shape = None
+        self._index = None      # Flat pixel indices the overlay covers
+        self._values = None     # Their colours
+
+    def _build(self, shape):
+        h, w = shape[:2]
+        color = np.zeros(shape, dtype=np.uint8)
+        self.draw(color, w, h)
+        # Drawn once on black and once on white, so black strokes end up in the mask too
+        inverse = np.full(shape, 255, dtype=np.uint8)
+        self.draw(inverse, w, h)
+        mask = np.any(color != 0, axis=2) | np.any(inverse != 255, axis=2)
+        self._index = np.flatnonzero(mask)
+        self._values = color.reshape(-1, shape[2])[self._index]
+        self._shape = shape
+
+    def apply(self, frame):
+        if frame.shape != self._shape:
+            self._build(frame.shape)
+        if frame.flags.c_contiguous:
+            # A masked np.copyto over the whole frame is ~40x slower than touching only these pixels
+            frame.reshape(-1, frame.shape[2])[self._index] = self._values
+        else:
+            rows, cols = np.unravel_index(self._index, frame.shape[:2])
+            frame[rows, cols] = self._values
+
+
+class MjpegServer:
+    """
+    Serves the latest published frame as an MJPEG stream.
+
+    Args:
+        port (int): TCP port to listen on.
+        host (str): Interface to bind; loopback by default.
+        fps (float): Maximum frames per second sent to viewers.
+        quality (int): JPEG quality 0-100.
+    """
+
+    def __init__(self, port, host=MJPEG_HOST, fps=RENDER_FPS, quality=JPEG_QUALITY):
+        self.fps = fps
+        self.quality = quality
+        self.viewers = 0
+        self._buffer = None             # Reused copy of the last published frame
+        self._spare = None              # Second buffer, swapped in while the first is encoded
+        self._fresh = False
+        self._jpeg = None
+        self._jpeg_id = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                server._serve(self.wfile)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._threads = [threading.Thread(target=self._httpd.serve_forever, name="mjpeg-http",
+                                          daemon=True),
+                         threading.Thread(target=self._encode_loop, name="mjpeg-encode",
+                                          daemon=True)]
+        for t in self._threads:
+            t.start()
+        print(f"📺 MJPEG stream on http://{host}:{port}/")
+
+    def publish(self, frame):
+        """Copies `frame` into the reusable buffer; cheap, and skipped with no viewers."""
+        if not self.viewers:
+            return
+        with self._cond:
+            if self._buffer is None or self._buffer.shape != frame.shape:
+                self._buffer = np.empty_like(frame)
+            np.copyto(self._buffer, frame)
+            self._fresh = True
+            self._cond.notify_all()
+
+    def _encode_loop(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: self._fresh or self._stop.is_set(), timeout=0.5)
+                if not self._fresh:
+                    continue
+                # Take the filled buffer and leave the spare, so publish() never waits on encoding
+                image, self._buffer, self._spare = self._buffer, self._spare, None
+                self._fresh = False
+            ok, jpeg = cv2.imencode(".jpg", image, params)
+            with self._cond:
+                self._spare = image
+                if ok:
+                    self._jpeg = jpeg.tobytes()
+                    self._jpeg_id += 1
+                    self._cond.notify_all()
+
+    def _serve(self, wfile):
+        with self._cond:
+            self.viewers += 1
+        last_id = 0
+        try:
+            while not self._stop.is_set():
+                with self._cond:
+                    self._cond.wait_for(lambda: self._jpeg_id != last_id or self._stop.is_set(),
+                                        timeout=1.0)
+                    if self._jpeg_id == last_id:
+                        continue
+                    jpeg, last_id = self._jpeg, self._jpeg_id
+                wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n"
+                            + f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n")
+                time.sleep(1.0 / self.fps)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self.viewers -= 1
+
+    def close(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class HudRenderer:
+    """
+    Args:
+        window_name (str): OpenCV window title.
+        render_fps (float): HUD frames per second (0 = render every frame).
+        show_window (bool): Show the OpenCV window (False for headless runs).
+        mjpeg_port (int): Also stream the HUD on this port (None = off).
+    """
+
+    def __init__(self, window_name, render_fps=RENDER_FPS, show_window=True, mjpeg_port=None):
+        self.window_name = window_name
+        self.interval = 1.0 / render_fps if render_fps else 0.0
+        self.show_window = show_window
+        self.stream = MjpegServer(mjpeg_port, fps=render_fps or RENDER_FPS) if mjpeg_port else None
+        self.frames_rendered = 0
+        self._next_due = 0.0
+        self._overlays = {}
+
+    @property
+    def enabled(self):
+        return self.show_window or self.stream is not None
+
+    def due(self, now=None):
+        """True if this frame should be rendered; advances the render clock when it is."""
+        if not self.enabled:
+            return False
+        now = time.monotonic() if now is None else now
+        if now < self._next_due:
+            return False
+        self._next_due = now + self.interval
+        return True
+
+    def stamp_overlay(self, frame, draw):
+        """Applies the static overlay drawn by `draw(canvas, w, h)`, cached per frame size."""
+        overlay = self._overlays.get(draw)
+        if overlay is None:
+            overlay = self._overlays[draw] = StaticOverlay(draw)
+        overlay.apply(frame)
+
+    def show(self, frame):
+        """
+        Displays and/or streams the rendered frame.
+
+        Returns:
+            int: cv2.waitKey code (-1 if none or no window).
+        """
+        self.frames_rendered += 1
+        if self.stream:
+            self.stream.publish(frame)
+        if self.show_window:
+            cv2.imshow(self.window_name, frame)
+            return cv2.waitKey(1)
+        return -1
+
+    def poll_key(self):
+        """Keeps the window responsive on frames that are not rendered."""
+        return cv2.waitKey(1) if self.show_window else -1
+
+    def close(self):
+        if self.stream:
+            self.stream.close()
+        if self.show_window:
+            cv2.destroyAllWindows()
@@ -0,0 +1,308 @@
+import ast
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+# ================= PLUGGABLE YOLO INFERENCE BACKENDS =================
+# Every backend takes a BGR frame and returns `Detections` whose `xyxy` array is
+# in original frame pixels, i.e. exactly what get_drive_command consumes.
+# Exported models are written once to MODEL_CACHE_DIR and reused on later runs.
+
+MODEL_CACHE_DIR = "model_cache"
+DEFAULT_WEIGHTS = "yolov8n.pt"
+
+
+@dataclass
+class Detections:
+    """Backend-independent detection result for one frame."""
+    xyxy: np.ndarray                        # (N, 4) float32, frame pixels
+    conf: np.ndarray                        # (N,) float32
+    cls: np.ndarray                         # (N,) int32
+    names: dict = field(default_factory=dict)
+
+    def plot(self, frame, inplace=False):
+        """Draws labelled boxes on a copy of `frame` (or on `frame` itself if `inplace`)."""
+        canvas = frame if inplace else frame.copy()
+        for (x1, y1, x2, y2), c, k in zip(self.xyxy.astype(int), self.conf, self.cls):
+            cv2.rectangle(canvas, (x1, y1), (x2, y2), (255, 128, 0), 2)
+            label = f"{self.names.get(int(k), int(k))} {c:.2f}"
+            cv2.putText(canvas, label, (x1, max(y1 - 5, 12)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 128, 0), 1)
+        return canvas
+
+
+def _empty_detections(names):
+    return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32),
+                      np.zeros(0, np.int32), names)
+
+
+# ---------- Pre/post-processing shared by the raw ONNX / OpenVINO backends ----------
+def letterbox(frame, imgsz):
+    """Resizes with unchanged aspect ratio and pads to a square `imgsz` input."""
+    h, w = frame.shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_x, pad_y = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    padded = cv2.copyMakeBorder(resized, top, imgsz - new_h - top, left, imgsz - new_w - left,
+                                cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, gain, (left, top)
+
+
+def preprocess(frame, imgsz, dtype=np.float32):
+    """BGR frame -> (1, 3, imgsz, imgsz) RGB tensor scaled to [0, 1]."""
+    padded, gain, pad = letterbox(frame, imgsz)
+    blob = padded[:, :, ::-1].transpose(2, 0, 1)[None].astype(dtype) / 255.0
+    return np.ascontiguousarray(blob), gain, pad
+
+
+def decode_yolov8(output, gain, pad, conf_thres, iou_thres=0.45, max_det=100):
+    """
+    Decodes a raw YOLOv8 head output of shape (1, 4 + num_classes, anchors).
+
+    Returns:
+        tuple: (xyxy, conf, cls) in original frame pixels after class-aware NMS.
+    """
+    pred = np.asarray(output, dtype=np.float32)[0].T
+    scores = pred[:, 4:]
+    cls = scores.argmax(axis=1)
+    conf = scores[np.arange(len(cls)), cls]
+    keep = conf > conf_thres
+    pred, cls, conf = pred[keep], cls[keep], conf[keep]
+    if len(conf) == 0:
+        return np.zeros((0, 4), np.float32), conf, cls.astype(np.int32)
+
+    cx, cy, bw, bh = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+    xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1)
+
+    # Offset boxes per class so one NMS call never suppresses across classes
+    offset = cls[:, None].astype(np.float32) * 4096.0
+    shifted = xyxy + offset
+    xywh = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+    idx = cv2.dnn.NMSBoxes(xywh.tolist(), conf.tolist(), conf_thres, iou_thres)
+    idx = np.asarray(idx, dtype=np.int64).reshape(-1)[:max_det]
+
+    xyxy = xyxy[idx]
+    xyxy[:, [0, 2]] -= pad[0]
+    xyxy[:, [1, 3]] -= pad[1]
+    xyxy /= gain
+    return xyxy.astype(np.float32), conf[idx], cls[idx].astype(np.int32)
+
+
+# ---------- Backends ----------
+class InferenceBackend:
+    """Base class: subclasses implement `predict(frame) -> Detections`."""
+    name = "base"
+
+    def __init__(self, imgsz=640, conf=0.35):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.names = {}
+
+    def predict(self, frame):
+        raise NotImplementedError
+
+    def predict_batch(self, frames):
+        """Detections for several frames; backends with batched execution override this."""
+        return [self.predict(frame) for frame in frames]
+
+    def warmup(self, frame=None, runs=2):
+        frame = np.zeros((480, 640, 3), np.uint8) if frame is None else frame
+        for _ in range(runs):
+            self.predict(frame)
+
+
+class UltralyticsBackend(InferenceBackend):
+    """
+    Runs any model format ultralytics can load (.pt, .torchscript, exported dirs).
+    Used for the default PyTorch path and the TorchScript backend.
+    """
+    name = "torch"
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, imgsz=640, conf=0.35, device=None, half=False,
+                 threads=0):
+        super().__init__(imgsz, conf)
+        import torch
+        from ultralytics import YOLO
+
+        if threads:
+            # Process-wide: one InferencePool worker must not use every core
+            torch.set_num_threads(threads)
+
+        self.model = YOLO(weights)
+        if device is None:
+            # Use Apple Silicon GPU (MPS) if available; otherwise, fallback to CPU
+            device = 'mps' if torch.backends.mps.is_available() else 'cpu'
+        self.device = device
+        self.half = half
+        if weights.endswith(".pt"):
+            self.model.to(device)
+        self.names = dict(self.model.names)
+
+    def predict(self, frame):
+        return self.predict_batch([frame])[0]
+
+    def predict_batch(self, frames):
+        # A list of frames is one batched forward pass in ultralytics
+        results = self.model.predict(list(frames), conf=self.conf, imgsz=self.imgsz,
+                                     device=self.device, half=self.half, verbose=False)
+        return [self._to_detections(result) for result in results]
+
+    def _to_detections(self, result):
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return _empty_detections(self.names)
+        return Detections(boxes.xyxy.cpu().numpy().astype(np.float32),
+                          boxes.conf.cpu().numpy().astype(np.float32),
+                          boxes.cls.cpu().numpy().astype(np.int32), self.names)
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """ONNX Runtime CPU session with configurable intra/inter-op thread counts."""
+    name = "onnxruntime"
+
+    def __init__(self, onnx_path, imgsz=320, conf=0.35, threads=0):
+        super().__init__(imgsz, conf)
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+            opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(onnx_path, opts, providers=["CPUExecutionProvider"])
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        self.input_dtype = np.float16 if "float16" in inp.type else np.float32
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+
+    def predict(self, frame):
+        blob, gain, pad = preprocess(frame, self.imgsz, self.input_dtype)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        xyxy, conf, cls = decode_yolov8(output, gain, pad, self.conf)
+        return Detections(xyxy, conf, cls, self.names)
+
+
+class OpenVINOBackend(InferenceBackend):
+    """OpenVINO CPU runtime; `model_dir` is an ultralytics *_openvino_model folder."""
+    name = "openvino"
+
+    def __init__(self, model_dir, imgsz=320, conf=0.35, threads=0):
+        super().__init__(imgsz, conf)
+        import openvino as ov
+        import yaml
+
+        xml = next(os.path.join(model_dir, f) for f in os.listdir(model_dir) if f.endswith(".xml"))
+        core = ov.Core()
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = core.compile_model(core.read_model(xml), "CPU", config)
+        self.request = self.compiled.create_infer_request()
+        meta_path = os.path.join(model_dir, "metadata.yaml")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.names = yaml.safe_load(f).get("names", {})
+
+    def predict(self, frame):
+        blob, gain, pad = preprocess(frame, self.imgsz)
+        output = self.request.infer({0: blob})[self.compiled.output(0)]
+        xyxy, conf, cls = decode_yolov8(output, gain, pad, self.conf)
+        return Detections(xyxy, conf, cls, self.names)
+
+
+# ---------- Export & cache ----------
+def export_model(weights=DEFAULT_WEIGHTS, fmt="onnx", imgsz=320, half=False, int8=False,
+                 cache_dir=MODEL_CACHE_DIR):
+    """
+    Exports `weights` to `fmt` once and returns the cached artifact path.
+
+    The cache key encodes format, input size and precision, so switching any of
+    them produces a separate artifact instead of silently reusing the wrong one.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    precision = "int8" if int8 else ("fp16" if half else "fp32")
+    suffix = {"onnx": ".onnx", "torchscript": ".torchscript", "openvino": "_openvino_model"}[fmt]
+    cached = os.path.join(cache_dir, f"{stem}_{imgsz}_{precision}{suffix}")
+    if os.path.exists(cached):
+        return cached
+
+    from ultralytics import YOLO
+    print(f"📦 Exporting {weights} -> {fmt} ({imgsz}px, {precision}), this happens once...")
+    if fmt == "onnx":
+        exported = YOLO(weights).export(format="onnx", imgsz=imgsz, half=half, simplify=True)
+        if int8:
+            # ONNX Runtime dynamic quantization: INT8 weights, no calibration set needed
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(exported, cached, weight_type=QuantType.QUInt8)
+            return cached
+    else:
+        exported = YOLO(weights).export(format=fmt, imgsz=imgsz, half=half, int8=int8)
+    shutil.move(str(exported), cached)
+    return cached
+
+
+def create_backend(name, weights=DEFAULT_WEIGHTS, imgsz=640, conf=0.35, threads=0,
+                   half=False, int8=False, device=None):
+    """
+    Builds a backend by name: 'torch', 'torchscript', 'onnxruntime' or 'openvino'.
+    """
+    if name == "torch":
+        return UltralyticsBackend(weights, imgsz, conf, device=device, half=half, threads=threads)
+    if name == "torchscript":
+        backend = UltralyticsBackend(export_model(weights, "torchscript", imgsz, half), imgsz, conf,
+                                     device=device or "cpu", half=half, threads=threads)
+        backend.name = "torchscript"
+        return backend
+    if name == "onnxruntime":
+        return OnnxRuntimeBackend(export_model(weights, "onnx", imgsz, half, int8), imgsz, conf, threads)
+    if name == "openvino":
+        return OpenVINOBackend(export_model(weights, "openvino", imgsz, half, int8), imgsz, conf, threads)
+    raise ValueError(f"Unknown inference backend: {name}")
+
+
+def measure_latency(backend, frame, runs=20):
+    """Returns the median per-frame latency of `backend.predict` in milliseconds."""
+    backend.warmup(frame)
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        backend.predict(frame)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.median(samples))
+
+
+def select_backend(candidates, preferred, frame, **kwargs):
+    """
+    Builds every candidate backend, prints a latency report and returns the one to use.
+
+    `preferred` is a backend name or 'auto' for the fastest one that loaded.
+    Backends whose runtime is not installed are reported and skipped.
+    """
+    print("⏱️  Inference backend latency report:")
+    loaded = {}
+    for name in candidates:
+        try:
+            backend = create_backend(name, **kwargs)
+        except Exception as e:
+            print(f"   {name:<12} unavailable ({e})")
+            continue
+        ms = measure_latency(backend, frame)
+        loaded[name] = (ms, backend)
+        print(f"   {name:<12} {ms:7.1f} ms/frame  ({1000.0 / ms:5.1f} FPS)")
+
+    if not loaded:
+        raise RuntimeError("No inference backend could be loaded")
+    if preferred == "auto":
+        preferred = min(loaded, key=lambda n: loaded[n][0])
+    if preferred not in loaded:
+        raise RuntimeError(f"Preferred backend '{preferred}' failed to load")
+    print(f"✅ Using inference backend: {preferred}")
+    return loaded[preferred][1]
@@ -0,0 +1,285 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, NamedTuple
+
+import numpy as np
+
+# ================= SHARED INFERENCE PROCESS POOL =================
+# One YOLO model per worker process instead of one per car. Every camera source
+# owns a ring of fixed-size frame slots in shared memory; the capture side copies
+# a frame into a free slot and only (source, slot, frame_id, timestamp) goes over
+# the task queue, so frames are never pickled. Each worker drains up to
+# `batch_size` tasks (from any car) and runs them as one batched predict on views
+# into shared memory. Only the small box arrays come back.
+#
+#   pool = InferencePool(dict(name="torch", weights="yolov8n.pt", imgsz=640), workers=2)
+#   car = pool.add_source((480, 640, 3))            # before start()
+#   pool.start()
+#   pool.submit(car, frame, frame_id, captured_at)  # False = dropped, all slots busy
+#   result = pool.get(timeout=0.5)                  # PoolResult
+#
+# Workers split the cores between them (threads = cores // workers), so adding a
+# worker adds throughput instead of oversubscribing the CPU.
+
+SLOTS_PER_SOURCE = 3        # Frames of one car that can be queued/in inference at once
+BATCH_SIZE = 4
+BATCH_TIMEOUT = 0.005       # Max wait for more frames once a batch has started
+
+
+class PoolResult(NamedTuple):
+    source: int
+    frame_id: int
+    captured_at: float
+    frame_time: float       # Recorded capture time for replays, else captured_at
+    infer_started_at: float
+    inferred_at: float
+    xyxy: Any               # float32 (N, 4)
+    conf: Any
+    cls: Any
+    batch_size: int         # Frames in the predict call this result came from
+    worker: int
+
+
+def default_workers(threads_per_worker=2):
+    return max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+
+def _slot_views(shm, shape, slots):
+    return np.ndarray((slots, *shape), dtype=np.uint8, buffer=shm.buf)
+
+
+# ================= WORKER PROCESS =================
+def _worker_main(index, factory, backend_kwargs, sources, tasks, results,
+                 batch_size, batch_timeout):
+    """Entry point of a worker process (module level, so it also works with 'spawn')."""
+    handles = [shared_memory.SharedMemory(name=name) for name, _, _ in sources]
+    views = [_slot_views(shm, shape, slots) for shm, (_, shape, slots) in zip(handles, sources)]
+    try:
+        backend = factory(**backend_kwargs)
+        backend.warmup(np.zeros(sources[0][1], np.uint8))
+    except Exception as e:
+        results.put(("error", index, repr(e)))
+        return
+    results.put(("ready", index, None))
+
+    running = True
+    while running:
+        task = tasks.get()
+        if task is None:
+            break
+        batch = [task]
+        deadline = time.monotonic() + batch_timeout
+        while len(batch) < batch_size:
+            try:
+                task = tasks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if task is None:
+                running = False
+                break
+            batch.append(task)
+
+        frames = [views[source][slot] for source, slot, *_ in batch]
+        started = time.monotonic()
+        try:
+            detections = backend.predict_batch(frames)
+        except Exception as e:
+            # Give the slots back, otherwise those cars would stall for good
+            for source, slot, frame_id, *_ in batch:
+                results.put(("failed", index, (source, slot, frame_id, repr(e))))
+            continue
+        finished = time.monotonic()
+        for (source, slot, frame_id, captured_at, frame_time), det in zip(batch, detections):
+            results.put(("result", index, (slot, PoolResult(
+                source, frame_id, captured_at, frame_time, started, finished,
+                det.xyxy, det.conf, det.cls, len(batch), index))))
+
+    frames = views = None       # Views must be gone before the segments can be closed
+    for shm in handles:
+        shm.close()
+
+
+# ================= POOL (PARENT PROCESS) =================
+class _Source:
+    def __init__(self, shape, slots):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * slots)
+        self.views = _slot_views(self.shm, self.shape, slots)
+        self.free = list(range(slots))
+        self.submitted = 0
+        self.dropped = 0
+
+
+class InferencePool:
+    """
+    Args:
+        backend_kwargs (dict): Arguments of `factory` in every worker, e.g.
+            dict(name="onnxruntime", weights="yolov8n.pt", imgsz=320).
+        workers (int): Worker processes; None = one per `threads_per_worker` cores.
+        threads_per_worker (int): Runtime threads per worker; 0 = cores // workers.
+        batch_size (int): Max frames per predict call.
+        batch_timeout (float): How long a worker waits to fill a batch, in seconds.
+        factory: Picklable callable building the backend (default create_backend).
+    """
+
+    def __init__(self, backend_kwargs, workers=None, threads_per_worker=0,
+                 batch_size=BATCH_SIZE, batch_timeout=BATCH_TIMEOUT, factory=None):
+        if factory is None:
+            from inference_backends import create_backend
+            factory = create_backend
+        self.workers = workers or default_workers(threads_per_worker or 2)
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.backend_kwargs = {"threads": threads, **backend_kwargs}
+        self.factory = factory
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+
+        self._ctx = mp.get_context("spawn")     # Forking a process with torch loaded is unsafe
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._out = queue.Queue()
+        self._sources = []
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._procs = []
+        self._collector = None
+        self._stop = threading.Event()
+        self.batches = 0
+        self.completed = 0
+
+    def add_source(self, shape, slots=SLOTS_PER_SOURCE):
+        """Registers a camera with uint8 frames of `shape`; returns its source id."""
+        if self._procs:
+            raise RuntimeError("Sources must be added before the pool is started")
+        self._sources.append(_Source(shape, slots))
+        return len(self._sources) - 1
+
+    def start(self, timeout=120.0):
+        """Starts the workers and waits until every one has loaded and warmed up its model."""
+        specs = [(s.shm.name, s.shape, s.slots) for s in self._sources]
+        for index in range(self.workers):
+            proc = self._ctx.Process(
+                target=_worker_main, name=f"inference-{index}", daemon=True,
+                args=(index, self.factory, self.backend_kwargs, specs, self._tasks,
+                      self._results, self.batch_size, self.batch_timeout))
+            proc.start()
+            self._procs.append(proc)
+
+        ready = 0
+        deadline = time.monotonic() + timeout
+        while ready < self.workers:
+            try:
+                kind, index, error = self._results.get(timeout=max(0.1, deadline - time.monotonic()))
+            except queue.Empty:
+                self.close()
+                raise RuntimeError("Inference workers did not start in time")
+            if kind == "error":
+                self.close()
+                raise RuntimeError(f"Inference worker {index} failed to load: {error}")
+            ready += 1
+        self._collector = threading.Thread(target=self._collect, name="pool-collector", daemon=True)
+        self._collector.start()
+        print(f"✅ Inference pool: {self.workers} worker(s) x {self.backend_kwargs['threads']} "
+              f"thread(s), batch {self.batch_size}, {len(self._sources)} source(s)")
+        return self
+
+    def submit(self, source, frame, frame_id, captured_at=None, block=False, frame_time=None):
+        """
+        Copies `frame` into a free shared-memory slot of `source` and queues it.
+
+        Args:
+            block (bool): Wait for a free slot instead of dropping the frame
+                (recordings, where every frame should be processed).
+            frame_time (float): Recorded capture time of a replayed frame; returned
+                as PoolResult.frame_time (defaults to `captured_at`).
+
+        Returns:
+            bool: False if every slot of the source is still in flight (frame dropped).
+        """
+        src = self._sources[source]
+        with self._slot_freed:
+            if block:
+                self._slot_freed.wait_for(lambda: src.free or self._stop.is_set())
+            if not src.free:
+                src.dropped += 1
+                return False
+            slot = src.free.pop()
+        np.copyto(src.views[slot], frame, casting="no")
+        src.submitted += 1
+        captured_at = time.monotonic() if captured_at is None else captured_at
+        self._tasks.put((source, slot, frame_id, captured_at,
+                         captured_at if frame_time is None else frame_time))
+        return True
+
+    def get(self, timeout=None):
+        """Next PoolResult from any source, or None on timeout."""
+        try:
+            return self._out.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def in_flight(self):
+        with self._lock:
+            return sum(s.slots - len(s.free) for s in self._sources)
+
+    def stats(self, source):
+        """(frames submitted, frames dropped because the pool was busy) for one source."""
+        src = self._sources[source]
+        return src.submitted, src.dropped
+
+    def _release(self, source, slot):
+        with self._slot_freed:
+            self._sources[source].free.append(slot)
+            self._slot_freed.notify_all()
+
+    def _collect(self):
+        while not self._stop.is_set():
+            try:
+                kind, index, payload = self._results.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if kind == "result":
+                slot, result = payload
+                self.completed += 1
+                # Every frame of a batch reports its size; count each call once
+                self.batches += 1.0 / result.batch_size
+                # Hand the result over before freeing the slot, so in_flight() == 0
+                # really means nothing is left to consume
+                self._out.put(result)
+                self._release(result.source, slot)
+            elif kind == "failed":
+                source, slot, frame_id, error = payload
+                self._release(source, slot)
+                print(f"⚠️ Inference worker {index} failed on frame {frame_id}: {error}")
+
+    def close(self, timeout=2.0):
+        self._stop.set()
+        with self._slot_freed:
+            self._slot_freed.notify_all()
+        for _ in self._procs:
+            self._tasks.put(None)
+        for proc in self._procs:
+            proc.join(timeout=timeout)
+            if proc.is_alive():
+                proc.terminate()
+        if self._collector:
+            self._collector.join(timeout=1.0)
+        for src in self._sources:
+            src.views = None
+            src.shm.close()
+            src.shm.unlink()
+        self._sources = []
+        self._procs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,343 @@
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+# ================= OFFLINE KEYWORD SPOTTING =================
+# Fast path for the motion vocabulary ("forward", "stop", ...): the microphone
+# stream is cut into short utterances by an energy gate, each utterance becomes
+# an MFCC sequence, and the nearest enrolled template under dynamic time warping
+# (DTW) decides the keyword. Everything is NumPy on the CPU; a one-word command
+# is classified ~TRAILING_SILENCE_MS after the speaker stops, instead of after a
+# cloud round-trip.
+#
+# Templates are recorded per user/microphone (`python keyword_spotter.py`) and
+# stored in kws_templates.npz. Utterances too far from every template are
+# rejected, so conversation does not trigger commands.
+
+SAMPLE_RATE = 16000
+FRAME_MS = 25
+HOP_MS = 10
+N_MELS = 26
+N_MFCC = 13
+PRE_EMPHASIS = 0.97
+
+# Utterance segmentation
+CHUNK_MS = 20
+MIN_SPEECH_MS = 120
+MAX_SPEECH_MS = 1200
+TRAILING_SILENCE_MS = 120   # Hangover before an utterance is closed (dominates latency)
+SPEECH_MARGIN_DB = 12.0     # Speech = this much louder than the tracked noise floor
+PRE_ROLL_CHUNKS = 2
+NOISE_FLOOR_MIN_DB = 20.0   # int16 RMS ~10; keeps digital silence from arming the gate
+
+TEMPLATES_FILE = "kws_templates.npz"
+
+
+# ================= FEATURES =================
+def _mel_filterbank(sample_rate, n_fft, n_mels):
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+
+    mels = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(np.int64)
+    fbank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            fbank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            fbank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return fbank
+
+
+def _dct_matrix(n_mfcc, n_mels):
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    return (np.cos(np.pi * k * (2 * n + 1) / (2 * n_mels)) * np.sqrt(2.0 / n_mels)).astype(np.float32)
+
+
+_FRAME_LEN = SAMPLE_RATE * FRAME_MS // 1000
+_HOP_LEN = SAMPLE_RATE * HOP_MS // 1000
+_N_FFT = 1 << (_FRAME_LEN - 1).bit_length()
+_WINDOW = np.hamming(_FRAME_LEN).astype(np.float32)
+_MEL = _mel_filterbank(SAMPLE_RATE, _N_FFT, N_MELS)
+_DCT = _dct_matrix(N_MFCC, N_MELS)
+
+
+def mfcc(samples):
+    """
+    MFCC sequence of a 16 kHz mono signal, with per-utterance mean normalization
+    so templates transfer across microphone gain.
+
+    Args:
+        samples (np.ndarray): int16 or float samples.
+
+    Returns:
+        np.ndarray: (frames, N_MFCC) float32
+    """
+    samples = np.asarray(samples)
+    x = samples.astype(np.float32)
+    if np.issubdtype(samples.dtype, np.integer):
+        x /= 32768.0
+    if x.size:
+        x = np.append(x[0], x[1:] - PRE_EMPHASIS * x[:-1])
+    if x.size < _FRAME_LEN:
+        x = np.pad(x, (0, _FRAME_LEN - x.size))
+    n_frames = 1 + (x.size - _FRAME_LEN) // _HOP_LEN
+    idx = np.arange(_FRAME_LEN)[None, :] + _HOP_LEN * np.arange(n_frames)[:, None]
+    frames = x[idx] * _WINDOW
+    power = np.abs(np.fft.rfft(frames, _N_FFT)) ** 2 / _N_FFT
+    log_mel = np.log(power @ _MEL.T + 1e-10)
+    coeffs = log_mel @ _DCT.T
+    return (coeffs - coeffs.mean(axis=0)).astype(np.float32)
+
+
+def dtw_distance(a, b):
+    """
+    DTW alignment cost between two feature sequences, normalized by their total
+    length. The frame cost matrix is computed in one broadcast; only the
+    accumulation runs row by row.
+    """
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2))
+    n, m = cost.shape
+    prev = np.full(m + 1, np.inf)
+    prev[0] = 0.0
+    for i in range(n):
+        # Diagonal and vertical moves in one vectorized step...
+        best = (np.minimum(prev[:-1], prev[1:]) + cost[i]).tolist()
+        # ...then horizontal moves, which depend on the current row (plain floats are
+        # much faster than NumPy scalars in this loop)
+        row = [np.inf]
+        acc = np.inf
+        for b, c in zip(best, cost[i].tolist()):
+            acc = min(b, acc + c)
+            row.append(acc)
+        prev = np.array(row)
+    return float(prev[m] / (n + m))
+
+
+# ================= SEGMENTATION =================
+class UtteranceSegmenter:
+    """
+    Energy gate with an adaptive noise floor. feed() takes int16 chunks and
+    returns the utterances completed by them (each an int16 array).
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, margin_db=SPEECH_MARGIN_DB,
+                 min_speech_ms=MIN_SPEECH_MS, max_speech_ms=MAX_SPEECH_MS,
+                 trailing_silence_ms=TRAILING_SILENCE_MS):
+        self.sample_rate = sample_rate
+        self.margin_db = margin_db
+        self.min_speech = sample_rate * min_speech_ms // 1000
+        self.max_speech = sample_rate * max_speech_ms // 1000
+        self.trailing_silence = sample_rate * trailing_silence_ms // 1000
+        self.noise_db = None
+        self._preroll = deque(maxlen=PRE_ROLL_CHUNKS)   # Soft onsets before the gate opens
+        self._buffer = []
+        self._speech = 0
+        self._silence = 0
+        self._silent_chunks = 0
+
+    def feed(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.int16)
+        rms = np.sqrt(np.mean(chunk.astype(np.float32) ** 2)) + 1e-3
+        level_db = 20.0 * np.log10(rms)
+        if self.noise_db is None:
+            self.noise_db = max(NOISE_FLOOR_MIN_DB, level_db)
+        loud = level_db > self.noise_db + self.margin_db
+
+        done = []
+        if loud:
+            if not self._buffer:
+                self._buffer.extend(self._preroll)
+                self._preroll.clear()
+            self._buffer.append(chunk)
+            self._speech += chunk.size + self._silence
+            self._silence = 0
+            self._silent_chunks = 0
+        elif self._buffer:
+            self._buffer.append(chunk)
+            self._silence += chunk.size
+            self._silent_chunks += 1
+        else:
+            self._preroll.append(chunk)
+            # Track the floor only while quiet, slowly so speech does not raise it
+            self.noise_db = max(NOISE_FLOOR_MIN_DB, 0.95 * self.noise_db + 0.05 * level_db)
+
+        if self._buffer and (self._silence >= self.trailing_silence or
+                             self._speech + self._silence >= self.max_speech):
+            if self._speech >= self.min_speech:
+                # The hangover is silence, not part of the word
+                speech = self._buffer[:len(self._buffer) - self._silent_chunks]
+                done.append(np.concatenate(speech))
+            self._buffer, self._speech, self._silence, self._silent_chunks = [], 0, 0, 0
+        return done
+
+
+# ================= CLASSIFIER =================
+class KeywordSpotter:
+    """
+    Nearest-template DTW classifier.
+
+    Args:
+        templates (dict): Keyword -> list of MFCC arrays.
+        reject_distance (float): Utterances with a best distance above this are
+            not a keyword (None = always accept the nearest).
+    """
+
+    def __init__(self, templates=None, reject_distance=None):
+        self.templates = {k: list(v) for k, v in (templates or {}).items()}
+        self.reject_distance = reject_distance
+
+    def enroll(self, keyword, samples):
+        self.templates.setdefault(keyword, []).append(mfcc(samples))
+
+    def classify(self, samples):
+        """
+        Returns:
+            tuple: (keyword or None, best DTW distance)
+        """
+        features = mfcc(samples)
+        best, best_d = None, np.inf
+        for keyword, templates in self.templates.items():
+            for template in templates:
+                d = dtw_distance(features, template)
+                if d < best_d:
+                    best, best_d = keyword, d
+        if self.reject_distance is not None and best_d > self.reject_distance:
+            return None, best_d
+        return best, best_d
+
+    def calibrate_rejection(self, factor=1.5):
+        """Sets reject_distance from the spread between templates of the same keyword."""
+        within = [dtw_distance(a, b) for ts in self.templates.values()
+                  for i, a in enumerate(ts) for b in ts[i + 1:]]
+        if within:
+            self.reject_distance = float(np.max(within) * factor)
+        return self.reject_distance
+
+    def save(self, path=TEMPLATES_FILE):
+        arrays = {f"{k}__{i}": t for k, ts in self.templates.items() for i, t in enumerate(ts)}
+        np.savez(path, reject_distance=np.float32(self.reject_distance or 0.0), **arrays)
+
+    @classmethod
+    def load(cls, path=TEMPLATES_FILE):
+        data = np.load(path)
+        templates = {}
+        for name in data.files:
+            if name == "reject_distance":
+                continue
+            keyword = name.rsplit("__", 1)[0]
+            templates.setdefault(keyword, []).append(data[name])
+        reject = float(data["reject_distance"]) or None
+        return cls(templates, reject_distance=reject)
+
+
+class KeywordStream:
+    """
+    Glues segmentation and classification on a live stream.
+
+    Args:
+        spotter (KeywordSpotter): Enrolled classifier.
+        on_keyword (callable): callback(keyword, distance, compute_ms) when a keyword fires.
+    """
+
+    def __init__(self, spotter, on_keyword, segmenter=None):
+        self.spotter = spotter
+        self.on_keyword = on_keyword
+        self.segmenter = segmenter or UtteranceSegmenter()
+
+    def feed(self, chunk):
+        for utterance in self.segmenter.feed(chunk):
+            t0 = time.perf_counter()
+            keyword, distance = self.spotter.classify(utterance)
+            compute_ms = (time.perf_counter() - t0) * 1000.0
+            if keyword is not None:
+                self.on_keyword(keyword, distance, compute_ms)
+
+    def run_microphone(self, stop_event, microphone=None):
+        """Feeds 16 kHz microphone chunks until `stop_event` is set."""
+        for chunk in microphone_chunks(stop_event, microphone):
+            self.feed(chunk)
+
+
+def microphone_chunks(stop_event, microphone=None):
+    """Yields CHUNK_MS int16 chunks from a speech_recognition Microphone."""
+    import speech_recognition as sr
+
+    microphone = microphone or sr.Microphone(sample_rate=SAMPLE_RATE)
+    chunk_frames = SAMPLE_RATE * CHUNK_MS // 1000
+    with microphone as source:
+        while not stop_event.is_set():
+            yield np.frombuffer(source.stream.read(chunk_frames), dtype=np.int16)
+
+
+def extract_utterance(samples):
+    """
+    Cuts a recorded clip the same way the live stream would, so templates enrolled
+    from files match what KeywordStream classifies. Returns the clip if the gate
+    never closes on it.
+    """
+    chunk = SAMPLE_RATE * CHUNK_MS // 1000
+    tail = np.zeros(SAMPLE_RATE * (TRAILING_SILENCE_MS + 2 * CHUNK_MS) // 1000, dtype=np.int16)
+    audio = np.concatenate([np.zeros(chunk * 5, dtype=np.int16), samples, tail])
+    segmenter = UtteranceSegmenter()
+    for start in range(0, audio.size, chunk):
+        utterances = segmenter.feed(audio[start:start + chunk])
+        if utterances:
+            return utterances[0]
+    return samples
+
+
+def record_utterance(microphone=None):
+    """Blocks until one utterance has been spoken and returns it (int16)."""
+    import threading
+
+    segmenter = UtteranceSegmenter()
+    for chunk in microphone_chunks(threading.Event(), microphone):
+        utterances = segmenter.feed(chunk)
+        if utterances:
+            return utterances[0]
+
+
+# ================= WAV I/O =================
+def load_wav(path):
+    """Reads a WAV file as 16 kHz mono int16 (other rates are linearly resampled)."""
+    with wave.open(str(path), "rb") as f:
+        rate, channels, width = f.getframerate(), f.getnchannels(), f.getsampwidth()
+        raw = f.readframes(f.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit PCM is supported")
+    samples = np.frombuffer(raw, dtype=np.int16).reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        t_out = np.arange(int(samples.size * SAMPLE_RATE / rate)) / SAMPLE_RATE
+        samples = np.interp(t_out, np.arange(samples.size) / rate, samples)
+    return samples.astype(np.int16)
+
+
+def save_wav(path, samples):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+
+
+if __name__ == "__main__":
+    # Interactive enrollment: say each keyword REPETITIONS times after the prompt
+    KEYWORDS = ["forward", "backward", "left", "right", "stop", "auto", "manual"]
+    REPETITIONS = 3
+
+    spotter = KeywordSpotter()
+    for keyword in KEYWORDS:
+        for rep in range(REPETITIONS):
+            print(f"🎙️  Say '{keyword}' ({rep + 1}/{REPETITIONS})...")
+            spotter.enroll(keyword, record_utterance())
+    print(f"✅ Rejection distance: {spotter.calibrate_rejection():.2f}")
+    spotter.save()
+    print(f"💾 Templates saved to {TEMPLATES_FILE}")
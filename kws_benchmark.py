@@ -0,0 +1,120 @@
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from keyword_spotter import (CHUNK_MS, SAMPLE_RATE, TEMPLATES_FILE, TRAILING_SILENCE_MS,
+                             KeywordSpotter, KeywordStream, extract_utterance, load_wav)
+from latency_probe import LatencyProbe
+
+# ================= KEYWORD SPOTTING BENCHMARK =================
+# Runs the offline spotter over recorded clips laid out as
+#
+#   clips/forward/001.wav, clips/forward/002.wav, clips/stop/001.wav, ...
+#   clips/_noise/*.wav     (optional: speech that must NOT fire a command)
+#
+# and reports accuracy, false triggers and latency. Each clip is streamed in
+# CHUNK_MS chunks followed by silence, exactly as the microphone would deliver
+# it; "decision latency" is the time from the end of the clip's audio to the
+# keyword firing (trailing-silence hangover + compute).
+#
+#   python kws_benchmark.py clips --templates kws_templates.npz
+#   python kws_benchmark.py clips --enroll 2     # first 2 clips per keyword become templates
+
+NOISE_DIR = "_noise"
+
+
+def load_clips(root):
+    """Keyword -> sorted list of clip paths."""
+    return {d.name: sorted(d.glob("*.wav")) for d in sorted(Path(root).iterdir()) if d.is_dir()}
+
+
+def stream_clip(spotter, samples, probe):
+    """
+    Streams one clip (plus trailing silence) through a fresh KeywordStream.
+
+    Returns:
+        tuple: (first keyword fired or None, decision latency in ms or None)
+    """
+    fired = []
+
+    def on_keyword(keyword, distance, compute_ms):
+        fired.append((keyword, compute_ms))
+
+    stream = KeywordStream(spotter, on_keyword)
+    chunk = SAMPLE_RATE * CHUNK_MS // 1000
+    lead = np.zeros(chunk * 5, dtype=np.int16)
+    tail = np.zeros(SAMPLE_RATE * (TRAILING_SILENCE_MS + 4 * CHUNK_MS) // 1000, dtype=np.int16)
+    audio = np.concatenate([lead, samples, tail])
+    end_of_clip = lead.size + samples.size
+
+    for start in range(0, audio.size, chunk):
+        stream.feed(audio[start:start + chunk])
+        if fired:
+            keyword, compute_ms = fired[0]
+            probe.record("compute", compute_ms)
+            # Audio time elapsed after the clip ended, plus the classification time
+            audio_ms = max(0, start + chunk - end_of_clip) * 1000.0 / SAMPLE_RATE
+            return keyword, audio_ms + compute_ms
+    return None, None
+
+
+def run(clips, spotter):
+    probe = LatencyProbe("kws")
+    keywords = [k for k in clips if k != NOISE_DIR]
+    confusion = {k: {} for k in keywords}
+    correct = total = 0
+
+    for keyword in keywords:
+        for path in clips[keyword]:
+            predicted, latency_ms = stream_clip(spotter, load_wav(path), probe)
+            confusion[keyword][predicted] = confusion[keyword].get(predicted, 0) + 1
+            total += 1
+            if predicted == keyword:
+                correct += 1
+                probe.record("decision", latency_ms)
+
+    false_triggers = 0
+    noise_clips = clips.get(NOISE_DIR, [])
+    for path in noise_clips:
+        predicted, _ = stream_clip(spotter, load_wav(path), probe)
+        false_triggers += predicted is not None
+
+    print(f"\n🎯 Accuracy: {correct}/{total} ({100.0 * correct / max(total, 1):.1f}%)")
+    if noise_clips:
+        print(f"🔇 False triggers: {false_triggers}/{len(noise_clips)} noise clips")
+    for keyword, row in confusion.items():
+        misses = {str(k): v for k, v in row.items() if k != keyword}
+        if misses:
+            print(f"   {keyword:<10} confused with {misses}")
+    probe.print_summary()
+    return correct, total, false_triggers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the offline keyword spotter on WAV clips")
+    parser.add_argument("clips", help="Directory with one sub-directory of WAV clips per keyword")
+    parser.add_argument("--templates", default=TEMPLATES_FILE, help="Enrolled templates (.npz)")
+    parser.add_argument("--enroll", type=int, default=0,
+                        help="Use the first N clips of each keyword as templates instead")
+    args = parser.parse_args()
+
+    clips = load_clips(args.clips)
+    if args.enroll:
+        spotter = KeywordSpotter()
+        for keyword, paths in clips.items():
+            if keyword == NOISE_DIR:
+                continue
+            for path in paths[:args.enroll]:
+                spotter.enroll(keyword, extract_utterance(load_wav(path)))
+            clips[keyword] = paths[args.enroll:]
+        spotter.calibrate_rejection()
+    else:
+        spotter = KeywordSpotter.load(args.templates)
+
+    n_templates = sum(len(t) for t in spotter.templates.values())
+    print(f"📦 {n_templates} templates, reject distance {spotter.reject_distance}")
+    started = time.perf_counter()
+    run(clips, spotter)
+    print(f"\n⏱️  Total benchmark time: {time.perf_counter() - started:.1f}s")
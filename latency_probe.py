@@ -0,0 +1,152 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# ================= LATENCY INSTRUMENTATION =================
+# Per-frame traces built from time.monotonic() timestamps, per-stage latency
+# histograms (p50/p95/p99 over a sliding window), an FPS estimate for the HUD,
+# and dumps of the raw traces as CSV or Chrome trace JSON (open the latter in
+# chrome://tracing or https://ui.perfetto.dev).
+#
+#   probe = LatencyProbe("vision")
+#   trace = probe.begin(frame_id, start=packet.captured_at)
+#   trace.add("inference", packet.infer_started_at, packet.inferred_at)
+#   trace.mark("decision")          # from the previous mark until now
+#   probe.finish(trace)
+
+END_TO_END = "end_to_end"
+
+
+class FrameTrace:
+    """Timestamps of one frame as it passes through the stages of a loop."""
+
+    __slots__ = ("frame_id", "start", "last", "spans")
+
+    def __init__(self, frame_id, start):
+        self.frame_id = frame_id
+        self.start = start
+        self.last = start
+        self.spans = []             # (stage, t_start, t_end)
+
+    def add(self, stage, t_start, t_end):
+        """Records a stage with explicit timestamps (e.g. measured in another thread)."""
+        self.spans.append((stage, t_start, t_end))
+        self.last = max(self.last, t_end)
+
+    def mark(self, stage, now=None):
+        """Records `stage` as running from the previous mark until now."""
+        now = time.monotonic() if now is None else now
+        self.add(stage, self.last, now)
+        return now
+
+
+class LatencyProbe:
+    """
+    Args:
+        name (str): Loop name used in reports and trace files.
+        window (int): Number of recent samples per stage kept for percentiles.
+        max_traces (int): Number of recent frame traces kept for dumping.
+    """
+
+    def __init__(self, name, window=1000, max_traces=10000):
+        self.name = name
+        self.window = window
+        self._samples = {}                       # stage -> deque of ms
+        self._traces = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+        self._last_finish = None
+        self.fps = 0.0
+
+    # ---------- Recording ----------
+    def begin(self, frame_id, start=None):
+        return FrameTrace(frame_id, time.monotonic() if start is None else start)
+
+    def record(self, stage, ms):
+        """Adds a single latency sample that is not tied to a frame (e.g. serial ACK RTT)."""
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self.window)).append(ms)
+
+    def finish(self, trace):
+        """Closes a frame: stores its stage latencies, end-to-end latency and updates FPS."""
+        with self._lock:
+            for stage, t0, t1 in trace.spans:
+                self._samples.setdefault(stage, deque(maxlen=self.window)).append((t1 - t0) * 1000.0)
+            self._samples.setdefault(END_TO_END, deque(maxlen=self.window)).append(
+                (trace.last - trace.start) * 1000.0)
+            self._traces.append(trace)
+
+            if self._last_finish is not None:
+                dt = trace.last - self._last_finish
+                if dt > 0:
+                    # Exponential moving average keeps the HUD number stable
+                    self.fps = 1.0 / dt if self.fps == 0 else 0.9 * self.fps + 0.1 / dt
+            self._last_finish = trace.last
+
+    # ---------- Reporting ----------
+    def percentiles(self, stage, q=(50, 95, 99)):
+        with self._lock:
+            samples = np.fromiter(self._samples.get(stage, ()), dtype=np.float64)
+        if samples.size == 0:
+            return tuple(float("nan") for _ in q)
+        return tuple(float(v) for v in np.percentile(samples, q))
+
+    def summary(self):
+        """Stage -> (p50, p95, p99, sample count) in milliseconds."""
+        with self._lock:
+            stages = list(self._samples)
+            counts = {s: len(self._samples[s]) for s in stages}
+        return {s: (*self.percentiles(s), counts[s]) for s in stages}
+
+    def print_summary(self):
+        print(f"\n⏱️  Latency report: {self.name} ({self.fps:.1f} FPS)")
+        print(f"   {'stage':<16}{'p50':>9}{'p95':>9}{'p99':>9}{'n':>8}")
+        for stage, (p50, p95, p99, n) in self.summary().items():
+            print(f"   {stage:<16}{p50:8.1f}ms{p95:7.1f}ms{p99:7.1f}ms{n:8d}")
+
+    def overlay_text(self):
+        """Short line for the cv2.putText HUD."""
+        p50, p95, _ = self.percentiles(END_TO_END)
+        if np.isnan(p50):
+            return f"FPS: {self.fps:.1f}"
+        return f"FPS: {self.fps:.1f}  E2E p50 {p50:.0f}ms p95 {p95:.0f}ms"
+
+    # ---------- Trace dumps ----------
+    def dump(self, path):
+        """Writes the kept traces to `path`: Chrome trace for .json, CSV otherwise."""
+        if path.endswith(".json"):
+            self.dump_chrome_trace(path)
+        else:
+            self.dump_csv(path)
+        print(f"💾 Trace written to {path}")
+
+    def dump_csv(self, path):
+        with self._lock:
+            traces = list(self._traces)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame_id", "stage", "start_s", "end_s", "duration_ms"])
+            for trace in traces:
+                for stage, t0, t1 in trace.spans:
+                    writer.writerow([trace.frame_id, stage, f"{t0:.6f}", f"{t1:.6f}",
+                                     f"{(t1 - t0) * 1000.0:.3f}"])
+
+    def dump_chrome_trace(self, path):
+        with self._lock:
+            traces = list(self._traces)
+        stage_tids = {}
+        events = []
+        for trace in traces:
+            for stage, t0, t1 in trace.spans:
+                tid = stage_tids.setdefault(stage, len(stage_tids) + 1)
+                events.append({"name": stage, "ph": "X", "pid": self.name, "tid": tid,
+                               "ts": t0 * 1e6, "dur": (t1 - t0) * 1e6,
+                               "args": {"frame": trace.frame_id}})
+        for stage, tid in stage_tids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": self.name, "tid": tid,
+                           "args": {"name": stage}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
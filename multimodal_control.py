@@ -0,0 +1,183 @@
+from startup import find_serial_port, report_first_command
+import threading
+import time
+from robot_serial import RobotLink
+from telemetry import TelemetryBuffer
+from latency_probe import LatencyProbe
+from command_arbiter import CommandArbiter
+
+# ================= CONFIGURATION =================
+# Vision, gesture and voice run together as producer threads; the arbiter is the
+# only writer to the Arduino. Disable a source to run without its hardware/deps
+# (each producer imports its heavy libraries only when enabled).
+SERIAL_PORT = '/dev/cu.usbmodem1101'
+BAUD_RATE = 9600
+
+VISION_ENABLED = True
+GESTURE_ENABLED = True
+VOICE_ENABLED = True
+
+VISION_CAMERA = 1        # iPhone (Continuity Camera) facing the track
+GESTURE_CAMERA = 0       # Built-in camera facing the operator
+VISION_DRIVES = True     # False = vision only vetoes FORWARD, never steers by itself
+ARBITER_HZ = 50          # Idle tick rate; new proposals are arbitrated immediately
+TRACE_FILE = None        # '*.csv' or '*.json' (Chrome trace) for the arbiter ticks
+
+# =================================================
+
+
+# ================= PRODUCERS =================
+def vision_producer(arbiter, stop_event):
+    """YOLO obstacle avoidance: proposes w/a/d/x for every inferred frame."""
+    import cv2
+    import numpy as np
+    from inference_backends import select_backend
+    from detection_scheduler import DetectionScheduler
+    from vision_pipeline import start_pipeline, stop_pipeline
+    from vision_planner import TrackingPlanner
+
+    model = select_backend(['torch'], 'torch', np.zeros((480, 640, 3), np.uint8),
+                           weights='yolov8n.pt', imgsz=640, conf=0.35)
+    model = DetectionScheduler(model, full_every=4)
+    cap = cv2.VideoCapture(VISION_CAMERA)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    result_slot, pipeline_stop, threads = start_pipeline(cap, model.predict)
+    planner = TrackingPlanner()
+    last_result = None
+
+    while not stop_event.is_set():
+        packet = result_slot.get(timeout=0.5)
+        if packet is None:
+            continue
+        h, w = packet.frame.shape[:2]
+        cmd_char, cmd_text = planner.update(packet.results.xyxy, w, h, now=packet.frame_time,
+                                            fresh=packet.results is not last_result)
+        last_result = packet.results
+        if VISION_DRIVES or cmd_char != 'w':
+            arbiter.submit("vision", cmd_char, cmd_text)
+        else:
+            arbiter.withdraw("vision")
+
+    stop_pipeline(pipeline_stop, threads)
+    cap.release()
+
+
+def gesture_producer(arbiter, stop_event):
+    """MediaPipe hand gestures: proposes the debounced gesture command."""
+    import cv2
+    import mediapipe.python.solutions.hands as mp_hands
+    from gesture_features import classify_fingers, finger_states, handedness_label, landmarks_to_array
+    from gesture_filter import GestureFilter, gesture_confidence
+
+    hands = mp_hands.Hands(static_image_mode=False, max_num_hands=1,
+                           min_detection_confidence=0.8, min_tracking_confidence=0.5)
+    gesture_filter = GestureFilter()
+    cap = cv2.VideoCapture(GESTURE_CAMERA)
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+    while not stop_event.is_set():
+        success, img = cap.read()
+        if not success:
+            time.sleep(0.01)
+            continue
+        img_rgb = cv2.cvtColor(cv2.flip(img, 1), cv2.COLOR_BGR2RGB)
+        results = hands.process(img_rgb)
+
+        if results.multi_hand_landmarks:
+            hand_lms = results.multi_hand_landmarks[0]
+            points = landmarks_to_array(hand_lms)
+            fingers = finger_states(points, handedness_label(results.multi_handedness, 0))
+            display_text, cmd_char = classify_fingers(fingers)
+            gesture_filter.update(cmd_char, display_text, gesture_confidence(points, fingers))
+            # Refresh the proposal only while a hand is visible, so it expires when it leaves
+            if gesture_filter.active:
+                arbiter.submit("gesture", gesture_filter.active[0], gesture_filter.active[1])
+        else:
+            stop = gesture_filter.update_no_hand()
+            if stop:
+                arbiter.submit("gesture", stop[0], stop[1])
+
+    cap.release()
+
+
+def voice_producer(arbiter, stop_event):
+    """Speech recognition: proposes the command parsed from each utterance."""
+    import speech_recognition as sr
+    from command_parser import parse_command
+
+    recognizer = sr.Recognizer()
+    with sr.Microphone() as source:
+        recognizer.adjust_for_ambient_noise(source, duration=0.5)
+        while not stop_event.is_set():
+            try:
+                audio = recognizer.listen(source, timeout=1, phrase_time_limit=5)
+                text = recognizer.recognize_google(audio, language='en-US').lower()
+            except (sr.WaitTimeoutError, sr.UnknownValueError):
+                continue
+            except Exception as e:
+                print(f"[Voice Error] {e}")
+                continue
+            print(f"-> You said: {text}")
+            steps = parse_command(text)
+            if steps:
+                # The arbiter works on the current command; timed steps collapse to the last one
+                arbiter.submit("voice", steps[-1].command, f"{text.upper()} (VOICE)")
+
+
+def _guarded(name, target, arbiter, stop_event):
+    """Runs a producer; a crash withdraws its proposal instead of taking the arbiter down."""
+    def run():
+        try:
+            target(arbiter, stop_event)
+        except Exception as e:
+            print(f"❌ {name} producer stopped: {e}")
+        finally:
+            arbiter.withdraw(name)
+    return threading.Thread(target=run, name=name, daemon=True)
+
+
+# ================= MAIN =================
+def main():
+    # Nothing is opened at import time: the link starts connecting here, in the background
+    telemetry = TelemetryBuffer()
+    probe = LatencyProbe("arbiter")
+    link = RobotLink(find_serial_port(SERIAL_PORT, "multimodal.port"), BAUD_RATE,
+                     initial_command='0', on_frame=telemetry.on_frame,
+                     on_ack=lambda seq, rtt: probe.record("serial_ack", rtt),
+                     telemetry_interval_ms=100).start()
+    arbiter = CommandArbiter(link, telemetry=telemetry, probe=probe)
+    stop_event = threading.Event()
+
+    # Producers load their models and open their devices in their own threads, so
+    # YOLO, MediaPipe, the microphone and the serial handshake all start at once
+    producers = [
+        _guarded(name, target, arbiter, stop_event) for name, target, enabled in (
+            ("vision", vision_producer, VISION_ENABLED),
+            ("gesture", gesture_producer, GESTURE_ENABLED),
+            ("voice", voice_producer, VOICE_ENABLED),
+        ) if enabled
+    ]
+    for t in producers:
+        t.start()
+    report_first_command(link, probe)
+
+    print(f"🚀 Multimodal control started ({', '.join(t.name for t in producers)}). Ctrl+C to exit.")
+    try:
+        arbiter.run(stop_event, rate_hz=ARBITER_HZ)
+    except KeyboardInterrupt:
+        pass
+
+    # --- Resource Cleanup ---
+    stop_event.set()
+    for t in producers:
+        t.join(timeout=2.0)
+    link.close(stop_command='x')
+    print(f"🔒 Serial connection closed. Vetoes: {arbiter.vetoes}, "
+          f"rate limited: {arbiter.rate_limited}")
+    probe.print_summary()
+    if TRACE_FILE:
+        probe.dump(TRACE_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,147 +1,267 @@
-import cv2
+from startup import (find_serial_port, open_camera, report_first_command, run_parallel,
+                     since_launch)
+import signal
+import threading
 import time
-import serial
-import mediapipe.python.solutions.hands as mp_hands
-import mediapipe.python.solutions.drawing_utils as mp_draw
+from robot_serial import RobotLink
+from telemetry import TelemetryBuffer, ultrasonic_guard
+from latency_probe import LatencyProbe
+from gesture_features import (classify_fingers, finger_states, handedness_label,
+                              landmarks_to_array)
+from gesture_filter import GestureFilter, gesture_confidence
+from hand_roi import HandRoiTracker
+from replay import Recorder, RecordingCapture, ReplayCapture, replay_serial_factory
+
+# OpenCV and MediaPipe are imported inside main(): loading MediaPipe, opening the
+# camera and the Arduino handshake then all happen at the same time.
 
 # ================= CONFIGURATION =================
 SERIAL_ENABLED = True 
 SERIAL_PORT = '/dev/cu.usbmodem1101'  # Update this to your actual serial port path
 BAUD_RATE = 9600
+# Use index 1 for external cameras (e.g., iPhone/Continuity Camera) or 0 for built-in;
+# the other indices are tried if it fails, and the one that worked is cached
+CAMERA_INDEX = 1
+HEADLESS = False          # Skip landmark drawing and the preview window entirely
+TRACE_FILE = None         # '*.csv' / '*.json' dump of the per-stage latencies
+
+# --- Record / Replay ---
+# RECORD_PATH stores frames, landmarks and serial bytes of this run; REPLAY_PATH plays
+# one back instead of the camera and Arduino, every frame in order, as fast as possible
+RECORD_PATH = None
+REPLAY_PATH = None
+
+# --- Performance Mode (low-power Linux boards) ---
+PERFORMANCE_MODE = False
+INFERENCE_WIDTH = 320     # Frames are downscaled to this width before MediaPipe
+ROI_TRACKING = True       # Process only a crop around the last hand box
+MAX_PROCESS_FPS = 15      # Frames beyond this rate are grabbed but not processed
 # =================================================
 
-# --- Initialize Serial Communication ---
-ser = None
-last_command = None 
-
-if SERIAL_ENABLED:
-    try:
-        # Initialize serial connection with 1-second timeout
-        ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-        # Required delay for Arduino to reset after serial initialization
-        time.sleep(2) 
-        # Send '0' to ensure the car enters Manual Mode initially
-        ser.write(b'0')
-        print(f"✅ Serial connected: {SERIAL_PORT}. Switched to Manual Mode.")
-    except Exception as e:
-        print(f"❌ Serial connection failed: {e}")
-        SERIAL_ENABLED = False
-
-# --- Initialize MediaPipe Hands Solution ---
-# static_image_mode=False treats the input as a video stream
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=1,
-    min_detection_confidence=0.8,
-    min_tracking_confidence=0.5
-)
 
 def get_gesture(fingers, hand_lms):
     """
     Decodes the finger state list into specific vehicle movement commands.
     
     Args:
-        fingers (list): A list of 5 integers (0 or 1) representing thumb to pinky state.
+        fingers (list): 5 integers (0 or 1) representing thumb to pinky state.
         hand_lms: MediaPipe hand landmarks object (reserved for spatial logic).
         
     Returns:
         tuple: (Display String, Command Character)
     """
-    # STOP: All fingers closed (Fist)
-    if fingers == [0, 0, 0, 0, 0]:
-        return "STOP (0)", "x"
-    
-    # FORWARD: Five fingers open (allows minor thumb detection error)
-    if fingers == [1, 1, 1, 1, 1] or fingers == [0, 1, 1, 1, 1]:
-        return "FORWARD (5)", "w"
-    
-    # HARD LEFT: Index and Middle fingers open (Scissors gesture)
-    if fingers == [0, 1, 1, 0, 0]:
-        return "HARD LEFT (2)", "a"
-    
-    # HARD RIGHT: Index, Middle, and Ring fingers open
-    if fingers == [0, 1, 1, 1, 0]:
-        return "HARD RIGHT (3)", "d"
-    
-    # BACKWARD: Only thumb open (Thumbs-up gesture)
-    if fingers == [1, 0, 0, 0, 0]:
-        return "BACKWARD (1)", "s"
-        
-    return "UNKNOWN", "None"
-
-# --- Main Video Capture Loop ---
-# Use index 1 for external cameras (e.g., iPhone/Continuity Camera) or 0 for built-in
-cap = cv2.VideoCapture(1) 
-p_time = 0
-
-print("🚀 Gesture Control System Started! Press 'q' to exit.")
-
-while cap.isOpened():
-    success, img = cap.read()
-    if not success:
-        break
-
-    # Flip image horizontally for a natural mirror-like user experience
-    img = cv2.flip(img, 1) 
-    # MediaPipe requires RGB images; OpenCV uses BGR by default
-    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    results = hands.process(img_rgb)
-
-    cmd_char = "None"
-    display_text = "WAITING"
-
-    if results.multi_hand_landmarks:
-        for hand_lms in results.multi_hand_landmarks:
-            # Visualize hand skeleton connections
-            mp_draw.draw_landmarks(img, hand_lms, mp_hands.HAND_CONNECTIONS)
-            
-            # --- Finger State Detection Logic ---
-            fingers = []
-            
-            # Thumb: Check if the tip (ID 4) is outside the IP joint (ID 3) on the X-axis
-            # Note: This logic assumes a right hand facing the camera
-            if hand_lms.landmark[4].x < hand_lms.landmark[3].x:
-                fingers.append(1)
-            else: 
-                fingers.append(0)
-            
-            # Other 4 Fingers: Check if the tip Y-coordinate is above the PIP joint
-            # In computer vision, Y-axis increases downwards
-            for tip in [8, 12, 16, 20]:
-                if hand_lms.landmark[tip].y < hand_lms.landmark[tip-2].y:
-                    fingers.append(1)
-                else: 
-                    fingers.append(0)
-
-            # Map detected finger states to car commands
-            display_text, cmd_char = get_gesture(fingers, hand_lms)
-
-            # --- Serial Transmission Logic ---
-            # Implements command deduplication to avoid flooding the serial buffer
-            if SERIAL_ENABLED and cmd_char != "None":
-                if cmd_char != last_command:
-                    ser.write(cmd_char.encode())
-                    print(f"📡 Sending: {cmd_char} ({display_text})")
-                    last_command = cmd_char
-
-    # --- UI Rendering ---
-    # Draw status background and overlay current control command
-    cv2.rectangle(img, (0, 0), (350, 60), (0, 0, 0), -1)
-    cv2.putText(img, f"CONTROL: {display_text}", (10, 40), 
-                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    
-    cv2.imshow("Hand Control Mode", img)
-    
-    # Break loop on 'q' key press
-    if cv2.waitKey(1) & 0xFF == ord('q'): 
-        break
-
-# --- Resource Cleanup ---
-if ser:
-    # Safety: Stop the car motors before closing connection
-    ser.write(b'x') 
-    ser.close()
-    print("🔒 Serial connection closed.")
-
-cap.release()
-cv2.destroyAllWindows()
+    # Precomputed 32-entry table: STOP (fist), FORWARD (open palm), HARD LEFT
+    # (index+middle), HARD RIGHT (index+middle+ring), BACKWARD (thumb only)
+    return classify_fingers(fingers)
+
+
+# ================= STARTUP =================
+def connect_robot(telemetry, probe, recorder):
+    """
+    The link connects in the background, waits for the Arduino reset and then sends
+    '0' so the car enters Manual Mode; writes never block the video loop.
+    Ultrasonic/colour telemetry streams into `telemetry` every 100 ms.
+    """
+    if not SERIAL_ENABLED:
+        return None
+    if REPLAY_PATH:
+        port, serial_options = SERIAL_PORT, dict(reset_delay=0,
+                                                 serial_factory=replay_serial_factory(REPLAY_PATH))
+    else:
+        port = find_serial_port(SERIAL_PORT, "gesture.port")
+        serial_options = dict(serial_factory=recorder.serial_factory() if recorder else None)
+    link = RobotLink(port, BAUD_RATE, initial_command='0', on_frame=telemetry.on_frame,
+                     on_ack=lambda seq, rtt: probe.record("serial_ack", rtt),
+                     telemetry_interval_ms=100, **serial_options).start()
+    link.wait_connected(timeout=3.0)
+    return link
+
+
+def load_hands():
+    """
+    MediaPipe Hands; static_image_mode=False treats the input as a video stream and
+    model_complexity=0 selects the lighter landmark model in Performance Mode.
+    """
+    import mediapipe.python.solutions.hands as mp_hands
+    return mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=1,
+        model_complexity=0 if PERFORMANCE_MODE else 1,
+        min_detection_confidence=0.8,
+        min_tracking_confidence=0.5
+    )
+
+
+def open_video(recorder):
+    import cv2
+    if REPLAY_PATH:
+        cap = ReplayCapture(REPLAY_PATH)
+    else:
+        cap = open_camera([CAMERA_INDEX] + [i for i in (1, 0, 2) if i != CAMERA_INDEX],
+                          "gesture.camera")
+    if cap and recorder:
+        cap = RecordingCapture(cap, recorder)
+    if cap:
+        # Keep only the newest frame buffered so a throttled loop never processes stale images
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+# ================= MAIN LOOP =================
+def main():
+    import cv2
+    import mediapipe.python.solutions.hands as mp_hands
+    import mediapipe.python.solutions.drawing_utils as mp_draw
+
+    # Per-stage latency is collected in `probe`, plus the launch -> first command time
+    probe = LatencyProbe("gesture")
+    telemetry = TelemetryBuffer()
+    recorder = Recorder(RECORD_PATH) if RECORD_PATH else None
+    ready = run_parallel({
+        "serial": lambda: connect_robot(telemetry, probe, recorder),
+        "camera": lambda: open_video(recorder),
+        "mediapipe": load_hands,
+    })
+    link, cap, hands = ready["serial"], ready["camera"], ready["mediapipe"]
+    if link:
+        report_first_command(link, probe)
+    print(f"🚀 Started in {since_launch():.2f} s")
+    if not cap:
+        print("❌ No camera found.")
+        if link:
+            link.close(stop_command='x')
+        return
+
+    roi_tracker = HandRoiTracker() if PERFORMANCE_MODE and ROI_TRACKING else None
+
+    # --- Temporal Smoothing ---
+    # A command only takes effect once it wins 3 of the last 5 confident frames, and
+    # losing the hand for 0.5 s stops the car
+    gesture_filter = GestureFilter(window=5, min_votes=3, min_confidence=0.3, hold_to_stop=0.5)
+
+    frame_id = 0
+    last_process = 0.0
+    # The rate cap depends on wall-clock time, so replays process every frame instead
+    min_interval = (1.0 / MAX_PROCESS_FPS if PERFORMANCE_MODE and MAX_PROCESS_FPS and not REPLAY_PATH
+                    else 0.0)
+    show_ui = not HEADLESS
+
+    # Headless runs have no window to catch 'q'; Ctrl+C ends the loop cleanly instead
+    stop_requested = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_requested.set())
+
+    print("🚀 Gesture Control System Started! Press 'q' (or Ctrl+C) to exit.")
+
+    while not stop_requested.is_set() and cap.isOpened():
+        # Rate cap: grab() advances the camera without decoding the frame
+        if min_interval and time.monotonic() - last_process < min_interval:
+            cap.grab()
+            continue
+        last_process = time.monotonic()
+
+        frame_id += 1
+        trace = probe.begin(frame_id)
+        success, img = cap.read()
+        if not success:
+            break
+        trace.mark("capture")
+
+        if PERFORMANCE_MODE:
+            # Downscale first so flip/convert/inference all run on the small image
+            h, w = img.shape[:2]
+            if w > INFERENCE_WIDTH:
+                img = cv2.resize(img, (INFERENCE_WIDTH, int(h * INFERENCE_WIDTH / w)),
+                                 interpolation=cv2.INTER_AREA)
+
+        # Flip image horizontally for a natural mirror-like user experience
+        img = cv2.flip(img, 1) 
+        # Only the region around the last hand is processed when ROI tracking is on
+        crop, roi = roi_tracker.crop(img) if roi_tracker else (img, None)
+        # MediaPipe requires RGB images; OpenCV uses BGR by default
+        img_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+        trace.mark("preprocess")
+        results = hands.process(img_rgb)
+        if roi_tracker:
+            # Maps crop landmarks back to full-frame coordinates
+            roi_tracker.update(results.multi_hand_landmarks, roi, img.shape)
+        trace.mark("inference")
+
+        if results.multi_hand_landmarks:
+            for i, hand_lms in enumerate(results.multi_hand_landmarks):
+                # Visualize hand skeleton connections
+                if show_ui:
+                    mp_draw.draw_landmarks(img, hand_lms, mp_hands.HAND_CONNECTIONS)
+
+                # --- Finger State Detection Logic ---
+                # Landmarks become one (21, 3) array; all five fingers are compared at once.
+                # The thumb direction follows the detected hand, so left hands work too.
+                points = landmarks_to_array(hand_lms)
+                if recorder:
+                    recorder.log("landmarks", points, frame_id=frame_id)
+                fingers = finger_states(points, handedness_label(results.multi_handedness, i))
+
+                # Map detected finger states to car commands
+                display_text, cmd_char = get_gesture(fingers, hand_lms)
+
+                # Vote this frame's gesture into the temporal filter
+                gesture_filter.update(cmd_char, display_text, gesture_confidence(points, fingers))
+        else:
+            gesture_filter.update_no_hand()
+
+        # The filtered command is re-evaluated every frame; the link drops repeats
+        cmd_char, display_text = gesture_filter.active or ("None", "WAITING")
+
+        # Ultrasonic fusion: a FORWARD gesture cannot drive into a close obstacle
+        cmd_char, overridden = ultrasonic_guard(cmd_char, telemetry)
+        if overridden:
+            display_text = "STOP (OBSTACLE)"
+        trace.mark("decision")
+
+        # --- Serial Transmission Logic ---
+        # The link deduplicates commands to avoid flooding the serial buffer
+        if link and cmd_char != "None":
+            if link.send(cmd_char):
+                print(f"📡 Sending: {cmd_char} ({display_text})")
+        trace.mark("serial")
+
+        # --- UI Rendering ---
+        if not show_ui:
+            probe.finish(trace)
+            continue
+
+        # Draw status background and overlay current control command
+        cv2.rectangle(img, (0, 0), (350, 90), (0, 0, 0), -1)
+        cv2.putText(img, f"CONTROL: {display_text}", (10, 40), 
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(img, probe.overlay_text(), (10, 75),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
+        if roi:
+            cv2.rectangle(img, roi[:2], roi[2:], (255, 200, 0), 1)
+
+        cv2.imshow("Hand Control Mode", img)
+        trace.mark("render")
+        probe.finish(trace)
+
+        # Break loop on 'q' key press
+        if cv2.waitKey(1) & 0xFF == ord('q'): 
+            break
+
+
+    # --- Resource Cleanup ---
+    if link:
+        # Safety: Stop the car motors before closing connection
+        link.close(stop_command='x')
+        print("🔒 Serial connection closed.")
+
+    cap.release()
+    if show_ui:
+        cv2.destroyAllWindows()
+    if recorder:
+        recorder.close()
+    probe.print_summary()
+    if TRACE_FILE:
+        probe.dump(TRACE_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,13 @@
-import cv2
-import torch
-import serial
-import time
-from ultralytics import YOLO
+from startup import (find_serial_port, open_camera, report_first_command, run_parallel,
+                     since_launch)
+from robot_serial import RobotLink
+from telemetry import TelemetryBuffer, ultrasonic_guard
+from latency_probe import LatencyProbe
+from vision_planner import TrackingPlanner, free_space_steering, get_drive_command, steering_to_pwm
+from replay import Recorder, RecordingCapture, ReplayCapture, replay_serial_factory
+
+# OpenCV, NumPy-heavy backends and torch/ultralytics are imported inside main(), so the
+# serial handshake, the camera probe and the model load can start at the same time.
 
 # ================= 1. HARDWARE COMMUNICATION CONFIG =================
 # Define the serial port address (specific to macOS/Unix-like systems)
@@ -10,147 +15,262 @@ SERIAL_PORT = '/dev/cu.usbmodem101'
 # Baud rate must match the configuration in your Arduino sketch
 BAUD_RATE = 9600                     
 
-try:
-    # Initialize serial connection with a short timeout for responsiveness
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=0.1)
-    print(f"✅ Serial connected successfully: {SERIAL_PORT}")
-    
-    # [CORE LOGIC] Wait for Arduino bootloader to reset, then force Manual Mode (mode 0)
-    time.sleep(2)  
-    ser.write(b'0') 
-    print("📡 Mode '0' sent: Car switched to Manual Control Mode.")
-except Exception as e:
-    print(f"⚠️ Serial connection failed, entering Preview-only mode: {e}")
-    ser = None
+# Record a run (frames, detections, serial bytes) to RECORD_PATH, or replay one from
+# REPLAY_PATH instead of the camera and Arduino. Replays process every frame in order,
+# as fast as possible; HEADLESS skips the preview window (e.g. on a Linux server).
+RECORD_PATH = None
+REPLAY_PATH = None
+HEADLESS = False
+
+# The HUD is redrawn at RENDER_FPS, independently of the control rate (0 = every frame).
+# MJPEG_PORT streams it to http://127.0.0.1:<port>/ (browser/VLC), also when HEADLESS.
+RENDER_FPS = 15
+MJPEG_PORT = None
+
+# Set TRACE_FILE to '*.csv' or '*.json' (Chrome trace) to dump the per-stage latencies.
+# The last port and camera index that worked are cached in device_cache.json.
+TRACE_FILE = None
+CAMERA_INDICES = [1, 2, 0]   # Index 1/2 (Continuity Camera), Index 0 (FaceTime Camera)
 
 # ================= 2. VISION MODEL INITIALIZATION =================
-# Load the pre-trained YOLOv8-nano model (lightweight for real-time inference)
-model = YOLO('yolov8n.pt') 
-# Use Apple Silicon GPU (MPS) if available; otherwise, fallback to CPU
-device = 'mps' if torch.backends.mps.is_available() else 'cpu'
-model.to(device)
-
-def get_drive_command(boxes, frame_width, frame_height):
-    """
-    Implements obstacle avoidance logic based on spatial object detection.
-    
-    Args:
-        boxes: List of bounding boxes from YOLO results.
-        frame_width (int): Width of the video frame.
-        frame_height (int): Height of the video frame.
-        
-    Returns:
-        tuple: (Command Character, Descriptive String)
-    """
-    # [CORE SETTING] Danger zone threshold: objects crossing 50% height trigger avoidance
-    danger_line_y = frame_height * 0.5 
-    
-    # Divide the horizontal frame into three equal sectors: Left, Center, Right
-    left_boundary = frame_width // 3
-    right_boundary = 2 * (frame_width // 3)
-    
-    center_blocked = False
-    left_blocked = False
-    right_blocked = False
-
-    for box in boxes:
-        # xyxy format: [top-left-x, top-left-y, bottom-right-x, bottom-right-y]
-        x1, y1, x2, y2 = box.xyxy[0].tolist()
-        
-        # Obstacle Check: Is the bottom of the object (y2) below the danger line?
-        if y2 > danger_line_y:
-            # Determine which horizontal sectors are obstructed by the object
-            if x1 < left_boundary:
-                left_blocked = True
-            if x2 > right_boundary:
-                right_blocked = True
-            if (x1 < right_boundary and x2 > left_boundary):
-                center_blocked = True
-
-    # --- Decision Tree Logic ---
-    if center_blocked:
-        if not left_blocked:
-            return 'a', "HARD LEFT"   # Front blocked, path clear on left
-        elif not right_blocked:
-            return 'd', "HARD RIGHT"  # Front/Left blocked, path clear on right
-        else:
-            return 'x', "STOP"        # No clear path in any direction
-    
-    return 'w', "FORWARD"             # Path clear in center
-
-# ================= 3. CAMERA & MAIN LOOP =================
-def open_iphone_camera():
-    """
-    Attempts to initialize the camera using common indices.
-    Priority: Index 1/2 (Continuity Camera), Index 0 (FaceTime Camera).
-    """
-    for index in [1, 2, 0]:
-        print(f"Attempting to open camera index: {index}...")
-        cap = cv2.VideoCapture(index)
-        if cap.isOpened():
-            # Mandatory handshake delay for Continuity Camera to prevent black frame
-            time.sleep(2.0) 
-            success, _ = cap.read()
-            if success:
-                print(f"✅ Successfully connected to camera {index}")
-                return cap
-            cap.release()
-    return None
-
-cap = open_iphone_camera()
-if not cap:
-    print("❌ No camera found. Ensure iPhone is unlocked and trusted.")
-    exit()
-
-last_cmd = ''  # Storage for command deduplication
-
-while True:
-    success, frame = cap.read()
-    if not success: 
-        continue 
+# Backend: 'torch' (PyTorch, MPS/CPU), 'torchscript', 'onnxruntime', 'openvino' or
+# 'auto' to pick the fastest one measured at startup. Exports are cached in model_cache/.
+INFERENCE_BACKEND = 'torch'
+BACKEND_CANDIDATES = ['torch', 'onnxruntime', 'openvino']
+INFER_IMGSZ = 640        # e.g. 320 on CPU-only boards for ~4x fewer FLOPs
+INFER_THREADS = 0        # 0 = let the runtime decide
+INFER_INT8 = False       # INT8 quantization for the ONNX Runtime / OpenVINO backends
+
+# Only the band around/below the danger line is sent to the detector, and in a static
+# scene full detection runs every DETECT_EVERY frames (motion in the band forces a run)
+ROI_SCHEDULER_ENABLED = True
+DETECT_EVERY = 4
+
+# Decide on tracked obstacles (Kalman + IoU) instead of single-frame boxes: one noisy
+# frame no longer triggers a turn, approaching obstacles block early by time-to-collision,
+# and on frames where the scheduler reuses old boxes the tracks coast on their velocity.
+TRACKING_ENABLED = True
+
+# 'sectors': left/center/right decision, full-power w/a/d/x commands.
+# 'free_space': steer towards the widest gap between obstacles with proportional
+# per-wheel PWM (needs the binary protocol; old firmware gets the nearest w/a/d/x).
+STEERING_MODE = 'sectors'
+
+
+# ================= 3. STARTUP =================
+def connect_robot(telemetry, probe, recorder):
+    """Starts the link (non-blocking) and waits for the handshake, for the startup report."""
+    if REPLAY_PATH:
+        port, serial_options = SERIAL_PORT, dict(reset_delay=0,
+                                                 serial_factory=replay_serial_factory(REPLAY_PATH))
+    else:
+        port = find_serial_port(SERIAL_PORT, "vision.port")
+        serial_options = dict(serial_factory=recorder.serial_factory() if recorder else None)
+    link = RobotLink(port, BAUD_RATE, initial_command='0', on_frame=telemetry.on_frame,
+                     on_ack=lambda seq, rtt: probe.record("serial_ack", rtt),
+                     telemetry_interval_ms=100, **serial_options).start()
+    link.wait_connected(timeout=3.0)
+    return link
+
+
+def load_model():
+    """Loads the YOLOv8-nano model (lightweight for real-time inference) and warms it up."""
+    import numpy as np
+    from inference_backends import create_backend, measure_latency, select_backend
+    from detection_scheduler import DetectionScheduler
 
+    options = dict(weights='yolov8n.pt', imgsz=INFER_IMGSZ, conf=0.35, threads=INFER_THREADS,
+                   int8=INFER_INT8)
+    dummy = np.zeros((480, 640, 3), np.uint8)
+    if INFERENCE_BACKEND == 'auto':
+        # The latency report benchmarks every candidate, so only run it when choosing
+        model = select_backend(BACKEND_CANDIDATES, 'auto', dummy, **options)
+    else:
+        # Only the configured backend is measured (the warm-up doubles as the benchmark)
+        model = create_backend(INFERENCE_BACKEND, **options)
+        ms = measure_latency(model, dummy, runs=5)
+        print(f"⏱️  Inference latency: {INFERENCE_BACKEND} {ms:.1f} ms/frame ({1000.0 / ms:.1f} FPS)")
+    if ROI_SCHEDULER_ENABLED:
+        model = DetectionScheduler(model, full_every=DETECT_EVERY)
+    return model
+
+
+def open_video(recorder):
+    import cv2
+    cap = ReplayCapture(REPLAY_PATH) if REPLAY_PATH else open_camera(CAMERA_INDICES, "vision.camera")
+    if not cap:
+        return None
+    if recorder:
+        cap = RecordingCapture(cap, recorder)
+    # Keep only one frame in the driver buffer so cap.read() returns the newest image
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+# ================= 4. HUD =================
+def draw_static_hud(canvas, w, h):
+    """Sector grid and danger line; rasterized once per frame size by HudRenderer."""
+    import cv2
+    draw_line_y = int(h * 0.5)
+    # Draw vertical grid lines for the three sectors
+    cv2.line(canvas, (w//3, 0), (w//3, h), (200, 200, 200), 1)
+    cv2.line(canvas, (2*w//3, 0), (2*w//3, h), (200, 200, 200), 1)
+    # Draw the [Red Danger Threshold Line]
+    cv2.line(canvas, (0, draw_line_y), (w, draw_line_y), (0, 0, 255), 3)
+
+
+def draw_hud(hud, frame, result, cmd_char, cmd_text, steering, planner, probe):
+    """Draws detections, the static overlay and the per-frame text onto `frame` in place."""
+    import cv2
     h, w, _ = frame.shape
     draw_line_y = int(h * 0.5)
 
-    # Run YOLOv8 inference (silent mode enabled to keep console clean)
-    results = model.predict(frame, conf=0.35, device=device, verbose=False)
-    
-    # Calculate driving decision based on current detection
-    cmd_char, cmd_text = get_drive_command(results[0].boxes, w, h)
-    
-    # --- Serial Communication Logic ---
-    # Only send a byte if the command has changed (reduces serial buffer congestion)
-    if ser and cmd_char != last_cmd:
-        ser.write(cmd_char.encode())
-        last_cmd = cmd_char
-        print(f"📡 Serial Command: {cmd_text} ({cmd_char})")
-
-    # --- Visualization & UI ---
     # Draw detected objects and bounding boxes
-    annotated_frame = results[0].plot()
-    
-    # Draw vertical grid lines for the three sectors
-    cv2.line(annotated_frame, (w//3, 0), (w//3, h), (200, 200, 200), 1)
-    cv2.line(annotated_frame, (2*w//3, 0), (2*w//3, h), (200, 200, 200), 1)
-    
-    # Draw the [Red Danger Threshold Line]
-    cv2.line(annotated_frame, (0, draw_line_y), (w, draw_line_y), (0, 0, 255), 3)
-    
+    result.plot(frame, inplace=True)
+    hud.stamp_overlay(frame, draw_static_hud)
+    if steering is not None and steering.gap:
+        # Chosen free gap along the danger line, and the heading into it
+        cv2.line(frame, (steering.gap[0], draw_line_y), (steering.gap[1], draw_line_y),
+                 (0, 255, 0), 5)
+        cv2.line(frame, (w // 2, h), ((steering.gap[0] + steering.gap[1]) // 2,
+                                      draw_line_y), (0, 255, 0), 2)
+
     # Display the current command on screen
     text_color = (0, 0, 255) if cmd_char == 'x' else (0, 255, 0)
-    cv2.putText(annotated_frame, f"CMD: {cmd_text}", (20, 60), 
+    cv2.putText(frame, f"CMD: {cmd_text}", (20, 60),
                 cv2.FONT_HERSHEY_SIMPLEX, 1.2, text_color, 3)
+    cv2.putText(frame, probe.overlay_text(), (20, 100),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    if planner:
+        for track in planner.tracks:
+            if track.confirmed:
+                x1, y1 = int(track.xyxy[0]), int(track.xyxy[1])
+                color = (0, 0, 255) if track.track_id in planner.blocking else (255, 200, 0)
+                cv2.putText(frame, f"#{track.track_id}", (x1, max(15, y1 - 25)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+        if planner.nearest_ttc < float("inf"):
+            cv2.putText(frame, f"TTC: {planner.nearest_ttc:.1f}s", (20, 135),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 165, 255), 2)
+
+
+# ================= 5. MAIN LOOP =================
+def main():
+    from vision_pipeline import start_pipeline, stop_pipeline
+    from hud_renderer import HudRenderer
+
+    # Per-stage latency (capture -> inference -> decision -> serial -> render, plus the
+    # Arduino ACK round-trip and the launch -> first command time)
+    probe = LatencyProbe("vision")
+    telemetry = TelemetryBuffer()
+    recorder = Recorder(RECORD_PATH) if RECORD_PATH else None
+
+    # [CORE LOGIC] The link opens the port in the background, waits for the Arduino
+    # bootloader to reset, then forces Manual Mode (mode 0); the firmware also streams
+    # ultrasonic/colour telemetry every 100 ms into `telemetry`. Serial handshake,
+    # camera probe and model load/warm-up all run at the same time.
+    ready = run_parallel({
+        "serial": lambda: connect_robot(telemetry, probe, recorder),
+        "camera": lambda: open_video(recorder),
+        "model": load_model,
+    })
+    link, cap, model = ready["serial"], ready["camera"], ready["model"]
+    report_first_command(link, probe)
+    print(f"🚀 Started in {since_launch():.2f} s")
+    if not cap:
+        print("❌ No camera found. Ensure iPhone is unlocked and trusted.")
+        link.close(stop_command='x')
+        return
+
+    planner = TrackingPlanner() if TRACKING_ENABLED else None
+    last_result = None
+    hud = HudRenderer("Mac-Robot AI Vision Control", render_fps=RENDER_FPS,
+                      show_window=not HEADLESS, mjpeg_port=MJPEG_PORT)
+
+    # Capture and inference run in their own threads; this loop is the render/serial stage.
+    # Each stage only ever sees the newest frame, so stale frames are dropped, not queued.
+    result_slot, stop_event, pipeline_threads = start_pipeline(cap, model.predict,
+                                                               threaded=not REPLAY_PATH)
+
+    while True:
+        try:
+            packet = result_slot.get(timeout=0.5)
+        except Exception as e:
+            # Inference died: stop the car (cleanup below) rather than keep the last command
+            print(f"❌ Vision pipeline stopped: {e}")
+            break
+        if packet is None:
+            if not cap.isOpened() or REPLAY_PATH:
+                break       # End of the replay
+            if hud.poll_key() & 0xFF == ord("q"):
+                break
+            continue
+
+        frame, result = packet.frame, packet.results
+        trace = probe.begin(packet.frame_id, start=packet.captured_at)
+        trace.add("queue_wait", packet.captured_at, packet.infer_started_at)
+        trace.add("inference", packet.infer_started_at, packet.inferred_at)
+        trace.mark("handoff")
+        h, w, _ = frame.shape
+
+        # Calculate driving decision based on current detection (all boxes in one batch)
+        if planner:
+            cmd_char, cmd_text = planner.update(result.xyxy, w, h, now=packet.frame_time,
+                                                fresh=result is not last_result)
+        else:
+            cmd_char, cmd_text = get_drive_command(result.xyxy, w, h)
+        last_result = result
+        if recorder:
+            recorder.log("detections", result.xyxy, frame_id=packet.frame_id)
+
+        steering = None
+        if STEERING_MODE == 'free_space':
+            steering = planner.steer(w, h) if planner else free_space_steering(result.xyxy, w, h)
+            wheels = steering_to_pwm(steering)
+            cmd_char = 'x' if wheels == (0, 0) else 'w'
+            cmd_text = (f"STEER {steering.angle_deg:+.0f} deg {steering.speed * 100:.0f}%"
+                        if steering.speed > 0 else "STOP (NO GAP)")
+
+        # Ultrasonic fusion: never drive forward into something the camera missed
+        cmd_char, overridden = ultrasonic_guard(cmd_char, telemetry)
+        if overridden:
+            cmd_text = "STOP (ULTRASONIC)"
+        trace.mark("decision")
+
+        # --- Serial Communication Logic ---
+        # Only queue a byte if the command has changed (reduces serial buffer congestion)
+        if steering is not None and cmd_char != 'x':
+            if link.drive(*wheels):
+                print(f"📡 Serial Command: {cmd_text} (L {wheels[0]}, R {wheels[1]})")
+        elif link.send(cmd_char):
+            print(f"📡 Serial Command: {cmd_text} ({cmd_char})")
+        trace.mark("serial")
+
+        # --- Visualization & UI ---
+        # Drawn in place on the frame (no copy), and only when a HUD frame is due
+        if hud.due():
+            draw_hud(hud, frame, result, cmd_char, cmd_text, steering, planner, probe)
+            key = hud.show(frame)
+            trace.mark("render")
+        else:
+            key = -1
+        probe.finish(trace)
+
+        # Press 'q' to release resources and stop the program
+        if key & 0xFF == ord("q"):
+            break
+
+
+    # --- Cleanup ---
+    stop_pipeline(stop_event, pipeline_threads)
+    cap.release()
+    hud.close()
+    link.close(stop_command='x')  # Emergency stop command
+    if recorder:
+        recorder.close()
+    probe.print_summary()
+    if TRACE_FILE:
+        probe.dump(TRACE_FILE)
+
 
-    cv2.imshow("Mac-Robot AI Vision Control", annotated_frame)
-    
-    # Press 'q' to release resources and stop the program
-    if cv2.waitKey(1) & 0xFF == ord("q"):
-        if ser: 
-            ser.write(b'x')  # Emergency stop command
-        break
-
-# --- Cleanup ---
-cap.release()
-cv2.destroyAllWindows()
-if ser: 
-    ser.close()
+if __name__ == "__main__":
+    main()
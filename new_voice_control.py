@@ -1,134 +1,221 @@
-import speech_recognition as sr
-from google import genai
-from elevenlabs.client import ElevenLabs
-import serial
-import time
-import subprocess
+from startup import find_serial_port, run_parallel, since_launch
+import asyncio
 import os
+import threading
+from robot_serial import RobotLink
+from command_parser import parse_command
+from latency_probe import LatencyProbe
+from voice_pipeline import NullPlayer, PipePlayer, VoicePipeline, echo_reply, silent_tts
+from keyword_spotter import TEMPLATES_FILE, KeywordSpotter, KeywordStream
+from response_cache import ResponseCache, cached_stream, prewarm
 
 # ================= Setting =================
-SERIAL_PORT = "/dev/cu.usbmodem1101" 
+SERIAL_PORT = "/dev/cu.usbmodem1101"
 BAUD_RATE = 9600
 
-# --- CHANGE 1: Track last_command like your gesture code ---
-last_command = None 
-
-try:
-    ser = serial.Serial(SERIAL_PORT, BAUD_RATE, timeout=1)
-    time.sleep(2) 
-    if ser.is_open:
-        ser.write(b'0') # Ensure Manual Mode on start
-    print(f"[Status] Connected to Robot on {SERIAL_PORT}")
-except Exception as e:
-    print(f"[Serial Error] Could not open serial port: {e}")
-    ser = None
-
-gemini_client = genai.Client(api_key="")
-MODEL_ID = "gemini-3-flash-preview" 
+# OFFLINE swaps Gemini/ElevenLabs/audio output for local stubs (no keys or network
+# needed for the reply path; speech recognition still uses the microphone)
+OFFLINE = False
+
+# Offline keyword spotting fast path: with enrolled templates (python keyword_spotter.py)
+# motion commands fire locally ~150 ms after the word ends; cloud recognition is then
+# only used for the conversational reply
+KWS_ENABLED = True
+
+# Per-utterance latency: recognize -> command -> llm_first_chunk -> tts_first_audio -> reply
+probe = LatencyProbe("voice")
+
+# Nothing below touches the serial port, the disk cache or the network at import time:
+# the link, cache and pipeline are created in main(). The Gemini/ElevenLabs SDKs and
+# speech_recognition are slow to import; they are loaded in parallel with the serial
+# handshake and the microphone calibration
+link = None
+cache = None
+pipeline = None
+gemini_client = None
+el_client = None
+recognizer = None
+MODEL_ID = "gemini-3-flash-preview"
 ELEVENLABS_KEY = ""
-el_client = ElevenLabs(api_key=ELEVENLABS_KEY)
-
-COMMAND_MAP = {
-    "forward": "w",
-    "backward": "s",
-    "left": "a",
-    "right": "d",
-    "stop": "x",
-    "auto": "1",
-    "manual": "0"
+VOICE_ID = "cgSgspJ2msm6clMCkdW9"
+TTS_MODEL_ID = "eleven_multilingual_v2"
+TTS_FORMAT = "mp3_44100_128"
+
+# Replies and speech are cached on disk (voice_cache/, LRU, size-capped). Motion
+# commands get a canned acknowledgement instead of a Gemini call; their audio is
+# synthesized once at startup, so they play without any API call.
+CANNED_REPLIES = {
+    'w': "Moving forward!",
+    's': "Backing up!",
+    'a': "Turning left!",
+    'd': "Turning right!",
+    'x': "Stopping now.",
+    '1': "Switching to auto mode.",
+    '0': "Manual mode, at your command.",
 }
 
+def connect_robot():
+    """Non-blocking link: connects in the background, then sends '0' (Manual Mode on start)"""
+    return RobotLink(find_serial_port(SERIAL_PORT, "voice.port"), BAUD_RATE, initial_command='0',
+                     on_ack=lambda seq, rtt: probe.record("serial_ack", rtt)).start()
+
+def create_clients():
+    global gemini_client, el_client
+    from google import genai
+    from elevenlabs.client import ElevenLabs
+    gemini_client = genai.Client(api_key="")
+    el_client = ElevenLabs(api_key=ELEVENLABS_KEY)
+
 def send_robot_command(text):
-    """Refined to match the stability of your gesture code"""
-    global last_command
-    if ser is None or not ser.is_open: 
-        return
-    
-    text = text.lower()
-    cmd_to_send = None
-    
-    # Find the matching command
-    for word, cmd_char in COMMAND_MAP.items():
-        if word in text:
-            cmd_to_send = cmd_char
-            break
-            
-    # --- CHANGE 2: Deduplication Logic ---
-    if cmd_to_send and cmd_to_send != last_command:
-        # If it's a direction, force manual mode '0' first to override 'competitionRun'
-        if cmd_to_send in ['w', 's', 'a', 'd']:
-            ser.write(b'0')
-            time.sleep(0.01)
-            
-        ser.write(cmd_to_send.encode())
-        ser.flush() # Ensure it leaves the Python buffer immediately
-        print(f"[Robot] >>> SENT: {cmd_to_send.upper()}")
-        last_command = cmd_to_send
-    elif not cmd_to_send:
+    """Parses the utterance (synonyms, negation, durations) and sends its command sequence"""
+    steps = parse_command(text)
+    if not steps:
         print(f"[Robot] No command in: '{text}'")
+        return
 
-def text_to_speech(text):
-    # (Keep your original TTS function exactly as it was)
-    print("[Status] Converting text to speech...")
-    try:
-        response = el_client.text_to_speech.convert(
-            voice_id="cgSgspJ2msm6clMCkdW9",
-            text=text,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_44100_128"
-        )
-        audio_bytes = b"".join(response)
-        with open("reply.mp3", "wb") as f:
-            f.write(audio_bytes)
-
-        print("[Status] Playing audio...")
-        subprocess.run(["afplay", "reply.mp3"]) 
-    except Exception as e:
-        print(f"[TTS Error] {e}")
+    # If it's a direction, force manual mode '0' first to override 'competitionRun'
+    steps = [('0' + cmd if cmd in 'wsad' else cmd, ms) for cmd, ms in steps]
+    if len(steps) == 1 and not steps[0][1]:
+        # Deduplication is handled by the link
+        if link.send(steps[0][0]):
+            print(f"[Robot] >>> SENT: {steps[0][0][-1].upper()}")
+    else:
+        link.send_sequence(steps)
+        print(f"[Robot] >>> SEQUENCE: {', '.join(f'{c[-1].upper()} {ms}ms' for c, ms in steps)}")
 
-def listen_and_talk():
-    recognizer = sr.Recognizer()
-    
-    with sr.Microphone() as source:
-        print("\n[Status] Listening...")
-        recognizer.adjust_for_ambient_noise(source, duration=0.5)
-        
-        try:
-            audio = recognizer.listen(source, timeout=5, phrase_time_limit=5)
-            user_text = recognizer.recognize_google(audio, language='en-US')
-            print(f"-> You said: {user_text}")
-            
-            # --- CHANGE 3: Action occurs BEFORE the Gemini/TTS delay ---
-            send_robot_command(user_text)
-            
-            print("[Status] Gemini is thinking...")
-            response = gemini_client.models.generate_content(
-                model=MODEL_ID,
-                contents=f"""
+def gemini_reply_stream(user_text):
+    """Streams the conversational reply as text chunks."""
+    response = gemini_client.models.generate_content_stream(
+        model=MODEL_ID,
+        contents=f"""
 The user said: "{user_text}"
 
 Respond naturally in a friendly way as a talking robot.
 Keep it short but conversational (1–2 sentences).
 """,
-            )
-            reply_text = response.text
-            print(f"\n[Gemini]: {reply_text}")
-            text_to_speech(reply_text)
-            
-        except sr.WaitTimeoutError:
-            print("[Mic] No speech detected.")
-        except sr.UnknownValueError:
-            print("[Mic] Could not understand.")
-        except Exception as e:
-            print(f"[Error] {e}")
+    )
+    for chunk in response:
+        if chunk.text:
+            yield chunk.text
 
-if __name__ == "__main__":
+def text_to_speech_stream(text):
+    """Streams MP3 chunks for one sentence straight from ElevenLabs (no reply.mp3)."""
+    yield from el_client.text_to_speech.stream(
+        voice_id=VOICE_ID,
+        text=text,
+        model_id=TTS_MODEL_ID,
+        output_format=TTS_FORMAT
+    )
+
+cached_gemini_stream = None
+cached_tts_stream = None
+
+def open_cache():
+    global cache, cached_gemini_stream, cached_tts_stream
+    cache = ResponseCache()
+    cached_gemini_stream = cached_stream(cache, ("llm", MODEL_ID), gemini_reply_stream, text=True)
+    cached_tts_stream = cached_stream(cache, ("tts", VOICE_ID, TTS_MODEL_ID, TTS_FORMAT),
+                                      text_to_speech_stream)
+
+def reply_stream(user_text):
+    """Canned acknowledgement for commands, (cached) Gemini reply for everything else."""
+    steps = parse_command(user_text)
+    if steps:
+        yield CANNED_REPLIES[steps[-1].command]
+    else:
+        yield from cached_gemini_stream(user_text)
+
+def kws_active():
+    return KWS_ENABLED and os.path.exists(TEMPLATES_FILE)
+
+# Set while the keyword spotter is listening; cleared if it fails (e.g. the audio device
+# allows only one opener), so recognized text drives the car again
+kws_running = threading.Event()
+
+def dispatch_text(text):
+    """With the fast path running, recognized text only drives the reply."""
+    if not kws_running.is_set():
+        send_robot_command(text)
+
+def run_kws(kws, stop_event):
+    try:
+        kws.run_microphone(stop_event)
+    except Exception as e:
+        print(f"⚠️ Keyword spotting stopped ({e!r}); using cloud recognition for commands")
+    finally:
+        kws_running.clear()
+
+def on_keyword(keyword, distance, compute_ms):
+    probe.record("kws_compute", compute_ms)
+    print(f"⚡ Keyword: {keyword} (d={distance:.2f})")
+    send_robot_command(keyword)
+
+def recognize(audio):
+    return recognizer.recognize_google(audio, language='en-US')
+
+def build_pipeline():
+    return VoicePipeline(
+        recognize=recognize,
+        dispatch=dispatch_text,
+        reply_stream=echo_reply if OFFLINE else reply_stream,
+        tts_stream=silent_tts if OFFLINE else cached_tts_stream,
+        player_factory=NullPlayer if OFFLINE or PipePlayer.find_command() is None else PipePlayer,
+        probe=probe,
+    )
+
+def open_microphone():
+    """Ambient noise is calibrated once; the background listener reuses the threshold."""
+    global recognizer
+    import speech_recognition as sr
+    recognizer = sr.Recognizer()
+    microphone = sr.Microphone()
+    with microphone as source:
+        print("[Status] Calibrating ambient noise...")
+        recognizer.adjust_for_ambient_noise(source, duration=0.5)
+    recognizer.dynamic_energy_threshold = False
+    return microphone
+
+async def listen(microphone):
+    if not OFFLINE:
+        prewarm(cached_tts_stream, CANNED_REPLIES.values())
+
+    kws_stop = threading.Event()
+    if kws_active():
+        kws = KeywordStream(KeywordSpotter.load(TEMPLATES_FILE), on_keyword)
+        kws_running.set()
+        threading.Thread(target=run_kws, args=(kws, kws_stop), name="kws", daemon=True).start()
+        print("[Status] Offline keyword spotting enabled.")
+
+    runner = asyncio.create_task(pipeline.run())
+    await asyncio.to_thread(pipeline.ready.wait)
+    stop_listening = recognizer.listen_in_background(
+        microphone, lambda _, audio: pipeline.submit_audio(audio), phrase_time_limit=5)
+    print("[Status] Listening continuously... (Ctrl+C to quit)")
+    try:
+        await runner
+    finally:
+        stop_listening(wait_for_stop=False)
+        kws_stop.set()
+
+def main():
+    global link, pipeline
     print(f"--- Robot Voice Controller ({MODEL_ID}) ---")
-    while True:
-        user_input = input("\nPress Enter to speak, or 'q' to quit: ")
-        if user_input.lower() == 'q':
-            if ser: 
-                ser.write(b'x')
-                ser.close()
-            break
-        listen_and_talk()
+    link = connect_robot()
+    open_cache()
+    pipeline = build_pipeline()
+    try:
+        tasks = {"serial": lambda: link.wait_connected(timeout=3.0), "microphone": open_microphone}
+        if not OFFLINE:
+            tasks["clients"] = create_clients
+        ready = run_parallel(tasks)
+        print(f"🚀 Ready to listen {since_launch():.2f} s after launch")
+        asyncio.run(listen(ready["microphone"]))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        link.close(stop_command='x')
+        print(f"[Cache] {cache.hits} hits, {cache.misses} misses, {cache.size / 1e6:.1f} MB")
+        probe.print_summary()
+
+if __name__ == "__main__":
+    main()
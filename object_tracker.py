@@ -0,0 +1,185 @@
+from typing import NamedTuple
+
+import numpy as np
+
+# ================= SORT-STYLE OBSTACLE TRACKER =================
+# Constant-velocity Kalman filters over the YOLO boxes, associated frame to frame
+# by IoU (greedy, highest overlap first). All tracks are filtered together as
+# stacked arrays, so a step costs a handful of NumPy calls regardless of how many
+# obstacles are visible. Time steps come from the frame timestamps, so skipped
+# or reused detections (DetectionScheduler) do not distort the velocities.
+#
+#   tracker = ObstacleTracker()
+#   tracks = tracker.update(result.xyxy, packet.frame_time)    # fresh detections
+#   tracks = tracker.update(None, packet.frame_time)           # predict only
+#   ttc = time_to_collision(tracks[0], frame_height)
+#
+# State per track: [x1, y1, x2, y2, vx1, vy1, vx2, vy2] in pixels and pixels/s.
+
+IOU_THRESHOLD = 0.3
+MIN_HITS = 3                # Detections before a track is trusted (confirmed)
+MAX_MISSES = 5              # Detection frames without a match before a track is dropped
+MIN_APPROACH_SPEED = 5.0    # px/s of bottom-edge motion below which TTC is infinite
+
+_I4 = np.eye(4)
+
+
+class Track(NamedTuple):
+    track_id: int
+    xyxy: np.ndarray        # Filtered box, float32 (4,)
+    velocity_y2: float      # Bottom-edge velocity in px/s; > 0 = moving down = approaching
+    hits: int
+    misses: int
+    confirmed: bool
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy arrays as an (N, M) array."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(br - tl, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(iou, threshold):
+    """(track index, detection index) pairs, best overlap first, each used at most once."""
+    pairs = []
+    if iou.size == 0:
+        return pairs
+    rows, cols = np.nonzero(iou >= threshold)
+    order = np.argsort(-iou[rows, cols])
+    used_rows, used_cols = set(), set()
+    for k in order:
+        r, c = int(rows[k]), int(cols[k])
+        if r not in used_rows and c not in used_cols:
+            pairs.append((r, c))
+            used_rows.add(r)
+            used_cols.add(c)
+    return pairs
+
+
+def time_to_collision(track, frame_height):
+    """
+    Seconds until the track's bottom edge reaches the bottom of the frame at its
+    current speed (the obstacle is then directly in front of the bumper).
+
+    Returns:
+        float: inf for static or receding obstacles.
+    """
+    if track.velocity_y2 < MIN_APPROACH_SPEED:
+        return float("inf")
+    return max(0.0, (frame_height - float(track.xyxy[3])) / track.velocity_y2)
+
+
+class ObstacleTracker:
+    """
+    Args:
+        iou_threshold (float): Minimum IoU between a prediction and a detection to match.
+        min_hits (int): Matched detections before a track is reported as confirmed.
+        max_misses (int): Unmatched detection frames before a track is deleted.
+        position_noise (float): Measurement noise of box corners in px (std).
+        acceleration_noise (float): Process noise in px/s² (std), i.e. how quickly
+            obstacles may change speed.
+    """
+
+    def __init__(self, iou_threshold=IOU_THRESHOLD, min_hits=MIN_HITS, max_misses=MAX_MISSES,
+                 position_noise=4.0, acceleration_noise=400.0):
+        self.iou_threshold = iou_threshold
+        self.min_hits = min_hits
+        self.max_misses = max_misses
+        self._R = np.eye(4) * position_noise ** 2
+        self._accel_var = acceleration_noise ** 2
+
+        self._x = np.zeros((0, 8))          # Stacked states
+        self._P = np.zeros((0, 8, 8))       # Stacked covariances
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._hits = np.zeros(0, dtype=np.int64)
+        self._misses = np.zeros(0, dtype=np.int64)
+        self._next_id = 1
+        self._last_time = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ---------- Kalman steps ----------
+    def _predict(self, dt):
+        if dt <= 0 or not len(self):
+            return
+        F = np.eye(8)
+        F[:4, 4:] = _I4 * dt
+        # White-noise acceleration model per coordinate
+        q = self._accel_var * np.array([[dt ** 4 / 4, dt ** 3 / 2], [dt ** 3 / 2, dt ** 2]])
+        Q = np.zeros((8, 8))
+        Q[:4, :4], Q[:4, 4:], Q[4:, :4], Q[4:, 4:] = (_I4 * q[0, 0], _I4 * q[0, 1],
+                                                       _I4 * q[1, 0], _I4 * q[1, 1])
+        self._x = self._x @ F.T
+        self._P = F @ self._P @ F.T + Q
+
+    def _correct(self, idx, z):
+        """Kalman update of the tracks `idx` with measured boxes `z` (H = [I 0])."""
+        P = self._P[idx]
+        S = P[:, :4, :4] + self._R
+        K = P[:, :, :4] @ np.linalg.inv(S)                       # (n, 8, 4)
+        innovation = z - self._x[idx, :4]
+        self._x[idx] += np.einsum("nij,nj->ni", K, innovation)
+        self._P[idx] = P - K @ P[:, :4, :]
+
+    def _spawn(self, boxes):
+        n = len(boxes)
+        x = np.zeros((n, 8))
+        x[:, :4] = boxes
+        P = np.tile(np.diag([16.0] * 4 + [1e4] * 4), (n, 1, 1))   # Unknown initial velocity
+        self._x = np.concatenate([self._x, x])
+        self._P = np.concatenate([self._P, P])
+        self._ids = np.concatenate([self._ids, np.arange(self._next_id, self._next_id + n)])
+        self._hits = np.concatenate([self._hits, np.ones(n, dtype=np.int64)])
+        self._misses = np.concatenate([self._misses, np.zeros(n, dtype=np.int64)])
+        self._next_id += n
+
+    def _keep(self, mask):
+        self._x, self._P = self._x[mask], self._P[mask]
+        self._ids, self._hits, self._misses = self._ids[mask], self._hits[mask], self._misses[mask]
+
+    # ---------- Public API ----------
+    def update(self, boxes, now):
+        """
+        Advances all tracks to `now` and, if `boxes` is given, corrects them with
+        the detections of that frame. Pass None for frames without a fresh
+        detection: tracks coast on their velocity and no misses are counted.
+
+        Args:
+            boxes: (N, 4) xyxy detections or None.
+            now (float): Capture timestamp of the frame (time.monotonic()).
+
+        Returns:
+            list: Track for every live track (confirmed or not).
+        """
+        dt = 0.0 if self._last_time is None else now - self._last_time
+        self._last_time = now
+        self._predict(dt)
+
+        if boxes is not None:
+            boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+            pairs = greedy_match(iou_matrix(self._x[:, :4], boxes), self.iou_threshold)
+            matched = np.zeros(len(self), dtype=bool)
+            fresh = np.ones(len(boxes), dtype=bool)
+            if pairs:
+                rows, cols = map(np.array, zip(*pairs))
+                self._correct(rows, boxes[cols])
+                matched[rows] = True
+                fresh[cols] = False
+            self._hits[matched] += 1
+            self._misses[matched] = 0
+            self._misses[~matched] += 1
+            self._keep(self._misses <= self.max_misses)
+            self._spawn(boxes[fresh])
+        return self.tracks()
+
+    def tracks(self):
+        return [Track(int(self._ids[i]), self._x[i, :4].astype(np.float32), float(self._x[i, 7]),
+                      int(self._hits[i]), int(self._misses[i]), bool(self._hits[i] >= self.min_hits))
+                for i in range(len(self))]
@@ -0,0 +1,338 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# ================= RECORD & REPLAY HARNESS =================
+# Records a live run into a directory and plays it back without any hardware:
+#
+#   recording/
+#     meta.json        frame shape/dtype and count
+#     frames.u8        raw frames back to back (memory-mapped on replay)
+#     frames_t.npy     capture timestamps (time.monotonic())
+#     events.jsonl     timestamped detections, landmarks and serial bytes
+#
+#   rec = Recorder("runs/lap1")
+#   cap = RecordingCapture(cv2.VideoCapture(1), rec)           # drop-in VideoCapture
+#   link = RobotLink(port, serial_factory=rec.serial_factory())
+#   rec.log("detections", boxes, frame_id=...)
+#
+#   cap = ReplayCapture("runs/lap1")                            # no camera
+#   link = RobotLink("replay", reset_delay=0, serial_factory=replay_serial_factory("runs/lap1"))
+#
+# Replay is as fast as the consumer by default (realtime=True paces frames by
+# their recorded timestamps). Serial bytes are replayed in event order rather
+# than by wall-clock time: after the link has written the bytes that preceded an
+# inbound record during the recording, that record (ACK, telemetry, status line)
+# becomes readable. Runs are therefore deterministic, independent of machine speed.
+
+# cv2.CAP_PROP_* values, so this module does not need OpenCV
+CAP_PROP_POS_FRAMES = 1
+CAP_PROP_FRAME_WIDTH = 3
+CAP_PROP_FRAME_HEIGHT = 4
+CAP_PROP_FPS = 5
+CAP_PROP_FRAME_COUNT = 7
+
+
+def _to_json(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    raise TypeError(f"Cannot record {type(value).__name__}")
+
+
+# ================= RECORDING =================
+class Recorder:
+    """Writes frames and events of one run into `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._frames = open(os.path.join(path, "frames.u8"), "wb")
+        self._events = open(os.path.join(path, "events.jsonl"), "w")
+        self._lock = threading.Lock()
+        self._timestamps = []
+        self._shape = None
+        self._dtype = None
+
+    def add_frame(self, frame, t=None):
+        """
+        Appends a frame; every frame of a recording must have the same shape.
+
+        Returns:
+            int: 1-based frame id, matching the frame counters of the control loops.
+        """
+        t = time.monotonic() if t is None else t
+        frame = np.ascontiguousarray(frame)
+        with self._lock:
+            if self._shape is None:
+                self._shape, self._dtype = frame.shape, frame.dtype
+            elif frame.shape != self._shape:
+                raise ValueError(f"Frame shape changed from {self._shape} to {frame.shape}")
+            self._frames.write(frame.tobytes())
+            self._timestamps.append(t)
+            return len(self._timestamps)
+
+    def log(self, kind, data, frame_id=None, t=None):
+        """Appends one event, e.g. 'detections', 'landmarks', 'command', 'tx', 'rx'."""
+        record = {"t": time.monotonic() if t is None else t, "kind": kind, "data": data}
+        if frame_id is not None:
+            record["frame"] = frame_id
+        line = json.dumps(record, default=_to_json)
+        with self._lock:
+            self._events.write(line + "\n")
+
+    def serial_factory(self, opener=None):
+        """RobotLink `serial_factory` that records every byte written and read."""
+        def factory(*args, **kwargs):
+            if opener is None:
+                import serial
+                return RecordingSerial(serial.Serial(*args, **kwargs), self)
+            return RecordingSerial(opener(*args, **kwargs), self)
+        return factory
+
+    def close(self):
+        with self._lock:
+            self._frames.close()
+            self._events.close()
+            np.save(os.path.join(self.path, "frames_t.npy"), np.asarray(self._timestamps))
+            meta = {"count": len(self._timestamps),
+                    "shape": list(self._shape) if self._shape else None,
+                    "dtype": str(self._dtype) if self._dtype else None}
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        print(f"💾 Recorded {meta['count']} frames to {self.path}")
+
+
+class RecordingCapture:
+    """cv2.VideoCapture wrapper that records every frame it returns."""
+
+    def __init__(self, cap, recorder):
+        self.cap = cap
+        self.recorder = recorder
+        self.frame_id = None
+
+    def read(self):
+        success, frame = self.cap.read()
+        if success:
+            self.frame_id = self.recorder.add_frame(frame)
+        return success, frame
+
+    def grab(self):
+        # Grabbed frames are never decoded or seen by the loop, so they are not recorded
+        return self.cap.grab()
+
+    def __getattr__(self, name):
+        return getattr(self.cap, name)
+
+
+class RecordingSerial:
+    """serial.Serial wrapper that logs 'tx' and 'rx' bytes to a Recorder."""
+
+    def __init__(self, ser, recorder):
+        self._ser = ser
+        self._recorder = recorder
+
+    def write(self, data):
+        self._recorder.log("tx", bytes(data))
+        return self._ser.write(data)
+
+    def read(self, size=1):
+        data = self._ser.read(size)
+        if data:
+            self._recorder.log("rx", data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._ser, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._ser, name, value)
+
+
+# ================= REPLAY =================
+def load_meta(path):
+    with open(os.path.join(path, "meta.json")) as f:
+        return json.load(f)
+
+
+def load_events(path, kind=None):
+    """All recorded events (optionally of one kind) as dicts, in recording order."""
+    events = []
+    with open(os.path.join(path, "events.jsonl")) as f:
+        for line in f:
+            record = json.loads(line)
+            if kind is None or record["kind"] == kind:
+                events.append(record)
+    return events
+
+
+class ReplayCapture:
+    """
+    Drop-in cv2.VideoCapture over a recording.
+
+    Args:
+        path (str): Recording directory.
+        realtime (bool): Pace frames by their recorded timestamps instead of
+            returning them as fast as they are read.
+        loop (bool): Restart at the first frame instead of ending.
+        copy (bool): Return writable copies (the loops draw on frames); False
+            returns read-only views into the memory map.
+
+    `frame_time` is the recorded capture time of the frame last returned, so
+    time-based logic (tracker velocities, hold times) sees the recorded frame
+    intervals however fast the replay runs. It keeps increasing across loops.
+    """
+
+    def __init__(self, path, realtime=False, loop=False, copy=True):
+        meta = load_meta(path)
+        self.timestamps = np.load(os.path.join(path, "frames_t.npy"))
+        self.frames = np.memmap(os.path.join(path, "frames.u8"), dtype=meta["dtype"], mode="r",
+                                shape=(meta["count"], *meta["shape"])) if meta["count"] else None
+        self.count = meta["count"]
+        self.realtime = realtime
+        self.loop = loop
+        self.copy = copy
+        self.pos = 0
+        self.frame_time = None
+        self._opened = self.count > 0
+        self._started = None
+        self._loop_offset = 0.0
+
+    def isOpened(self):
+        return self._opened
+
+    def _advance(self):
+        if self.pos >= self.count:
+            if not self.loop:
+                self._opened = False
+                return None
+            self.pos, self._started = 0, None
+            # One mean frame interval between the last frame and the restarted first one
+            span = float(self.timestamps[-1] - self.timestamps[0])
+            self._loop_offset += span + (span / (self.count - 1) if self.count > 1 else 0.0)
+        if self.realtime:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now - (self.timestamps[self.pos] - self.timestamps[0])
+            wait = self._started + (self.timestamps[self.pos] - self.timestamps[0]) - now
+            if wait > 0:
+                time.sleep(wait)
+        index = self.pos
+        self.pos += 1
+        self.frame_time = float(self.timestamps[index]) + self._loop_offset
+        return index
+
+    def read(self):
+        index = self._advance()
+        if index is None:
+            return False, None
+        frame = self.frames[index]
+        return True, np.array(frame) if self.copy else frame
+
+    def grab(self):
+        return self._advance() is not None
+
+    def get(self, prop):
+        if prop == CAP_PROP_POS_FRAMES:
+            return float(self.pos)
+        if prop == CAP_PROP_FRAME_COUNT:
+            return float(self.count)
+        if prop in (CAP_PROP_FRAME_WIDTH, CAP_PROP_FRAME_HEIGHT) and self.count:
+            return float(self.frames.shape[2 if prop == CAP_PROP_FRAME_WIDTH else 1])
+        if prop == CAP_PROP_FPS and self.count > 1:
+            return float((self.count - 1) / (self.timestamps[-1] - self.timestamps[0]))
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == CAP_PROP_POS_FRAMES:
+            self.pos = int(value)
+            self._opened, self._started = self.pos < self.count, None
+            return True
+        return False    # Buffer size, resolution... have no meaning for a recording
+
+    def release(self):
+        self._opened = False
+
+
+class ReplaySerial:
+    """
+    In-memory serial port that answers with the recorded inbound bytes.
+
+    An 'rx' record becomes readable once the link has written as many bytes as
+    had been written before it during the recording. Written bytes that differ
+    from the recording are counted in `mismatches` (the replayed controller made
+    a different decision).
+    """
+
+    def __init__(self, events, baudrate=9600):
+        self.baudrate = baudrate
+        self.is_open = True
+        self.written = bytearray()
+        self.mismatches = 0
+        self._expected_tx = bytearray()
+        self._rx = []                   # (tx offset when it arrived, bytes)
+        for record in events:
+            data = bytes.fromhex(record["data"])
+            if record["kind"] == "tx":
+                self._expected_tx += data
+            elif record["kind"] == "rx":
+                self._rx.append((len(self._expected_tx), data))
+        self._next_rx = 0
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+
+    def _release(self):
+        while self._next_rx < len(self._rx) and self._rx[self._next_rx][0] <= len(self.written):
+            self._buffer += self._rx[self._next_rx][1]
+            self._next_rx += 1
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            self._release()
+            return len(self._buffer)
+
+    def write(self, data):
+        with self._lock:
+            start = len(self.written)
+            expected = self._expected_tx[start:start + len(data)]
+            if bytes(expected) != bytes(data):
+                self.mismatches += 1
+            self.written += data
+            self._release()
+        return len(data)
+
+    def read(self, size=1):
+        with self._lock:
+            self._release()
+            data = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            return data
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.is_open = False
+
+
+def replay_serial_factory(path):
+    """RobotLink `serial_factory` that replays the serial traffic of a recording."""
+    events = [e for e in load_events(path) if e["kind"] in ("tx", "rx")]
+    ports = []
+
+    def factory(port, baudrate=9600, **kwargs):
+        ser = ReplaySerial(events, baudrate)
+        ports.append(ser)
+        return ser
+    factory.ports = ports
+    return factory
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+# ================= VOICE RESPONSE CACHE =================
+# Content-addressed on-disk cache for LLM replies and synthesized speech. Entries
+# are keyed by a hash of (kind, backend parameters, normalized text), so the same
+# "forward" said 50 times costs one Gemini call and one ElevenLabs call in total.
+# Least-recently-used entries are evicted once the cache grows past `max_bytes`.
+#
+#   cache = ResponseCache("voice_cache")
+#   reply_stream = cached_stream(cache, ("llm", MODEL_ID), gemini_reply_stream, text=True)
+#   tts_stream = cached_stream(cache, ("tts", VOICE_ID, TTS_MODEL), text_to_speech_stream)
+
+CACHE_DIR = "voice_cache"
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_NON_WORD = re.compile(r"[^a-z0-9']+")
+
+
+def normalize_text(text):
+    """Lowercase, punctuation-free, single-spaced text, so 'Forward!' hits 'forward'."""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+class ResponseCache:
+    """
+    Args:
+        root (str): Cache directory (created on demand).
+        max_bytes (int): Size cap; the least recently used entries are deleted beyond it.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}                # digest -> [size, last_used]
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(root, exist_ok=True)
+        for name in os.listdir(root):
+            path = os.path.join(root, name)
+            if name.endswith(".bin"):
+                st = os.stat(path)
+                self._index[name[:-4]] = [st.st_size, st.st_mtime]
+
+    @staticmethod
+    def key(*parts):
+        """Content address of a request; the last part is treated as text and normalized."""
+        *params, text = parts
+        raw = "\x1f".join([*map(str, params), normalize_text(text)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest + ".bin")
+
+    @property
+    def size(self):
+        with self._lock:
+            return sum(size for size, _ in self._index.values())
+
+    def get(self, digest):
+        """Cached bytes, or None. A hit refreshes the entry's LRU position."""
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry[1] = time.time()
+            self.hits += 1
+        try:
+            with open(self._path(digest), "rb") as f:
+                data = f.read()
+            os.utime(self._path(digest))   # LRU order survives restarts via mtime
+            return data
+        except OSError:
+            with self._lock:
+                self._index.pop(digest, None)
+            return None
+
+    def put(self, digest, data):
+        # Write to a temp file and rename, so a crash never leaves a truncated entry. The
+        # temp name is per process and thread: two writers of the same digest must not
+        # share (and truncate) one file before the rename
+        tmp = f"{self._path(digest)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(digest))
+        with self._lock:
+            self._index[digest] = [len(data), time.time()]
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            total = sum(size for size, _ in self._index.values())
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for digest, (size, _) in sorted(self._index.items(), key=lambda kv: kv[1][1]):
+                if total <= self.max_bytes:
+                    break
+                victims.append(digest)
+                total -= size
+            for digest in victims:
+                del self._index[digest]
+        for digest in victims:
+            try:
+                os.remove(self._path(digest))
+            except OSError:
+                pass
+
+
+def cached_stream(cache, params, stream_fn, text=False):
+    """
+    Wraps a streaming backend (reply_stream / tts_stream) with the cache.
+
+    A hit replays the cached payload as a single chunk; a miss streams from the
+    backend as usual and stores the concatenated result once the stream finished
+    (an interrupted stream is not cached).
+
+    Args:
+        params (tuple): Backend parameters that change the output (model, voice id...).
+        text (bool): The stream yields str (LLM) instead of bytes (audio).
+    """
+    def wrapped(prompt):
+        digest = cache.key(*params, prompt)
+        data = cache.get(digest)
+        if data is not None:
+            yield data.decode() if text else data
+            return
+        chunks = []
+        for chunk in stream_fn(prompt):
+            chunks.append(chunk)
+            yield chunk
+        joined = "".join(chunks) if text else b"".join(chunks)
+        cache.put(digest, joined.encode() if text else joined)
+    return wrapped
+
+
+def prewarm(tts_stream, texts):
+    """
+    Synthesizes `texts` through a cached tts_stream in a background thread so the
+    first use of each canned reply is already a cache hit.
+
+    Returns:
+        threading.Thread: The started worker.
+    """
+    def run():
+        for text in texts:
+            try:
+                for _ in tts_stream(text):
+                    pass
+            except Exception as e:
+                print(f"[Cache] Pre-warm failed for '{text}': {e}")
+                return
+    worker = threading.Thread(target=run, name="tts-prewarm", daemon=True)
+    worker.start()
+    return worker
@@ -0,0 +1,167 @@
+import struct
+
+# ================= BINARY COMMAND PROTOCOL (mirror of Arduino_Code) =================
+# Frame: 0xAA | type | len | payload[len] | crc8(type, len, payload)
+# Bytes outside a frame are plain ASCII: legacy single-char commands towards the
+# car, Serial.println status lines from the car.
+
+FRAME_SYNC = 0xAA
+FRAME_CMD = 0x01    # host -> car: seq, cmd char, pwm, duration_ms (u16 LE)
+FRAME_BAUD = 0x02   # host -> car: new baud rate (u32 LE)
+FRAME_TELEMETRY_CFG = 0x03   # host -> car: telemetry interval ms (u16 LE, 0 = off)
+FRAME_COLOR_CAL = 0x04       # host -> car: color idx [, red u16, green u16, blue u16]
+FRAME_DRIVE = 0x05  # host -> car: seq, left pwm (i16 LE), right pwm (i16 LE), duration_ms (u16 LE)
+FRAME_ACK = 0x81    # car -> host: seq, status (FRAME_CMD / FRAME_DRIVE only)
+FRAME_TELEMETRY = 0x82       # car -> host: periodic sensor/state frame (see telemetry.py)
+FRAME_CONFIG_ACK = 0x83      # car -> host: acked frame type, status (config/baud frames)
+FRAME_MAX_PAYLOAD = 32      # Host-side limit; the firmware accepts at most 8 payload bytes
+
+ACK_OK = 0
+ACK_UNKNOWN = 1
+
+FULL_POWER = 255
+
+
+def crc8(data, crc=0):
+    """CRC-8, polynomial 0x07 (same as crc8Update in the firmware)."""
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode_frame(frame_type, payload=b""):
+    body = bytes([frame_type, len(payload)]) + bytes(payload)
+    return bytes([FRAME_SYNC]) + body + bytes([crc8(body)])
+
+
+def next_seq(seq):
+    """
+    Sequence number after `seq`: 1..255, never 0. Older firmware ACKs configuration
+    frames with seq 0, so a command must never use it.
+    """
+    return seq % 255 + 1
+
+
+def encode_command(seq, cmd, pwm=FULL_POWER, duration_ms=0):
+    """
+    Builds a CMD frame.
+
+    Args:
+        seq (int): Sequence number (1-255, see next_seq) echoed back in the ACK.
+        cmd (str): One of the w/s/a/d/x/0/1 command characters.
+        pwm (int): 0-255 motor duty; 255 keeps the firmware's full-power moves.
+        duration_ms (int): Auto-stop after this many ms (0 = run until the next command).
+    """
+    payload = struct.pack("<BcBH", seq & 0xFF, cmd.encode(), max(0, min(255, int(pwm))),
+                          max(0, min(0xFFFF, int(duration_ms))))
+    return encode_frame(FRAME_CMD, payload)
+
+
+def encode_drive(seq, left, right, duration_ms=0):
+    """
+    Builds a DRIVE frame: signed per-side motor duty, applied with analogWrite.
+
+    Args:
+        seq (int): Sequence number (1-255, see next_seq) echoed back in the ACK.
+        left (int): Left wheels -255..255 (negative = backwards).
+        right (int): Right wheels -255..255.
+        duration_ms (int): Auto-stop after this many ms (0 = run until the next command).
+    """
+    clamp = lambda v: max(-255, min(255, int(v)))
+    payload = struct.pack("<BhhH", seq & 0xFF, clamp(left), clamp(right),
+                          max(0, min(0xFFFF, int(duration_ms))))
+    return encode_frame(FRAME_DRIVE, payload)
+
+
+def wheels_to_command(left, right):
+    """Nearest single-character command for a wheel speed pair (legacy firmware)."""
+    if left == 0 and right == 0:
+        return 'x'
+    if abs(left - right) > 0.5 * max(abs(left), abs(right)):
+        return 'a' if right > left else 'd'
+    return 'w' if left + right > 0 else 's'
+
+
+def encode_baud(baud_rate):
+    return encode_frame(FRAME_BAUD, struct.pack("<I", baud_rate))
+
+
+def encode_telemetry_config(interval_ms):
+    return encode_frame(FRAME_TELEMETRY_CFG, struct.pack("<H", max(0, min(0xFFFF, int(interval_ms)))))
+
+
+def encode_color_calibration(color_index, rgb=None):
+    """
+    Sets one TrackColor centroid in the firmware's EEPROM. With rgb=None the
+    firmware samples the surface currently under the sensor instead.
+    """
+    payload = bytes([color_index])
+    if rgb is not None:
+        payload += struct.pack("<HHH", *(max(0, min(0xFFFF, int(v))) for v in rgb))
+    return encode_frame(FRAME_COLOR_CAL, payload)
+
+
+def decode_ack(payload):
+    """Returns (seq, status) from an ACK payload."""
+    return payload[0], payload[1]
+
+
+class FrameParser:
+    """
+    Incremental demultiplexer for the car -> host byte stream.
+
+    feed() returns a list of events: ('frame', type, payload_bytes) for valid
+    frames and ('line', text) for complete ASCII status lines. Frames with a bad
+    checksum are counted in `bad_frames` and dropped.
+    """
+
+    def __init__(self):
+        self.bad_frames = 0
+        self._state = 0
+        self._type = 0
+        self._len = 0
+        self._payload = bytearray()
+        self._line = bytearray()
+
+    @property
+    def in_frame(self):
+        """True while a frame has started (sync seen) but not yet completed."""
+        return self._state != 0
+
+    def feed(self, data):
+        events = []
+        for b in data:
+            if self._state == 0:
+                if b == FRAME_SYNC:
+                    self._state = 1
+                elif b == 0x0A:     # '\n'
+                    text = self._line.decode(errors="replace").strip()
+                    self._line.clear()
+                    if text:
+                        events.append(("line", text))
+                else:
+                    self._line.append(b)
+            elif self._state == 1:
+                self._type = b
+                self._state = 2
+            elif self._state == 2:
+                self._len = b
+                self._payload = bytearray()
+                if b > FRAME_MAX_PAYLOAD:
+                    self._state = 0
+                else:
+                    self._state = 3 if b else 4
+            elif self._state == 3:
+                self._payload.append(b)
+                if len(self._payload) == self._len:
+                    self._state = 4
+            else:
+                self._state = 0
+                body = bytes([self._type, self._len]) + bytes(self._payload)
+                if crc8(body) != b:
+                    self.bad_frames += 1
+                    continue
+                events.append(("frame", self._type, bytes(self._payload)))
+        return events
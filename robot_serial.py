@@ -0,0 +1,411 @@
+import threading
+import time
+from collections import deque
+
+import serial
+
+from robot_protocol import (ACK_OK, FRAME_ACK, FRAME_BAUD, FRAME_CONFIG_ACK, FULL_POWER,
+                            FrameParser, decode_ack, encode_baud, encode_command, encode_drive,
+                            encode_telemetry_config, next_seq, wheels_to_command)
+
+# ================= SHARED ARDUINO SERIAL TRANSPORT =================
+# One background I/O thread owns the port: it opens it (and re-opens it after a
+# USB hiccup), waits out the bootloader reset, writes commands and parses what
+# the firmware sends back (ACK frames and Serial.println status lines). Control
+# loops only call send(), which never blocks: it replaces the pending command,
+# so if several commands are issued faster than they can be written only the
+# newest goes out.
+#
+# After connecting, the link asks the firmware to switch to `fast_baud` with a
+# binary BAUD frame. If the firmware ACKs, commands are sent as framed binary
+# messages with sequence numbers, PWM and duration, and every ACK yields a
+# round-trip time sample. Older firmware never ACKs, and the link falls back to
+# the legacy single-character protocol at the original baud rate.
+
+ARDUINO_RESET_DELAY = 2.0   # Arduino reboots when the port opens; wait for the bootloader
+READY_BANNER = "READY"      # Printed at the end of setup(); ends the reset wait early
+FAST_BAUD_RATE = 115200
+NEGOTIATION_TIMEOUT = 0.3
+ACK_TIMEOUT = 0.05          # Retransmit the newest command if no ACK within this time
+MAX_RETRIES = 2
+SEQUENCE_MARGIN_MS = 100    # Extra firmware auto-stop time for non-final sequence steps
+DRIVE_COMMAND = 'v'         # Pending-command marker for drive(); never sent as a character
+
+
+class RobotLink:
+    """
+    Non-blocking, self-reconnecting serial link to the car.
+
+    Args:
+        port (str): Serial device path, e.g. '/dev/cu.usbmodem101'.
+        baud_rate (int): Must match Serial.begin() in Arduino_Code.
+        initial_command (str): Sent after every (re)connect; '0' forces Manual Mode.
+        on_line (callable): Optional callback(str) for every status line received.
+        on_frame (callable): Optional callback(type, payload) for non-ACK frames.
+        on_ack (callable): Optional callback(seq, rtt_ms) for every command ACK.
+        on_config_ack (callable): Optional callback(frame_type, status) for every
+            configuration ACK (FRAME_CONFIG_ACK), e.g. to confirm a calibration upload.
+        reconnect_interval (float): Seconds between attempts while the port is missing.
+        fast_baud (int): Baud rate to negotiate for the binary protocol (None = legacy only).
+        telemetry_interval_ms (int): Ask the firmware for a telemetry frame this often
+            once the binary protocol is up (0 = off). Frames arrive via `on_frame`.
+        serial_factory (callable): Opens the port, called like serial.Serial (used by
+            replay.py to record or replay the byte stream).
+    """
+
+    def __init__(self, port, baud_rate=9600, initial_command='0', on_line=None, on_frame=None,
+                 on_ack=None, reconnect_interval=1.0, reset_delay=ARDUINO_RESET_DELAY,
+                 fast_baud=FAST_BAUD_RATE, telemetry_interval_ms=0, serial_factory=None,
+                 on_config_ack=None):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.initial_command = initial_command
+        self.on_line = on_line
+        self.on_frame = on_frame
+        self.on_ack = on_ack
+        self.on_config_ack = on_config_ack
+        self.reconnect_interval = reconnect_interval
+        self.reset_delay = reset_delay
+        self.fast_baud = fast_baud
+        self.telemetry_interval_ms = telemetry_interval_ms
+        self.serial_factory = serial_factory or serial.Serial
+
+        self.binary = False                     # True once the firmware accepted FRAME_BAUD
+        self.status_lines = deque(maxlen=100)   # (monotonic time, line) from the firmware
+        self.rtt_ms = deque(maxlen=500)         # Command -> ACK round-trip samples
+        self.last_command = None                # last command accepted by send()
+        self.commands_sent = 0
+        self.commands_coalesced = 0
+        self.commands_retried = 0
+        self.commands_lost = 0
+        self.acks_received = 0
+        self.first_sent_at = None               # monotonic time the first send() went out
+
+        self._ser = None
+        self._pending = None
+        self._raw_out = deque()                 # Configuration frames, never coalesced
+        self._sequence = deque()                # Timed steps from send_sequence()
+        self._sequence_due = 0.0
+        self._seq = 0
+        self._inflight = {}                     # seq -> [sent_at, frame bytes, retries]
+        self._parser = FrameParser()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._connected = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="robot-serial", daemon=True)
+
+    # ---------- Public API ----------
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def is_connected(self):
+        return self._connected.is_set()
+
+    def wait_connected(self, timeout=None):
+        """Blocks until the port is open and the bootloader delay has passed."""
+        return self._connected.wait(timeout)
+
+    def send(self, command, pwm=FULL_POWER, duration_ms=0, dedup=True):
+        """
+        Queues `command` (one or more command characters) without blocking.
+
+        Args:
+            command (str): e.g. 'w', or '0w' to force Manual Mode before moving.
+            pwm (int): Motor duty 0-255 for the last character (binary protocol only).
+            duration_ms (int): Auto-stop after this long (binary protocol only).
+            dedup (bool): Skip the command if it repeats the last one.
+
+        Returns:
+            bool: True if the command was accepted, False if it repeated the last one.
+        """
+        with self._lock:
+            # A direct command always wins over a running timed sequence
+            self._sequence.clear()
+            return self._queue((command, pwm, duration_ms), dedup)
+
+    def drive(self, left, right, duration_ms=0, dedup=True):
+        """
+        Queues a differential drive command (signed PWM per side) without blocking.
+        Legacy firmware gets the nearest w/s/a/d/x character instead.
+
+        Args:
+            left (int): Left wheels -255..255.
+            right (int): Right wheels -255..255.
+            duration_ms (int): Auto-stop after this long (binary protocol only).
+            dedup (bool): Skip the command if it repeats the last one.
+
+        Returns:
+            bool: True if the command was accepted, False if it repeated the last one.
+        """
+        with self._lock:
+            self._sequence.clear()
+            return self._queue((DRIVE_COMMAND, (int(left), int(right)), duration_ms), dedup)
+
+    def send_sequence(self, steps, pwm=FULL_POWER):
+        """
+        Runs timed steps [(command, duration_ms), ...] without blocking: each step is
+        sent when the previous step's duration has elapsed, and a step with duration
+        0 ends the sequence. The duration also goes to the firmware as its auto-stop,
+        so a lost link cannot leave the car moving. send() cancels the sequence.
+        """
+        steps = list(steps)
+        timed = deque()
+        for i, (command, duration_ms) in enumerate(steps):
+            # Steps followed by another give the firmware some slack, so its auto-stop
+            # does not fire just before the host sends the next step
+            margin = SEQUENCE_MARGIN_MS if duration_ms and i < len(steps) - 1 else 0
+            timed.append(((command, pwm, duration_ms + margin), duration_ms))
+        with self._lock:
+            self._sequence = timed
+            self._sequence_due = 0.0
+        self._wake.set()
+
+    def _queue(self, key, dedup):
+        """Makes `key` the pending command; the caller holds the lock."""
+        if dedup and key == self.last_command:
+            return False
+        if self._pending is not None:
+            self.commands_coalesced += 1
+        self._pending = key
+        self.last_command = key
+        self._wake.set()
+        return True
+
+    def send_frame(self, frame):
+        """Queues a pre-encoded protocol frame (e.g. configuration) in order, without dedup."""
+        self._raw_out.append(frame)
+        self._wake.set()
+
+    def close(self, stop_command='x', timeout=1.0):
+        """Sends a final stop command (best effort), stops the I/O thread and closes the port."""
+        if stop_command:
+            self.send(stop_command, dedup=False)
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self._disconnect()
+
+    # ---------- I/O thread ----------
+    def _connect(self):
+        try:
+            ser = self.serial_factory(self.port, self.baud_rate, timeout=0, write_timeout=0.5)
+        except (serial.SerialException, OSError) as e:
+            return e
+        try:
+            return self._handshake(ser)
+        except (serial.SerialException, OSError) as e:
+            # Unplugged mid-handshake (boot wait, baud negotiation, initial command):
+            # close the half-open port and let _run() retry
+            self._ser = ser
+            self._disconnect()
+            return e
+
+    def _handshake(self, ser):
+        """Boot wait, baud negotiation and initial command on a freshly opened port."""
+        self._parser = FrameParser()
+        # Wait for the Arduino bootloader; still interruptible by close()
+        if not self._wait_for_boot(ser):
+            ser.close()
+            return None
+        self._ser = ser
+        self._inflight.clear()
+        self.binary = self.fast_baud is not None and self._negotiate()
+        if self.binary and self.telemetry_interval_ms:
+            ser.write(encode_telemetry_config(self.telemetry_interval_ms))
+        if self.initial_command:
+            self._write_command(self.initial_command, FULL_POWER, 0)
+        with self._lock:
+            # The board was reset (or got initial_command): what it last received is no
+            # longer what send() last accepted, so only dedup against a still-queued command
+            self.last_command = self._pending
+        self._connected.set()
+        mode = f"binary @ {self._ser.baudrate}" if self.binary else f"ascii @ {self.baud_rate}"
+        print(f"✅ Serial connected: {self.port} ({mode})")
+        return None
+
+    def _wait_for_boot(self, ser):
+        """
+        Waits until the firmware prints READY_BANNER, at most `reset_delay` seconds
+        (boards that do not reset on open never print it). False if closed meanwhile.
+        """
+        deadline = time.monotonic() + self.reset_delay
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            data = ser.read(ser.in_waiting or 1)
+            for event in self._parser.feed(data):
+                if event[0] == "line":
+                    self._handle_line(event[1])
+                    if READY_BANNER in event[1]:
+                        return True
+            if not data:
+                self._stop.wait(min(0.01, remaining))
+        return False
+
+    def _negotiate(self):
+        """Requests FRAME_BAUD; switches the host side only after the firmware ACKs."""
+        self._ser.write(encode_baud(self.fast_baud))
+        deadline = time.monotonic() + NEGOTIATION_TIMEOUT
+        while time.monotonic() < deadline:
+            for event in self._parser.feed(self._ser.read(self._ser.in_waiting or 1)):
+                # Older firmware acknowledged FRAME_BAUD with a seq-0 FRAME_ACK
+                if event[0] == "frame" and (event[1] == FRAME_ACK or (
+                        event[1] == FRAME_CONFIG_ACK and event[2][0] == FRAME_BAUD)):
+                    self._ser.baudrate = self.fast_baud
+                    return True
+                if event[0] == "line":
+                    self._handle_line(event[1])
+            time.sleep(0.005)
+        return False
+
+    def _disconnect(self):
+        self._connected.clear()
+        self.binary = False
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            except (serial.SerialException, OSError):
+                pass
+            self._ser = None
+
+    def _write_command(self, command, pwm, duration_ms):
+        if command == DRIVE_COMMAND:
+            self._write_drive(*pwm, duration_ms)
+            return
+        if not self.binary:
+            self._ser.write(command.encode())
+            return
+        for i, ch in enumerate(command):
+            last = i == len(command) - 1
+            self._seq = next_seq(self._seq)
+            frame = encode_command(self._seq, ch, pwm if last else FULL_POWER,
+                                   duration_ms if last else 0)
+            self._inflight[self._seq] = [time.monotonic(), frame, 0]
+            self._ser.write(frame)
+
+    def _write_drive(self, left, right, duration_ms):
+        if not self.binary:
+            self._ser.write(wheels_to_command(left, right).encode())
+            return
+        self._seq = next_seq(self._seq)
+        frame = encode_drive(self._seq, left, right, duration_ms)
+        self._inflight[self._seq] = [time.monotonic(), frame, 0]
+        self._ser.write(frame)
+
+    def _flush_pending(self):
+        while self._raw_out:
+            # Dequeued only once written, so a failed write is retried after reconnecting
+            self._ser.write(self._raw_out[0])
+            self._raw_out.popleft()
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            # A new command supersedes anything still waiting for an ACK
+            self.commands_lost += len(self._inflight)
+            self._inflight.clear()
+            try:
+                self._write_command(*pending)
+            except (serial.SerialException, OSError):
+                with self._lock:
+                    # Put it back unless send() queued a newer command meanwhile
+                    if self._pending is None:
+                        self._pending = pending
+                raise
+            self.commands_sent += 1
+            if self.first_sent_at is None:
+                self.first_sent_at = time.monotonic()
+
+    def _advance_sequence(self):
+        """Queues the next timed step once the current one's duration is over."""
+        with self._lock:
+            if not self._sequence or time.monotonic() < self._sequence_due:
+                return
+            key, duration_ms = self._sequence.popleft()
+            self._sequence_due = time.monotonic() + duration_ms / 1000.0
+            self._queue(key, dedup=False)
+
+    def _retransmit(self):
+        now = time.monotonic()
+        for seq, entry in list(self._inflight.items()):
+            sent_at, frame, retries = entry
+            if now - sent_at < ACK_TIMEOUT * (retries + 1):
+                continue
+            if retries >= MAX_RETRIES:
+                del self._inflight[seq]
+                self.commands_lost += 1
+                continue
+            entry[2] += 1
+            self.commands_retried += 1
+            self._ser.write(frame)
+
+    def _handle_line(self, line):
+        self.status_lines.append((time.monotonic(), line))
+        if self.on_line:
+            self.on_line(line)
+
+    def _read_input(self):
+        waiting = self._ser.in_waiting
+        if not waiting:
+            return
+        for event in self._parser.feed(self._ser.read(waiting)):
+            if event[0] == "line":
+                self._handle_line(event[1])
+                continue
+            _, frame_type, payload = event
+            if frame_type == FRAME_ACK:
+                seq, status = decode_ack(payload)
+                entry = self._inflight.pop(seq, None)
+                if entry is not None:
+                    self.acks_received += 1
+                    rtt = (time.monotonic() - entry[0]) * 1000.0
+                    self.rtt_ms.append(rtt)
+                    if self.on_ack:
+                        self.on_ack(seq, rtt)
+                    if status != ACK_OK:
+                        print(f"⚠️ Firmware rejected command (seq {seq}, status {status})")
+            elif frame_type == FRAME_CONFIG_ACK:
+                acked_type, status = decode_ack(payload)
+                if status != ACK_OK:
+                    print(f"⚠️ Firmware rejected config frame 0x{acked_type:02X} (status {status})")
+                if self.on_config_ack:
+                    self.on_config_ack(acked_type, status)
+            elif self.on_frame:
+                self.on_frame(frame_type, payload)
+
+    def _run(self):
+        last_error = None
+        while not self._stop.is_set():
+            if self._ser is None:
+                error = self._connect()
+                if self._ser is None:
+                    if error is not None and str(error) != str(last_error):
+                        print(f"⚠️ Serial unavailable, retrying: {error}")
+                    last_error = error
+                    self._stop.wait(self.reconnect_interval)
+                    continue
+                last_error = None
+            try:
+                self._advance_sequence()
+                self._flush_pending()
+                self._read_input()
+                if self.binary:
+                    self._retransmit()
+            except (serial.SerialException, OSError) as e:
+                print(f"⚠️ Serial link lost ({e}), reconnecting...")
+                self._disconnect()
+                continue
+            self._wake.wait(0.005 if self._inflight or self._sequence else 0.01)
+            self._wake.clear()
+
+        # Final flush so close() can deliver the stop command
+        if self._ser is not None:
+            try:
+                self._flush_pending()
+                self._ser.flush()
+            except (serial.SerialException, OSError):
+                pass
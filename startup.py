@@ -0,0 +1,146 @@
+import glob
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ================= FAST STARTUP HELPERS =================
+# Shared by the controller entry points so launch -> car moving stays short:
+#   * slow initialization steps (serial handshake, camera probe, model load and
+#     warm-up, API clients) run concurrently via run_parallel();
+#   * the last camera index and serial port that worked are remembered in
+#     DEVICE_CACHE_FILE and tried first on the next launch;
+#   * report_first_command() prints the time from launch to the first command
+#     actually written to the Arduino.
+#
+# Import this module first: LAUNCHED_AT is taken at import time.
+
+LAUNCHED_AT = time.monotonic()
+DEVICE_CACHE_FILE = "device_cache.json"
+SERIAL_PATTERNS = ["/dev/cu.usbmodem*", "/dev/ttyACM*", "/dev/ttyUSB*"]
+CAMERA_SETTLE_TIMEOUT = 3.0     # Max wait for a camera's first non-black frame
+BLACK_FRAME_LEVEL = 8           # Max pixel value of the blank frames Continuity Camera starts with
+TARGET_FIRST_COMMAND_S = 3.0
+
+_cache_lock = threading.Lock()
+
+
+def since_launch():
+    return time.monotonic() - LAUNCHED_AT
+
+
+# ================= DEVICE CACHE =================
+def load_device_cache(path=DEVICE_CACHE_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def remember_device(key, value, path=DEVICE_CACHE_FILE):
+    """Stores e.g. remember_device('vision.camera', 1) for the next launch."""
+    with _cache_lock:
+        cache = load_device_cache(path)
+        if cache.get(key) == value:
+            return
+        cache[key] = value
+        with open(path, "w") as f:
+            json.dump(cache, f, indent=2)
+
+
+def find_serial_port(configured, cache_key=None):
+    """
+    First existing port out of: the cached port, `configured`, then any port
+    matching SERIAL_PATTERNS. Falls back to `configured` (RobotLink keeps retrying).
+    """
+    candidates = []
+    if cache_key:
+        candidates.append(load_device_cache().get(cache_key))
+    candidates.append(configured)
+    for pattern in SERIAL_PATTERNS:
+        candidates.extend(sorted(glob.glob(pattern)))
+    for port in candidates:
+        if port and os.path.exists(port):
+            if cache_key:
+                remember_device(cache_key, port)
+            return port
+    return configured
+
+
+# ================= CAMERA PROBE =================
+def open_camera(indices, cache_key=None, settle_timeout=CAMERA_SETTLE_TIMEOUT):
+    """
+    Opens the first camera that delivers a real (non-black) frame, trying the cached
+    index first. Instead of a fixed sleep per index, frames are polled until the
+    picture appears, so a camera that is ready immediately costs no waiting.
+
+    Returns:
+        cv2.VideoCapture or None
+    """
+    import cv2
+
+    order = list(indices)
+    cached = load_device_cache().get(cache_key) if cache_key else None
+    if cached in order:
+        order.remove(cached)
+        order.insert(0, cached)
+
+    for index in order:
+        print(f"Attempting to open camera index: {index}...")
+        cap = cv2.VideoCapture(index)
+        if not cap.isOpened():
+            continue
+        deadline = time.monotonic() + settle_timeout
+        while time.monotonic() < deadline:
+            success, frame = cap.read()
+            if success and frame is not None and frame.max() > BLACK_FRAME_LEVEL:
+                print(f"✅ Successfully connected to camera {index}")
+                if cache_key:
+                    remember_device(cache_key, index)
+                return cap
+            time.sleep(0.02)
+        cap.release()
+    return None
+
+
+# ================= CONCURRENT INITIALIZATION =================
+def run_parallel(tasks):
+    """
+    Runs independent initialization steps at the same time.
+
+    Args:
+        tasks (dict): name -> zero-argument callable.
+
+    Returns:
+        dict: name -> return value. The first exception is re-raised once all finished.
+    """
+    def timed(name, fn):
+        t0 = time.monotonic()
+        result = fn()
+        print(f"⏱️  {name} ready in {time.monotonic() - t0:.2f} s")
+        return result
+
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="startup") as pool:
+        futures = {name: pool.submit(timed, name, fn) for name, fn in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+def report_first_command(link, probe=None, timeout=60.0):
+    """
+    Prints the launch -> first command written time once the link has sent one
+    (and records it in `probe` as 'time_to_first_command'). Non-blocking.
+    """
+    def wait():
+        deadline = time.monotonic() + timeout
+        while link.first_sent_at is None:
+            if time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+        seconds = link.first_sent_at - LAUNCHED_AT
+        if probe is not None:
+            probe.record("time_to_first_command", seconds * 1000.0)
+        flag = "✅" if seconds <= TARGET_FIRST_COMMAND_S else "⚠️"
+        print(f"{flag} Time to first command: {seconds:.2f} s (target {TARGET_FIRST_COMMAND_S:.0f} s)")
+    threading.Thread(target=wait, name="first-command", daemon=True).start()
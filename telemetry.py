@@ -0,0 +1,124 @@
+import struct
+import threading
+import time
+
+import numpy as np
+
+from robot_protocol import FRAME_TELEMETRY
+
+# ================= SENSOR TELEMETRY RING BUFFER =================
+# The firmware streams a 17-byte FRAME_TELEMETRY every `telemetry_interval_ms`
+# (see sendTelemetry in Arduino_Code). Samples land in a fixed-size NumPy ring
+# buffer stamped with host monotonic time, so controllers can read the latest
+# ultrasonic distance without an extra serial round-trip:
+#
+#   telemetry = TelemetryBuffer()
+#   link = RobotLink(PORT, on_frame=telemetry.on_frame, telemetry_interval_ms=100)
+#   dist = telemetry.latest_distance()
+
+# millis | dist_mm | red | green | blue | mode | stage | runState | motor | color
+TELEMETRY_FORMAT = "<IHHHHBBBBB"
+
+TELEMETRY_DTYPE = np.dtype([
+    ("t_host", "f8"),        # time.monotonic() when the frame was parsed
+    ("t_fw_ms", "u4"),       # millis() on the Arduino
+    ("dist_cm", "f4"),
+    ("red", "u2"),           # Raw TCS3200 periods (us); lower = stronger colour
+    ("green", "u2"),
+    ("blue", "u2"),
+    ("mode", "u1"),
+    ("stage", "u1"),
+    ("run_state", "u1"),
+    ("motor", "u1"),
+    ("color", "u1"),         # TrackColor classified by the firmware
+])
+
+# Matches the MOTION_* constants in Arduino_Code
+MOTOR_STATES = ("STOP", "FORWARD", "BACKWARD", "HARD_LEFT", "HARD_RIGHT",
+                "SOFT_LEFT", "SOFT_RIGHT", "PWM")
+
+# Matches enum TrackColor in Arduino_Code
+TRACK_COLORS = ("WHITE", "BLACK", "RED", "GREEN", "BLUE", "UNKNOWN")
+
+# [CORE SETTING] Same obstacle threshold as the firmware (dist < 15 && dist > 1)
+ULTRASONIC_STOP_CM = 15.0
+ULTRASONIC_MIN_CM = 1.0
+
+
+def decode_telemetry(payload, t_host=None):
+    """Unpacks one telemetry payload into a TELEMETRY_DTYPE record tuple."""
+    fw_ms, dist_mm, *rest = struct.unpack(TELEMETRY_FORMAT, payload)
+    t_host = time.monotonic() if t_host is None else t_host
+    return (t_host, fw_ms, dist_mm / 10.0, *rest)
+
+
+class TelemetryBuffer:
+    """
+    Thread-safe fixed-capacity ring buffer of telemetry samples.
+
+    The serial I/O thread writes through `on_frame`; any controller thread reads
+    with `latest()`, `window()` or `latest_distance()`.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self._data = np.zeros(capacity, dtype=TELEMETRY_DTYPE)
+        self._count = 0          # Total samples ever written
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    def push(self, record):
+        with self._lock:
+            self._data[self._count % self.capacity] = record
+            self._count += 1
+
+    def on_frame(self, frame_type, payload):
+        """RobotLink `on_frame` callback."""
+        if frame_type == FRAME_TELEMETRY and len(payload) == struct.calcsize(TELEMETRY_FORMAT):
+            self.push(decode_telemetry(payload))
+
+    def snapshot(self):
+        """All buffered samples in chronological order (a copy)."""
+        with self._lock:
+            n = min(self._count, self.capacity)
+            if self._count <= self.capacity:
+                return self._data[:n].copy()
+            start = self._count % self.capacity
+            return np.concatenate([self._data[start:], self._data[:start]])
+
+    def latest(self):
+        """The newest sample as a NumPy record, or None if nothing has arrived."""
+        with self._lock:
+            if self._count == 0:
+                return None
+            return self._data[(self._count - 1) % self.capacity].copy()
+
+    def window(self, seconds):
+        """Samples received within the last `seconds`."""
+        data = self.snapshot()
+        return data[data["t_host"] >= time.monotonic() - seconds]
+
+    def latest_distance(self, max_age=0.3):
+        """Newest ultrasonic distance in cm, or None if there is no fresh sample."""
+        sample = self.latest()
+        if sample is None or time.monotonic() - sample["t_host"] > max_age:
+            return None
+        return float(sample["dist_cm"])
+
+
+def ultrasonic_guard(cmd_char, telemetry, stop_cm=ULTRASONIC_STOP_CM):
+    """
+    Fuses the ultrasonic reading into a camera-based decision: a FORWARD command
+    becomes STOP while the firmware reports an obstacle closer than `stop_cm`.
+
+    Returns:
+        tuple: (Command Character, True if the command was overridden)
+    """
+    if cmd_char != 'w' or telemetry is None:
+        return cmd_char, False
+    dist = telemetry.latest_distance()
+    if dist is not None and ULTRASONIC_MIN_CM < dist < stop_cm:
+        return 'x', True
+    return cmd_char, False
@@ -0,0 +1,195 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# ================= STAGED CAPTURE / INFERENCE PIPELINE =================
+# The camera, the model and the render/serial loop each run at their own pace.
+# Stages are joined by single-slot mailboxes: a producer always overwrites the
+# pending item, so a slow consumer only ever sees the newest frame instead of
+# a backlog of stale ones.
+
+
+@dataclass
+class FramePacket:
+    """A captured frame travelling through the pipeline."""
+    frame_id: int
+    captured_at: float          # time.monotonic() when cap.read() returned
+    frame: Any
+    results: Any = None         # filled in by the inference stage
+    infer_started_at: float = 0.0
+    inferred_at: float = 0.0
+    # When the frame was taken: the recorded capture time for replays, captured_at
+    # otherwise. Time-based decisions use this, latency measurements use captured_at
+    frame_time: Optional[float] = None
+
+    def __post_init__(self):
+        if self.frame_time is None:
+            self.frame_time = self.captured_at
+
+
+def frame_time_of(cap, captured_at):
+    """Recorded time of the frame `cap` just returned (ReplayCapture), else `captured_at`."""
+    frame_time = getattr(cap, "frame_time", None)
+    return captured_at if frame_time is None else frame_time
+
+
+class LatestSlot:
+    """
+    Bounded single-slot queue with latest-item-wins semantics.
+
+    put() never blocks: if the previous item has not been consumed yet it is
+    replaced and counted in `dropped`. get() blocks until a fresh item arrives,
+    the timeout expires (returns None) or the slot is closed (returns None, or
+    raises if the producing stage closed it because it failed).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._closed = False
+        self._error = None
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            item, self._item = self._item, None
+            if item is None and self._error is not None:
+                raise RuntimeError(f"Pipeline stage failed: {self._error!r}") from self._error
+            return item
+
+    def close(self, error=None):
+        """Wakes all consumers; with `error`, every later get() raises it."""
+        with self._cond:
+            self._closed = True
+            if error is not None:
+                self._error = error
+            self._cond.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    """Reads the camera as fast as it delivers and keeps only the newest frame."""
+
+    def __init__(self, cap, out_slot: LatestSlot, stop_event: threading.Event):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.out_slot = out_slot
+        self.stop_event = stop_event
+        self.frames_read = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            success, frame = self.cap.read()
+            if not success:
+                # Camera hiccup: back off briefly instead of spinning
+                time.sleep(0.005)
+                continue
+            self.frames_read += 1
+            now = time.monotonic()
+            self.out_slot.put(FramePacket(self.frames_read, now, frame,
+                                          frame_time=frame_time_of(self.cap, now)))
+        self.out_slot.close()
+
+
+class InferenceWorker(threading.Thread):
+    """
+    Pulls the newest frame, runs `infer_fn(frame)` on it and publishes the packet
+    with `results` attached. Frames that arrive while a prediction is running
+    are overwritten in the input slot, never queued. If `infer_fn` raises, the
+    pipeline is stopped and the error is re-raised from `out_slot.get()`, so the
+    consumer can stop the car instead of waiting for results that never come.
+    """
+
+    def __init__(self, infer_fn: Callable[[Any], Any], in_slot: LatestSlot,
+                 out_slot: LatestSlot, stop_event: threading.Event):
+        super().__init__(name="inference", daemon=True)
+        self.infer_fn = infer_fn
+        self.in_slot = in_slot
+        self.out_slot = out_slot
+        self.stop_event = stop_event
+        self.frames_inferred = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            packet: Optional[FramePacket] = self.in_slot.get(timeout=0.1)
+            if packet is None:
+                continue
+            packet.infer_started_at = time.monotonic()
+            try:
+                packet.results = self.infer_fn(packet.frame)
+            except Exception as e:
+                print(f"❌ Inference failed on frame {packet.frame_id}: {e!r}")
+                self.stop_event.set()           # Stops the capture stage as well
+                self.out_slot.close(error=e)
+                return
+            packet.inferred_at = time.monotonic()
+            self.frames_inferred += 1
+            self.out_slot.put(packet)
+        self.out_slot.close()
+
+
+class InlineSlot:
+    """
+    Synchronous stand-in for the result slot: get() reads and infers one frame on
+    the caller's thread. Every frame is processed exactly once and in order, which
+    makes replays deterministic; get() returns None once the source is exhausted.
+    """
+
+    def __init__(self, cap, infer_fn):
+        self.cap = cap
+        self.infer_fn = infer_fn
+        self.frames_read = 0
+        self.dropped = 0
+
+    def get(self, timeout=None):
+        success, frame = self.cap.read()
+        if not success:
+            return None
+        self.frames_read += 1
+        now = time.monotonic()
+        packet = FramePacket(self.frames_read, now, frame, frame_time=frame_time_of(self.cap, now))
+        packet.infer_started_at = time.monotonic()
+        packet.results = self.infer_fn(frame)
+        packet.inferred_at = time.monotonic()
+        return packet
+
+
+def start_pipeline(cap, infer_fn, threaded=True):
+    """
+    Wires capture -> inference and starts both threads.
+
+    Args:
+        threaded (bool): False runs both stages inline in result_slot.get()
+            (no frame dropping, for replays and benchmarks).
+
+    Returns:
+        tuple: (result_slot, stop_event, threads) where `result_slot.get()` yields
+        the newest inferred FramePacket for the render/serial stage.
+    """
+    stop_event = threading.Event()
+    if not threaded:
+        return InlineSlot(cap, infer_fn), stop_event, []
+    frame_slot = LatestSlot()
+    result_slot = LatestSlot()
+    threads = [
+        CaptureThread(cap, frame_slot, stop_event),
+        InferenceWorker(infer_fn, frame_slot, result_slot, stop_event),
+    ]
+    for t in threads:
+        t.start()
+    return result_slot, stop_event, threads
+
+
+def stop_pipeline(stop_event, threads, timeout=1.0):
+    """Signals all stages to exit and waits briefly for them to finish."""
+    stop_event.set()
+    for t in threads:
+        t.join(timeout=timeout)
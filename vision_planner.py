@@ -0,0 +1,296 @@
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from object_tracker import ObstacleTracker, time_to_collision
+
+# ================= OBSTACLE SECTOR PLANNER =================
+# [CORE SETTING] Danger zone threshold: objects crossing 50% height trigger avoidance
+DANGER_LINE_RATIO = 0.5
+
+SECTORS = ("left", "center", "right")
+
+# Tracking planner (TrackingPlanner): obstacles must persist for MIN_HITS detections
+TTC_DANGER_S = 1.0              # Approaching obstacles closer than this in time also block
+DANGER_MARGIN_RATIO = 0.05      # A blocking obstacle clears only this far above the line
+RECEDING_SPEED_RATIO = 0.1      # Bottom edge moving up faster than this x height/s = receding
+COMMAND_HOLD_S = 0.3            # Minimum time between changes of the steering command
+
+# Free-space steering (free_space_steering / steering_to_pwm)
+CAMERA_FOV_DEG = 60.0           # Horizontal field of view; maps image columns to angles
+MIN_GAP_RATIO = 0.3             # Narrowest free gap the car fits through, fraction of width
+MIN_DRIVE_PWM = 90              # Below this duty the motors stall
+FULL_POWER_PWM = 255
+PWM_STEPS = 8                   # Quantization levels per side; fewer = fewer serial commands
+
+
+class Steering(NamedTuple):
+    """Continuous steering decision of the free-space planner."""
+    angle_deg: float        # Heading of the chosen gap; negative = left, 0 = straight ahead
+    speed: float            # 0.0 (stop) .. 1.0 (full speed)
+    gap: tuple              # (first, last + 1) pixel columns of the chosen gap, or None
+
+
+class SectorOccupancy(NamedTuple):
+    """Obstacle summary for one horizontal sector of the frame."""
+    blocked: bool           # Any box inside the danger zone touches this sector
+    nearest_y2: float       # Largest bottom edge in the sector (0.0 if clear); larger = closer
+    covered_width: int      # Pixel columns of the sector covered by danger-zone boxes
+
+
+def boxes_to_xyxy(boxes):
+    """
+    Converts YOLO boxes into a float32 (N, 4) NumPy array with a single host copy.
+
+    Accepts an ultralytics `Boxes` object, a torch tensor or anything array-like.
+    """
+    if hasattr(boxes, "xyxy"):
+        boxes = boxes.xyxy
+    if hasattr(boxes, "cpu"):
+        boxes = boxes.cpu().numpy()
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def covered_columns(x1, x2, frame_width):
+    """Bool array (frame_width,) of pixel columns covered by any [x1, x2) span: O(N + width)."""
+    cols = np.zeros(frame_width + 1, dtype=np.int32)
+    if len(x1):
+        starts = np.clip(np.floor(x1), 0, frame_width).astype(np.int64)
+        ends = np.clip(np.ceil(x2), 0, frame_width).astype(np.int64)
+        np.add.at(cols, starts, 1)
+        np.add.at(cols, ends, -1)
+    return np.cumsum(cols[:-1]) > 0
+
+
+def compute_sector_occupancy(boxes, frame_width, frame_height, in_danger=None):
+    """
+    Computes left/center/right blockage for all boxes at once with array masks.
+
+    Args:
+        boxes: YOLO `Boxes`, an xyxy tensor or an (N, 4) array.
+        frame_width (int): Width of the video frame.
+        frame_height (int): Height of the video frame.
+        in_danger (np.ndarray): Optional (N,) bool mask of boxes that count as
+            obstacles; by default, boxes whose bottom edge crosses the danger line.
+
+    Returns:
+        dict: Sector name -> SectorOccupancy.
+    """
+    xyxy = boxes_to_xyxy(boxes)
+    danger_line_y = frame_height * DANGER_LINE_RATIO
+
+    # Divide the horizontal frame into three equal sectors: Left, Center, Right
+    left_boundary = frame_width // 3
+    right_boundary = 2 * (frame_width // 3)
+
+    # Obstacle Check: only boxes whose bottom edge (y2) is below the danger line count
+    x1, y1, x2, y2 = xyxy[:, 0], xyxy[:, 1], xyxy[:, 2], xyxy[:, 3]
+    if in_danger is None:
+        in_danger = y2 > danger_line_y
+
+    hits = {
+        "left": in_danger & (x1 < left_boundary),
+        "center": in_danger & (x1 < right_boundary) & (x2 > left_boundary),
+        "right": in_danger & (x2 > right_boundary),
+    }
+
+    covered = covered_columns(x1[in_danger], x2[in_danger], frame_width)
+
+    spans = {
+        "left": (0, left_boundary),
+        "center": (left_boundary, right_boundary),
+        "right": (right_boundary, frame_width),
+    }
+
+    occupancy = {}
+    for name in SECTORS:
+        mask = hits[name]
+        start, end = spans[name]
+        occupancy[name] = SectorOccupancy(
+            blocked=bool(mask.any()),
+            nearest_y2=float(y2[mask].max()) if mask.any() else 0.0,
+            covered_width=int(covered[start:end].sum()),
+        )
+    return occupancy
+
+
+def decide_drive_command(occupancy):
+    """
+    Decision tree over sector occupancy.
+
+    Returns:
+        tuple: (Command Character, Descriptive String)
+    """
+    if occupancy["center"].blocked:
+        if not occupancy["left"].blocked:
+            return 'a', "HARD LEFT"   # Front blocked, path clear on left
+        elif not occupancy["right"].blocked:
+            return 'd', "HARD RIGHT"  # Front/Left blocked, path clear on right
+        else:
+            return 'x', "STOP"        # No clear path in any direction
+
+    return 'w', "FORWARD"             # Path clear in center
+
+
+def get_drive_command(boxes, frame_width, frame_height):
+    """
+    Implements obstacle avoidance logic based on spatial object detection.
+
+    Args:
+        boxes: YOLO `Boxes`, an xyxy tensor or an (N, 4) array.
+        frame_width (int): Width of the video frame.
+        frame_height (int): Height of the video frame.
+
+    Returns:
+        tuple: (Command Character, Descriptive String)
+    """
+    return decide_drive_command(compute_sector_occupancy(boxes, frame_width, frame_height))
+
+
+def free_space_steering(boxes, frame_width, frame_height, in_danger=None,
+                        fov_deg=CAMERA_FOV_DEG, min_gap_ratio=MIN_GAP_RATIO):
+    """
+    Steers towards the widest gap between obstacles instead of picking a sector.
+
+    Builds a column-wise occupancy histogram of the danger-zone boxes, takes the
+    widest run of free columns (the one nearest the centre on ties) and heads for
+    its centre. Speed grows with the gap width and drops with the turn angle.
+
+    Args:
+        boxes: YOLO `Boxes`, an xyxy tensor or an (N, 4) array.
+        frame_width (int): Width of the video frame.
+        frame_height (int): Height of the video frame.
+        in_danger (np.ndarray): Optional (N,) bool mask of the boxes that are obstacles;
+            by default, boxes whose bottom edge crosses the danger line.
+        fov_deg (float): Horizontal camera field of view.
+        min_gap_ratio (float): Gaps narrower than this fraction of the width are ignored.
+
+    Returns:
+        Steering: speed 0.0 if no gap is wide enough.
+    """
+    xyxy = boxes_to_xyxy(boxes)
+    if in_danger is None:
+        in_danger = xyxy[:, 3] > frame_height * DANGER_LINE_RATIO
+    covered = covered_columns(xyxy[in_danger, 0], xyxy[in_danger, 2], frame_width)
+
+    # Runs of free columns from the edges of the padded occupancy mask
+    edges = np.diff(np.concatenate(([1], covered.astype(np.int8), [1])))
+    starts, ends = np.flatnonzero(edges == -1), np.flatnonzero(edges == 1)
+    if len(starts) == 0:
+        return Steering(0.0, 0.0, None)
+    widths = ends - starts
+    centre = frame_width / 2.0
+    offsets = (starts + ends) / 2.0 - centre
+    best = int(np.lexsort((np.abs(offsets), -widths))[0])
+    if widths[best] < min_gap_ratio * frame_width:
+        return Steering(0.0, 0.0, None)
+
+    turn = float(offsets[best] / centre)                         # -1 .. 1
+    speed = float(min(1.0, widths[best] / (2.0 * min_gap_ratio * frame_width))) * (1.0 - 0.5 * abs(turn))
+    return Steering(turn * fov_deg / 2.0, speed, (int(starts[best]), int(ends[best])))
+
+
+def steering_to_pwm(steering, fov_deg=CAMERA_FOV_DEG, min_pwm=MIN_DRIVE_PWM,
+                    max_pwm=FULL_POWER_PWM, steps=PWM_STEPS):
+    """
+    Differential wheel duty for a Steering, quantized to `steps` levels per side so
+    small jitter in the angle does not produce a new serial command every frame.
+
+    Returns:
+        tuple: (left, right) signed PWM, (0, 0) to stop.
+    """
+    if steering.speed <= 0:
+        return 0, 0
+    turn = max(-1.0, min(1.0, steering.angle_deg / (fov_deg / 2.0)))
+    base = min_pwm + (max_pwm - min_pwm) * steering.speed
+    step = max_pwm / steps
+
+    def quantize(v):
+        v = round(v / step) * step
+        if abs(v) < min_pwm / 2:
+            return 0                                    # Let that side roll / pivot
+        return int(np.sign(v) * min(max_pwm, max(abs(v), min_pwm)))
+
+    # Turning left (negative angle) slows the left side, down to a pivot at |turn| = 1
+    return quantize(base * (1.0 + turn)), quantize(base * (1.0 - turn))
+
+
+class TrackingPlanner:
+    """
+    get_drive_command over tracked obstacles instead of single-frame boxes.
+
+    Only confirmed tracks count, so a box that flickers for one frame never
+    triggers a turn. A track blocks when its bottom edge is below the danger line
+    (and it is not clearly receding) or when its time-to-collision is below
+    `ttc_danger`. Hysteresis keeps decisions stable: a blocking track clears only
+    once it is `margin_ratio` above the line, and the steering command changes at
+    most every `hold_s` seconds (STOP always applies immediately).
+
+    Args:
+        tracker (ObstacleTracker): Tracker to use (a new one by default).
+        ttc_danger (float): Time-to-collision in seconds that blocks regardless of position.
+        margin_ratio (float): Hysteresis band above the danger line, as a fraction of height.
+        receding_ratio (float): Upward bottom-edge speed (fraction of height per second)
+            above which an obstacle in the danger zone is ignored.
+        hold_s (float): Minimum time between steering command changes.
+    """
+
+    def __init__(self, tracker=None, ttc_danger=TTC_DANGER_S, margin_ratio=DANGER_MARGIN_RATIO,
+                 receding_ratio=RECEDING_SPEED_RATIO, hold_s=COMMAND_HOLD_S):
+        self.tracker = tracker or ObstacleTracker()
+        self.ttc_danger = ttc_danger
+        self.margin_ratio = margin_ratio
+        self.receding_ratio = receding_ratio
+        self.hold_s = hold_s
+        self.tracks = []
+        self.blocking = set()           # Ids of the tracks that currently block
+        self.nearest_ttc = float("inf")
+        self._command = ('w', "FORWARD")
+        self._changed_at = -float("inf")
+        self._obstacles = np.zeros((0, 4), dtype=np.float32)
+
+    def _blocks(self, track, frame_height):
+        danger_line_y = frame_height * DANGER_LINE_RATIO
+        if track.track_id in self.blocking:
+            danger_line_y -= frame_height * self.margin_ratio
+        ttc = time_to_collision(track, frame_height)
+        receding = track.velocity_y2 < -self.receding_ratio * frame_height
+        return (track.xyxy[3] > danger_line_y and not receding) or ttc < self.ttc_danger
+
+    def update(self, boxes, frame_width, frame_height, now=None, fresh=True):
+        """
+        Args:
+            boxes: YOLO `Boxes`, an xyxy tensor or an (N, 4) array.
+            frame_width (int): Width of the video frame.
+            frame_height (int): Height of the video frame.
+            now (float): Capture timestamp of the frame (FramePacket.frame_time, i.e.
+                the recorded time on replays).
+            fresh (bool): False if `boxes` were reused from an earlier frame
+                (DetectionScheduler); tracks then only coast.
+
+        Returns:
+            tuple: (Command Character, Descriptive String)
+        """
+        now = time.monotonic() if now is None else now
+        self.tracks = self.tracker.update(boxes_to_xyxy(boxes) if fresh else None, now)
+        confirmed = [t for t in self.tracks if t.confirmed]
+        mask = np.array([self._blocks(t, frame_height) for t in confirmed], dtype=bool)
+        self.blocking = {t.track_id for t, b in zip(confirmed, mask) if b}
+        self.nearest_ttc = min((time_to_collision(t, frame_height) for t in confirmed),
+                               default=float("inf"))
+
+        xyxy = np.array([t.xyxy for t in confirmed], dtype=np.float32).reshape(-1, 4)
+        self._obstacles = xyxy[mask]
+        command = decide_drive_command(
+            compute_sector_occupancy(xyxy, frame_width, frame_height, in_danger=mask))
+        if command[0] != self._command[0]:
+            if command[0] != 'x' and now - self._changed_at < self.hold_s:
+                return self._command
+            self._command, self._changed_at = command, now
+        return self._command
+
+    def steer(self, frame_width, frame_height):
+        """free_space_steering over the blocking tracks of the last update()."""
+        return free_space_steering(self._obstacles, frame_width, frame_height,
+                                   in_danger=np.ones(len(self._obstacles), dtype=bool))
@@ -0,0 +1,265 @@
+import asyncio
+import re
+import shutil
+import subprocess
+import threading
+
+# ================= STREAMING VOICE PIPELINE =================
+# Microphone capture runs continuously in the background (speech_recognition's
+# listen_in_background), and each utterance flows through an asyncio pipeline:
+#
+#   audio -> recognize -> dispatch command      (immediately, before any reply)
+#                      -> LLM reply stream -> sentences -> TTS audio chunks -> player
+#
+# The reply runs as its own task, so the next utterance is recognized and its
+# command dispatched while the previous reply is still being spoken; a new
+# utterance cancels the reply in progress (barge-in). Audio is piped to the
+# player's stdin chunk by chunk, no temp file.
+#
+# Every stage is an injectable callable so the pipeline runs offline with stubs:
+#   recognize(audio) -> str                  (blocking, runs in a worker thread)
+#   dispatch(text) -> None                   (sends the robot command)
+#   reply_stream(text) -> iterable of str    (LLM text chunks)
+#   tts_stream(text) -> iterable of bytes    (encoded audio chunks, e.g. MP3)
+#   player_factory() -> object with write(bytes) and close()
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_DONE = object()
+
+
+# ================= PLAYERS =================
+class PipePlayer:
+    """Streams encoded audio into a command-line player's stdin as it arrives."""
+
+    CANDIDATES = (
+        ["mpg123", "-q", "-"],
+        ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", "-i", "-"],
+        ["mpv", "--no-video", "--really-quiet", "-"],
+    )
+
+    def __init__(self, command=None):
+        command = command or self.find_command()
+        if command is None:
+            raise RuntimeError("No streaming audio player found (install mpg123, ffmpeg or mpv)")
+        self._proc = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    @classmethod
+    def find_command(cls):
+        for command in cls.CANDIDATES:
+            if shutil.which(command[0]):
+                return command
+        return None
+
+    def write(self, chunk):
+        try:
+            self._proc.stdin.write(chunk)
+            self._proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass
+
+    def close(self, wait=True):
+        """Ends the stream; with `wait` the call returns after playback finished."""
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, ValueError):
+            pass
+        if wait:
+            self._proc.wait()
+        else:
+            self._proc.kill()
+
+
+class NullPlayer:
+    """Collects audio in memory instead of playing it (offline runs)."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+    def close(self, wait=True):
+        pass
+
+
+# ================= OFFLINE STUBS =================
+def echo_reply(text):
+    """LLM stand-in: yields a canned reply in a few chunks."""
+    yield "You said "
+    yield f"{text}. "
+    yield "On it!"
+
+
+def silent_tts(text):
+    """TTS stand-in: the sentence's UTF-8 bytes as a single 'audio' chunk."""
+    yield text.encode()
+
+
+# ================= PIPELINE =================
+async def iterate_in_thread(make_iter):
+    """
+    Runs a blocking iterator (SDK streams) in a worker thread and yields its items
+    asynchronously as they are produced.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def pump():
+        try:
+            for item in make_iter():
+                if cancelled.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    loop.run_in_executor(None, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # The worker stops at its next item; a cancelled reply does not wait for it
+        cancelled.set()
+
+
+class VoicePipeline:
+    """
+    Args:
+        recognize (callable): audio -> text; may raise to signal "nothing understood".
+        dispatch (callable): text -> None, called as soon as the text is recognized.
+        reply_stream (callable): text -> iterable of reply text chunks (None = no reply).
+        tts_stream (callable): sentence -> iterable of audio byte chunks.
+        player_factory (callable): Returns a player with write(bytes) / close().
+        probe (LatencyProbe): Optional; records recognize, command, llm_first_chunk,
+            tts_first_audio and reply stages per utterance.
+    """
+
+    def __init__(self, recognize, dispatch, reply_stream=None, tts_stream=None,
+                 player_factory=NullPlayer, probe=None):
+        self.recognize = recognize
+        self.dispatch = dispatch
+        self.reply_stream = reply_stream
+        self.tts_stream = tts_stream
+        self.player_factory = player_factory
+        self.probe = probe
+
+        self.loop = None
+        self.ready = threading.Event()     # Set once run() accepts input
+        self._inbox = None
+        self._reply_task = None
+        self.utterances = 0
+        self.replies_cancelled = 0
+
+    # ---------- Inputs (thread-safe) ----------
+    def submit_audio(self, audio):
+        """Queues captured audio from any thread (e.g. the background listener callback)."""
+        self.loop.call_soon_threadsafe(self._inbox.put_nowait, ("audio", audio))
+
+    def submit_text(self, text):
+        """Queues an already transcribed utterance (keyboard input, tests)."""
+        self.loop.call_soon_threadsafe(self._inbox.put_nowait, ("text", text))
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self._inbox.put_nowait, None)
+
+    # ---------- Stages ----------
+    async def handle(self, kind, payload):
+        """Recognizes one utterance, dispatches it and starts its reply."""
+        self.utterances += 1
+        trace = self.probe.begin(self.utterances) if self.probe else None
+        if kind == "audio":
+            try:
+                text = await asyncio.to_thread(self.recognize, payload)
+            except Exception as e:
+                print(f"[Mic] Could not understand ({type(e).__name__}).")
+                return
+        else:
+            text = payload
+        if trace:
+            trace.mark("recognize")
+        print(f"-> You said: {text}")
+
+        # The command goes out before anything slow happens
+        self.dispatch(text)
+        if trace:
+            trace.mark("command")
+
+        # Barge-in: the previous reply is no longer relevant
+        if self._reply_task and not self._reply_task.done():
+            self._reply_task.cancel()
+            self.replies_cancelled += 1
+        if self.reply_stream:
+            self._reply_task = asyncio.create_task(self.speak_reply(text, trace))
+        elif trace:
+            self.probe.finish(trace)
+
+    async def _sentences(self, text, trace):
+        """Groups streamed LLM chunks into sentences so TTS can start early."""
+        buffer = ""
+        first = True
+        async for chunk in iterate_in_thread(lambda: self.reply_stream(text)):
+            if first and trace:
+                trace.mark("llm_first_chunk")
+                first = False
+            buffer += chunk
+            parts = SENTENCE_END.split(buffer)
+            for sentence in parts[:-1]:
+                yield sentence
+            buffer = parts[-1]
+        if buffer.strip():
+            yield buffer
+
+    async def speak_reply(self, text, trace=None):
+        player = None
+        reply = []
+        first_audio = True
+        try:
+            async for sentence in self._sentences(text, trace):
+                reply.append(sentence)
+                if self.tts_stream is None:
+                    continue
+                if player is None:
+                    player = self.player_factory()
+                async for audio in iterate_in_thread(lambda s=sentence: self.tts_stream(s)):
+                    if first_audio and trace:
+                        trace.mark("tts_first_audio")
+                        first_audio = False
+                    player.write(audio)
+            print(f"\n[Reply]: {' '.join(reply)}")
+            if player is not None:
+                # Wait for the player to drain without blocking the event loop
+                await asyncio.to_thread(player.close)
+                player = None
+            if trace:
+                trace.mark("reply")
+                self.probe.finish(trace)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Reply Error] {e}")
+        finally:
+            if player is not None:
+                player.close(wait=False)
+
+    # ---------- Main loop ----------
+    async def run(self):
+        """Processes utterances until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        self._inbox = asyncio.Queue()
+        self.ready.set()
+        while True:
+            item = await self._inbox.get()
+            if item is None:
+                break
+            await self.handle(*item)
+        if self._reply_task and not self._reply_task.done():
+            await self._reply_task